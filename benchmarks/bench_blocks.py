@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+代码块表示的内存与吞吐基准
+
+生成包含大量 Mermaid 代码块的合成语料，比较三种表示方式的解析耗时和内存占用：
+
+- spans: MarkdownParser.scan_blocks，仅记录源文本偏移
+- blocks: MarkdownParser.find_mermaid_blocks，由 span 构建模型，复用已缓存的配置
+- validated: 每个代码块都完整校验的 pydantic 模型（旧的表示方式）
+
+用法:
+    python benchmarks/bench_blocks.py --blocks 50000
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from md_mermaid_static.core.parser import MarkdownParser  # noqa: E402
+from md_mermaid_static.models import MermaidBlock, MermaidConfig  # noqa: E402
+
+HEADERS = [
+    "",
+    "---\ncaption: 系统架构\nrender-theme: dark\n---\n",
+    "---\ncaption: 调用流程\nwidth: 800\n---\n",
+]
+
+DIAGRAMS = [
+    "graph TD\n    A{i}[开始] --> B{i}{{判断}}\n"
+    "    B{i} -->|是| C{i}[处理]\n    B{i} -->|否| D{i}[结束]",
+    "sequenceDiagram\n    Alice->>Bob: 请求 {i}\n    Bob-->>Alice: 响应 {i}",
+    "classDiagram\n    class Service{i} {{\n        +handle()\n    }}",
+]
+
+
+def generate_corpus(blocks: int) -> str:
+    """生成包含指定数量代码块的合成语料"""
+    parts = []
+    for i in range(blocks):
+        header = HEADERS[i % len(HEADERS)]
+        diagram = DIAGRAMS[i % len(DIAGRAMS)].format(i=i)
+        parts.append(
+            f"## 接口 {i}\n\n说明文字 {i}。\n\n```mermaid\n{header}{diagram}\n```\n\n"
+        )
+    return "".join(parts)
+
+
+def build_validated(parser: MarkdownParser, content: str):
+    """按旧方式构建：复制内容并完整校验每个模型"""
+    blocks = []
+    for span in parser.scan_blocks(content):
+        config = span.config.model_dump() if span.config else {}
+        blocks.append(
+            MermaidBlock(
+                content=span.content,
+                config=MermaidConfig(**config),
+                line_start=span.line_start,
+                line_end=span.line_end,
+                span_start=span.span_start,
+                span_end=span.span_end,
+            )
+        )
+    return blocks
+
+
+def measure(name: str, build, content: str):
+    """测量构建耗时和构建结果占用的内存"""
+    gc.collect()
+    started = time.perf_counter()
+    result = build(content)
+    elapsed = time.perf_counter() - started
+    del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = build(content)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    print(
+        f"{name:>10} {elapsed:>9.3f}s "
+        f"{len(content.encode()) / elapsed / 1e6:>9.1f} MB/s "
+        f"{retained / 1e6:>10.1f} MB {peak / 1e6:>10.1f} MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="代码块表示的内存与吞吐基准")
+    parser.add_argument("--blocks", type=int, default=50000, help="代码块数量")
+    args = parser.parse_args()
+
+    content = generate_corpus(args.blocks)
+    print(f"语料: {args.blocks} 个代码块, {len(content.encode()) / 1e6:.1f} MB")
+    print(f"{'':>10} {'time':>10} {'throughput':>14} {'retained':>13} {'peak':>13}")
+
+    markdown_parser = MarkdownParser()
+    measure("spans", markdown_parser.scan_blocks, content)
+    measure("blocks", markdown_parser.find_mermaid_blocks, content)
+    measure("validated", lambda c: build_validated(markdown_parser, c), content)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+代码块替换性能基准
+
+生成包含不同数量 Mermaid 代码块的文档，测量 MarkdownProcessor._replace_blocks
+的耗时，验证其随代码块数量线性增长。
+
+用法:
+    python benchmarks/bench_replace.py --sizes 1000 2000 4000 8000 16000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from md_mermaid_static.core.parser import MarkdownParser  # noqa: E402
+from md_mermaid_static.core.processor import MarkdownProcessor  # noqa: E402
+from md_mermaid_static.models import CLIConfig  # noqa: E402
+
+
+def generate_document(blocks: int) -> str:
+    """生成包含指定数量代码块的文档"""
+    return "".join(
+        f"## 第 {i} 节\n\n说明文字 {i}\n\n"
+        f"```mermaid\ngraph TD\n    A{i} --> B{i}\n```\n\n"
+        for i in range(blocks)
+    )
+
+
+def measure(blocks: int, repeat: int) -> float:
+    """测量替换指定数量代码块的最佳耗时（秒）"""
+    content = generate_document(blocks)
+    parsed = MarkdownParser().find_mermaid_blocks(content)
+    processor = MarkdownProcessor("bench.md", CLIConfig(output_dir="output"))
+    rendered = [
+        (block, Path(f"output/media/mermaid_{i}.svg")) for i, block in enumerate(parsed)
+    ]
+
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        processor._replace_blocks(content, rendered)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="代码块替换性能基准")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 2000, 4000, 8000, 16000],
+        help="代码块数量",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="每个规模的重复次数")
+    args = parser.parse_args()
+
+    print(f"{'blocks':>8} {'seconds':>10} {'us/block':>10}")
+    for size in args.sizes:
+        elapsed = measure(size, args.repeat)
+        print(f"{size:>8} {elapsed:>10.4f} {elapsed / size * 1e6:>10.2f}")
+    # 线性增长时每块耗时（us/block）应大致保持不变
+
+
+if __name__ == "__main__":
+    main()
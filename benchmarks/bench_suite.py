@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+解析、拼接、指纹和渲染选项的微基准套件
+
+在合成语料上测量处理流水线中不需要渲染的各个环节，完全离线运行：
+
+- scan: MarkdownParser.scan_blocks，处理流程实际使用的轻量 span 扫描
+- parse: MarkdownParser.find_mermaid_blocks，构建完整的代码块模型
+- replace: MarkdownProcessor._replace_blocks，把图片引用拼接进输出
+- fingerprint: MermaidRenderer.get_fingerprint，渲染缓存指纹（sha256）
+- options: get_render_options，合并命令行与代码块配置
+
+语料:
+
+- large: 少量大文档
+- small: 大量小文档
+- frontmatter: 文档和代码块都带有较重的 frontmatter（部分需要 YAML 解析）
+- mixed: 混合 ```mermaid、:::mermaid、缩进围栏以及非 Mermaid 代码块
+
+吞吐以 MB/s（处理的 Markdown 字节数）和 blocks/s 报告。基线保存在
+benchmarks/baselines.json，--check 在 blocks/s 低于基线超过阈值时以非零状态退出。
+
+用法:
+    python benchmarks/bench_suite.py                   # 运行并打印结果
+    python benchmarks/bench_suite.py --check           # 与基线比较
+    python benchmarks/bench_suite.py --update-baselines
+    python benchmarks/bench_suite.py --scale 0.1 --only large/scan
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from md_mermaid_static.core.parser import MarkdownParser  # noqa: E402
+from md_mermaid_static.core.processor import MarkdownProcessor  # noqa: E402
+from md_mermaid_static.models import CLIConfig  # noqa: E402
+
+BASELINES_FILE = Path(__file__).with_name("baselines.json")
+
+# 默认允许的吞吐下降比例
+DEFAULT_THRESHOLD = 0.25
+
+DIAGRAMS = [
+    "graph TD\n    A{i}[开始] --> B{i}{{判断}}\n"
+    "    B{i} -->|是| C{i}[处理]\n    B{i} -->|否| D{i}[结束]",
+    "sequenceDiagram\n    Alice->>Bob: 请求 {i}\n    Bob-->>Alice: 响应 {i}",
+    "classDiagram\n    class Service{i} {{\n"
+    "        +handle()\n        +close()\n    }}",
+    'pie title 分布 {i}\n    "A" : 40\n    "B" : 60',
+]
+
+PROSE = (
+    "这是一段说明文字，描述第 {i} 个组件的职责、输入输出以及与其他模块的交互方式。"
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit.\n\n"
+)
+
+
+def _diagram(rng: random.Random, i: int) -> str:
+    return rng.choice(DIAGRAMS).format(i=i)
+
+
+def _section(
+    rng: random.Random, i: int, fence: str = "```mermaid", header: str = ""
+) -> str:
+    closer = ":::" if fence.startswith(":::") else fence.strip().split("mermaid")[0]
+    indent = fence[: len(fence) - len(fence.lstrip())]
+    return (
+        f"## 第 {i} 节\n\n{PROSE.format(i=i) * rng.randint(1, 3)}"
+        f"{fence}\n{header}{_diagram(rng, i)}\n{indent}{closer}\n\n"
+    )
+
+
+def large_docs(scale: float) -> List[str]:
+    """少量大文档"""
+    rng = random.Random(1)
+    blocks = max(1, int(5000 * scale))
+    return ["".join(_section(rng, i) for i in range(blocks)) for _ in range(3)]
+
+
+def small_docs(scale: float) -> List[str]:
+    """大量小文档，每个一到两个代码块"""
+    rng = random.Random(2)
+    return [
+        f"# 文档 {n}\n\n" + "".join(_section(rng, i) for i in range(rng.randint(1, 2)))
+        for n in range(max(1, int(3000 * scale)))
+    ]
+
+
+def frontmatter_docs(scale: float) -> List[str]:
+    """文档级和代码块级 frontmatter 都较重的文档"""
+    rng = random.Random(3)
+    docs = []
+    for n in range(max(1, int(500 * scale))):
+        tags = "\n".join(f"  - 标签{t}" for t in range(8))
+        parts = [
+            f"---\ntitle: 文档 {n}\nauthor: 作者 {n % 7}\n"
+            f"date: 2024-01-{n % 28 + 1:02d}\n"
+            f"tags:\n{tags}\ndraft: false\n---\n\n"
+        ]
+        for i in range(10):
+            if i % 3 == 2:
+                # 嵌套值需要 YAML 解析
+                header = (
+                    f"---\ncaption: 图 {n}-{i}\nrender-theme: dark\nwidth: {600 + i}\n"
+                    f"extra:\n  owner: team{i}\n---\n"
+                )
+            else:
+                header = (
+                    f"---\ncaption: 图 {n}-{i}\nrender-theme: forest\n"
+                    f"width: {800 + i}\nheight: {400 + i}\n"
+                    f"background-color: white\nscale: 1.5\n---\n"
+                )
+            parts.append(_section(rng, i, header=header))
+        docs.append("".join(parts))
+    return docs
+
+
+def mixed_docs(scale: float) -> List[str]:
+    """混合多种围栏风格，并穿插非 Mermaid 代码块"""
+    rng = random.Random(4)
+    fences = ["```mermaid", "```mermaid  ", "  ```mermaid", ":::mermaid"]
+    docs = []
+    for n in range(max(1, int(200 * scale))):
+        parts = [f"# 混合 {n}\n\n"]
+        for i in range(20):
+            parts.append(_section(rng, i, fence=fences[i % len(fences)]))
+            if i % 2:
+                parts.append(
+                    f"```python\nprint('不是图表 {i}')\n```\n\n~~~\n纯文本 {i}\n~~~\n\n"
+                )
+        docs.append("".join(parts))
+    return docs
+
+
+CORPORA: Dict[str, Callable[[float], List[str]]] = {
+    "large": large_docs,
+    "small": small_docs,
+    "frontmatter": frontmatter_docs,
+    "mixed": mixed_docs,
+}
+
+
+class Workload:
+    """一个语料及其预先计算的解析结果，供各基准复用"""
+
+    def __init__(self, docs: List[str], output_dir: str):
+        self.docs = docs
+        self.size = sum(len(doc.encode("utf-8")) for doc in docs)
+        self.parser = MarkdownParser()
+        self.spans = [self.parser.scan_blocks(doc) for doc in docs]
+        self.blocks = sum(len(spans) for spans in self.spans)
+        self.options = [
+            [span.get_render_options() for span in spans] for spans in self.spans
+        ]
+        self.processor = MarkdownProcessor("bench.md", CLIConfig(output_dir=output_dir))
+        self.rendered = [
+            [
+                (span, Path(output_dir) / "media" / f"mermaid_{i}.svg")
+                for i, span in enumerate(spans)
+            ]
+            for spans in self.spans
+        ]
+
+    def close(self):
+        self.processor.close()
+
+
+def bench_scan(work: Workload) -> None:
+    for doc in work.docs:
+        work.parser.scan_blocks(doc)
+
+
+def bench_parse(work: Workload) -> None:
+    for doc in work.docs:
+        work.parser.find_mermaid_blocks(doc)
+
+
+def bench_replace(work: Workload) -> None:
+    for doc, rendered in zip(work.docs, work.rendered):
+        work.processor._replace_blocks(doc, rendered)
+
+
+def bench_fingerprint(work: Workload) -> None:
+    get_fingerprint = work.processor.renderer.get_fingerprint
+    for spans, options in zip(work.spans, work.options):
+        for span, render_options in zip(spans, options):
+            get_fingerprint(span, render_options)
+
+
+def bench_options(work: Workload) -> None:
+    for spans in work.spans:
+        for span in spans:
+            span.get_render_options()
+
+
+BENCHMARKS: Dict[str, Callable[[Workload], None]] = {
+    "scan": bench_scan,
+    "parse": bench_parse,
+    "replace": bench_replace,
+    "fingerprint": bench_fingerprint,
+    "options": bench_options,
+}
+
+
+def run_suite(
+    scale: float = 1.0, repeat: int = 5, only: Optional[List[str]] = None
+) -> Dict[str, Dict[str, float]]:
+    """
+    运行基准套件
+
+    Args:
+        scale: 语料规模系数
+        repeat: 每个基准的重复次数，取最快的一次
+        only: 只运行这些 "语料/基准"（支持只写语料名或基准名）
+
+    Returns:
+        {"语料/基准": {"mb_per_s", "blocks_per_s", "seconds"}}
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    previous = CLIConfig.get_instance()
+    with tempfile.TemporaryDirectory() as output_dir:
+        # 与命令行运行时一样设置全局配置
+        CLIConfig.set_instance(CLIConfig(output_dir=output_dir))
+        try:
+            for corpus, generate in CORPORA.items():
+                selected = [
+                    name
+                    for name in BENCHMARKS
+                    if not only or {corpus, name, f"{corpus}/{name}"} & set(only)
+                ]
+                if not selected:
+                    continue
+                work = Workload(generate(scale), output_dir)
+                try:
+                    for name in selected:
+                        best = float("inf")
+                        for _ in range(repeat):
+                            started = time.perf_counter()
+                            BENCHMARKS[name](work)
+                            best = min(best, time.perf_counter() - started)
+                        results[f"{corpus}/{name}"] = {
+                            "mb_per_s": round(work.size / best / 1e6, 2),
+                            "blocks_per_s": round(work.blocks / best, 1),
+                            "seconds": round(best, 6),
+                        }
+                finally:
+                    work.close()
+        finally:
+            CLIConfig.set_instance(previous)
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baselines: Dict[str, Dict[str, float]],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[str]:
+    """
+    与基线比较
+
+    Returns:
+        吞吐（blocks/s）低于基线超过 ``threshold`` 的基准说明，无回退时为空
+    """
+    regressions = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        if not baseline:
+            continue
+        ratio = result["blocks_per_s"] / baseline["blocks_per_s"]
+        if ratio < 1 - threshold:
+            regressions.append(
+                f"{key}: {result['blocks_per_s']:,.0f} blocks/s, "
+                f"{(1 - ratio) * 100:.0f}% below baseline "
+                f"{baseline['blocks_per_s']:,.0f}"
+            )
+    return regressions
+
+
+def load_baselines(path: Path = BASELINES_FILE) -> Dict:
+    """读取基线文件，不存在时返回空基线"""
+    if not path.exists():
+        return {"results": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def print_results(
+    results: Dict[str, Dict[str, float]], baselines: Dict[str, Dict[str, float]]
+):
+    print(f"{'benchmark':<24} {'MB/s':>10} {'blocks/s':>14} {'vs baseline':>12}")
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        change = (
+            f"{(result['blocks_per_s'] / baseline['blocks_per_s'] - 1) * 100:+.0f}%"
+            if baseline
+            else "-"
+        )
+        print(
+            f"{key:<24} {result['mb_per_s']:>10.1f} "
+            f"{result['blocks_per_s']:>14,.0f} {change:>12}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="解析、拼接、指纹和渲染选项的微基准套件"
+    )
+    parser.add_argument("--scale", type=float, default=1.0, help="语料规模系数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个基准的重复次数")
+    parser.add_argument(
+        "--only", nargs="+", help="只运行指定的语料或基准，如 large、scan、large/scan"
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="吞吐低于基线超过阈值时失败"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"允许的吞吐下降比例（默认 {DEFAULT_THRESHOLD}）",
+    )
+    parser.add_argument(
+        "--update-baselines",
+        action="store_true",
+        help=f"把结果写入 {BASELINES_FILE.name}",
+    )
+    parser.add_argument("--json", type=Path, help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    stored = load_baselines()
+    if args.check and stored.get("scale", 1.0) != args.scale:
+        print(
+            f"警告: 基线的规模系数为 {stored.get('scale')}，"
+            f"与 --scale {args.scale} 不同"
+        )
+
+    results = run_suite(args.scale, args.repeat, args.only)
+    print_results(results, stored["results"])
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if args.update_baselines:
+        stored["results"].update(results)
+        stored.update(
+            scale=args.scale,
+            python=platform.python_version(),
+            machine=f"{platform.system()} {platform.machine()}",
+        )
+        BASELINES_FILE.write_text(
+            json.dumps(stored, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+        )
+        print(f"基线已更新: {BASELINES_FILE}")
+
+    if args.check:
+        regressions = compare(results, stored["results"], args.threshold)
+        if regressions:
+            print("性能回退:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("未发现性能回退")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,34 +2,40 @@
 md-mermaid-static - A CLI tool to convert Mermaid diagrams in Markdown to static images with enhanced logging
 """
 
+import importlib
+
 __version__ = "0.2.0"
 
-# Export core functionality
-from .core import MarkdownParser, MermaidRenderer, MarkdownProcessor
-
-# Export models
-from .models import (
-    MermaidBlock,
-    MermaidConfig,
-    MermaidRenderOptions,
-    OutputFormat,
-    Theme,
-    CLIConfig,
-)
-
-# Export utils
-from .utils import logger, setup_logging
-
-__all__ = [
-    "MarkdownParser",
-    "MermaidRenderer",
-    "MarkdownProcessor",
-    "MermaidBlock",
-    "MermaidConfig",
-    "MermaidRenderOptions",
-    "OutputFormat",
-    "Theme",
-    "CLIConfig",
-    "logger",
-    "setup_logging",
-]
+# Public names and the modules providing them. They are imported on first
+# access (PEP 562), so running the CLI does not pay for what it never uses.
+_EXPORTS = {
+    # Export core functionality
+    "MarkdownParser": ".core.parser",
+    "MermaidRenderer": ".core.renderer",
+    "MarkdownProcessor": ".core.processor",
+    # Export models
+    "MermaidBlock": ".models",
+    "MermaidConfig": ".models",
+    "MermaidRenderOptions": ".models",
+    "OutputFormat": ".models",
+    "Theme": ".models",
+    "CLIConfig": ".models",
+    # Export utils
+    "logger": ".utils.logger",
+    "setup_logging": ".utils.logger",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
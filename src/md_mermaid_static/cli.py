@@ -1,15 +1,13 @@
 import click
 from pathlib import Path
 import os
+import time
 import traceback
-
-from .core.processor import MarkdownProcessor
-from .models import CLIConfig, OutputFormat, Theme, LogLevel
-from .utils.logger import setup_logging, logger, display_config
+from typing import Optional, Tuple
 
 
 @click.command()
-@click.argument("input_file", type=click.Path(exists=True))
+@click.argument("inputs", nargs=-1, required=True)
 @click.option(
     "--output-dir",
     "-o",
@@ -60,9 +58,48 @@ from .utils.logger import setup_logging, logger, display_config
 @click.option(
     "--max-workers",
     "-j",
+    type=str,
+    default="0",
+    help="Maximum number of worker processes for concurrent rendering "
+    "(default is CPU core count), or 'auto' to adapt to system load and memory",
+)
+@click.option(
+    "--memory-budget",
+    type=int,
+    default=None,
+    help="Memory in MB that renders may use with --max-workers auto "
+    "(default: 75%% of available memory)",
+)
+@click.option(
+    "--convert-workers",
     type=int,
     default=0,
-    help="Maximum number of worker processes for concurrent rendering (default is CPU core count)",
+    help="Number of processes for PDF post-processing in concurrent mode "
+    "(default is CPU core count)",
+)
+@click.option(
+    "--parse-workers",
+    type=int,
+    default=None,
+    help="Processes that read, parse and rewrite documents when converting many files "
+    "(0 is CPU core count, default parses in threads)",
+)
+@click.option(
+    "--render-timeout",
+    type=float,
+    default=300,
+    help="Seconds before a render and its browser are killed (0 disables the timeout)",
+)
+@click.option(
+    "--retries",
+    type=int,
+    default=1,
+    help="Retries with backoff for renders that time out or crash",
+)
+@click.option(
+    "--hedge",
+    is_flag=True,
+    help="Start a second attempt once a render exceeds the p95 latency of the run",
 )
 @click.option(
     "--debug", "-d", is_flag=True, help="Enable debug mode with detailed logs"
@@ -77,6 +114,19 @@ from .utils.logger import setup_logging, logger, display_config
     help="Log level",
 )
 @click.option("--log-file", "-l", type=click.Path(), help="Log file path")
+@click.option(
+    "--trace",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write a per-stage timeline in Chrome trace format "
+    "(open in chrome://tracing or ui.perfetto.dev)",
+)
+@click.option(
+    "--report",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write a JSON report with per-chart timings, cache hits and run totals",
+)
 @click.option(
     "--use-command",
     type=click.Choice(["auto", "npx", "pnpx"]),
@@ -88,9 +138,68 @@ from .utils.logger import setup_logging, logger, display_config
     type=click.Path(exists=True),
     help="Directory containing theme folders",
 )
+@click.option(
+    "--backend",
+    type=click.Choice(["mmdc", "worker", "fake"]),
+    default="mmdc",
+    help="Render engine: mermaid-cli per chart, one long-lived browser worker, "
+    "or deterministic placeholder images without Node (for benchmarks and CI)",
+)
+@click.option(
+    "--persistent-worker",
+    is_flag=True,
+    help="Render all charts in one long-lived browser instead of one mermaid-cli "
+    "run per chart (same as --backend worker)",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Skip documents unchanged since the last run and re-render only "
+    "changed charts",
+)
+@click.option(
+    "--stream",
+    is_flag=True,
+    help="Stream very large inputs line by line, only diagram sources are kept "
+    "in memory",
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    help="Re-render whenever the input or theme files change, keeping the "
+    "renderer warm",
+)
+@click.option(
+    "--batch",
+    is_flag=True,
+    help="Render charts that share the same options in a single mermaid-cli run",
+)
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    help="Reuse previously rendered charts whose source and options are unchanged",
+)
+@click.option(
+    "--shared-cache",
+    is_flag=True,
+    help="Share rendered charts across projects via a user-level cache directory",
+)
+@click.option(
+    "--shared-cache-dir",
+    type=click.Path(),
+    default=None,
+    help="Shared cache directory (default: $XDG_CACHE_HOME/md-mermaid-static)",
+)
+@click.option(
+    "--shared-cache-size",
+    type=int,
+    default=1024,
+    help="Maximum size of the shared cache in MB, least recently used charts "
+    "are evicted",
+)
 @click.version_option()
 def main(
-    input_file: str,
+    inputs: Tuple[str, ...],
     output_dir: str,
     output_format: str,
     theme: str,
@@ -102,25 +211,85 @@ def main(
     css_file: str,
     pdf_fit: bool,
     concurrent: bool,
-    max_workers: int,
+    max_workers: str,
+    memory_budget: int,
+    convert_workers: int,
+    parse_workers: int,
+    render_timeout: float,
+    retries: int,
+    hedge: bool,
     debug: bool,
     log_level: str,
     log_file: str,
+    trace: Optional[str],
+    report: Optional[str],
     use_command: str,
     themes_dir: str,
+    backend: str,
+    persistent_worker: bool,
+    incremental: bool,
+    stream: bool,
+    watch: bool,
+    batch: bool,
+    cache: bool,
+    shared_cache: bool,
+    shared_cache_dir: str,
+    shared_cache_size: int,
 ):
-    """Convert Mermaid code blocks in Markdown to static images."""
+    """Convert Mermaid code blocks in Markdown to static images.
+
+    INPUTS are Markdown files, directories or glob patterns. Directory trees
+    are mirrored into the output directory.
+    """
+    started = time.monotonic()
+    # Handle max_workers - ensure it's always an integer. Validated before
+    # anything is set up, so a bad value is reported as a usage error
+    adaptive_workers = max_workers.strip().lower() == "auto"
+    if adaptive_workers:
+        # Upper bound for the adaptive controller
+        max_workers = os.cpu_count() or 4
+    else:
+        try:
+            max_workers = int(max_workers)
+        except ValueError:
+            raise click.BadParameter(
+                f"'{max_workers}' is not an integer or 'auto'",
+                param_hint="'--max-workers'",
+            )
+        if max_workers <= 0:
+            max_workers = os.cpu_count() or 4
+
+    # Like click.Path(exists=True), glob patterns are expanded later
+    for pattern in inputs:
+        if not any(char in pattern for char in "*?[") and not Path(pattern).exists():
+            raise click.BadParameter(
+                f"Path '{pattern}' does not exist.", param_hint="'INPUTS...'"
+            )
+
+    # A single file keeps its name, anything else is processed as a corpus
+    single_file = len(inputs) == 1 and Path(inputs[0]).is_file()
+    if watch and not single_file:
+        raise click.UsageError("--watch supports a single input file")
+
     try:
+        # Imported here so that --help and usage errors return without
+        # loading pydantic and the processing pipeline
+        from .core.corpus import CorpusProcessor, discover_inputs
+        from .core.processor import MarkdownProcessor
+        from .models import CLIConfig, OutputFormat, Theme, LogLevel, RenderBackendType
+        from .utils.logger import setup_logging, logger, display_config
+
         # Setup logging
         setup_logging(debug_mode=debug, log_file=log_file)
 
+        if trace:
+            from .utils.tracing import start_tracing
+
+            start_tracing()
+
         # Ensure output directory exists
         Path(output_dir).mkdir(parents=True, exist_ok=True)
 
-        # Handle max_workers - ensure it's always an integer
-        if max_workers <= 0:
-            max_workers = os.cpu_count() or 4
-
         # If output format is enhanced-svg, set pdf_fit to True by default
         if output_format == "enhanced-svg":
             pdf_fit = True
@@ -169,11 +338,32 @@ def main(
             pdf_fit=pdf_fit,
             concurrent=concurrent,
             max_workers=max_workers,
+            adaptive_workers=adaptive_workers,
+            memory_budget_mb=memory_budget,
+            convert_workers=convert_workers or None,
+            parse_workers=None
+            if parse_workers is None
+            else parse_workers or os.cpu_count() or 1,
+            render_timeout=render_timeout or None,
+            render_retries=max(0, retries),
+            hedge=hedge,
             debug=debug,
             log_file=log_file,
             log_level=LogLevel(log_level),
             use_command=use_command,
             themes_dir=themes_dir,
+            backend=RenderBackendType(backend),
+            # Keep one browser warm across watch iterations
+            persistent_worker=persistent_worker or watch,
+            incremental=incremental,
+            stream=stream,
+            watch=watch,
+            batch=batch,
+            cache=cache,
+            shared_cache=shared_cache,
+            shared_cache_dir=shared_cache_dir,
+            shared_cache_size_mb=shared_cache_size,
+            report_file=report,
         )
 
         # Set the global singleton instance
@@ -182,11 +372,53 @@ def main(
         # Display config in debug mode
         display_config(cli_config)
 
+        if not single_file:
+            documents = discover_inputs(inputs, exclude=[Path(output_dir)])
+            with CorpusProcessor(documents, cli_config) as corpus:
+                results = corpus.process()
+            failed = [str(path) for path, output_file in results if output_file is None]
+            if report:
+                from .core.report import build_report, write_report
+
+                write_report(
+                    build_report(
+                        corpus.block_reports,
+                        cli_config,
+                        time.monotonic() - started,
+                        documents=len(results),
+                        failed_documents=len(failed),
+                    ),
+                    report,
+                )
+            if failed:
+                raise RuntimeError(f"Failed to process: {', '.join(failed)}")
+            logger.info(f"Processing complete! Output directory: {output_dir}")
+            return
+
         # Process file
-        processor = MarkdownProcessor(input_file, cli_config)
-        output_file = processor.process()
+        with MarkdownProcessor(inputs[0], cli_config) as processor:
+            output_file = processor.process()
+            logger.info(f"Processing complete! Output file: {output_file}")
+            if report:
+                from .core.report import build_report, write_report
 
-        logger.info(f"Processing complete! Output file: {output_file}")
+                write_report(
+                    build_report(
+                        processor.block_reports,
+                        cli_config,
+                        time.monotonic() - started,
+                        documents=1,
+                    ),
+                    report,
+                )
+
+            if watch:
+                from .core.watcher import watch_and_process
+
+                try:
+                    watch_and_process(processor)
+                except KeyboardInterrupt:
+                    logger.info("Stopped watching")
 
     except Exception as e:
         if "logger" in locals():
@@ -201,6 +433,13 @@ def main(
                 tb = traceback.format_exc()
                 print(f"Traceback:\n{tb}")
         raise click.Abort()
+    finally:
+        if trace:
+            from .utils.tracing import stop_tracing, write_trace
+
+            tracer = stop_tracing()
+            if tracer is not None:
+                write_trace(trace, tracer)
 
 
 if __name__ == "__main__":
@@ -3,17 +3,49 @@
 """
 
 import os
+from functools import lru_cache
 from pathlib import Path
-from dotenv import load_dotenv
 
-# 加载.env文件
-load_dotenv(Path(__file__).parents[2] / ".env")
 
-# Mermaid CLI版本
-MERMAID_CLI_VERSION = os.getenv("MERMAID_CLI_VERSION", "11.4.2")
+# 首次读取配置时才加载.env文件，避免每次启动都导入dotenv
+@lru_cache(maxsize=None)
+def load_env() -> None:
+    """加载.env文件"""
+    env_file = Path(__file__).parents[2] / ".env"
+    if env_file.is_file():
+        from dotenv import load_dotenv
+
+        load_dotenv(env_file)
+
+
+# 获取Mermaid CLI版本
+def get_mermaid_cli_version() -> str:
+    """获取mermaid-cli版本号"""
+    load_env()
+    return os.getenv("MERMAID_CLI_VERSION", "11.4.2")
 
 
 # 获取完整的CLI命令
 def get_mermaid_cli_package():
     """获取带版本号的mermaid-cli包名"""
-    return f"@mermaid-js/mermaid-cli@{MERMAID_CLI_VERSION}"
+    return f"@mermaid-js/mermaid-cli@{get_mermaid_cli_version()}"
+
+
+# 获取共享渲染缓存目录
+def get_shared_cache_dir() -> Path:
+    """获取用户级共享渲染缓存目录"""
+    load_env()
+    cache_dir = os.getenv("MD_MERMAID_STATIC_CACHE_DIR")
+    if cache_dir:
+        return Path(cache_dir)
+    cache_home = os.getenv("XDG_CACHE_HOME") or os.getenv("LOCALAPPDATA")
+    if cache_home:
+        return Path(cache_home) / "md-mermaid-static"
+    return Path.home() / ".cache" / "md-mermaid-static"
+
+
+def __getattr__(name: str):
+    # 兼容旧的模块常量 MERMAID_CLI_VERSION
+    if name == "MERMAID_CLI_VERSION":
+        return get_mermaid_cli_version()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
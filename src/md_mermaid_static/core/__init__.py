@@ -2,8 +2,32 @@
 Core functionality for md_mermaid_static.
 """
 
-from .parser import MarkdownParser
-from .renderer import MermaidRenderer
-from .processor import MarkdownProcessor
+import importlib
 
-__all__ = ["MarkdownParser", "MermaidRenderer", "MarkdownProcessor"]
+# Imported on first access (PEP 562), see md_mermaid_static.__init__
+_EXPORTS = {
+    "MarkdownParser": ".parser",
+    "MermaidRenderer": ".renderer",
+    "MarkdownProcessor": ".processor",
+    "CorpusProcessor": ".corpus",
+    "discover_inputs": ".corpus",
+    "RenderBackend": ".backends",
+    "MmdcBackend": ".backends",
+    "WorkerBackend": ".backends",
+    "FakeBackend": ".backends",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
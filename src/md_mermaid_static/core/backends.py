@@ -0,0 +1,675 @@
+"""
+Render backends.
+
+A backend turns one diagram source into an artifact in a given format. The
+renderer owns everything around it (caching, deduplication, concurrency, PDF
+post-processing, writing), so backends can be swapped without touching the
+pipeline:
+
+- ``mmdc``: one mermaid-cli process per chart, with retries, hedging and
+  process-tree supervision
+- ``worker``: a long-lived browser worker with warm pages
+- ``fake``: deterministic placeholder artifacts rendered in-process, for
+  benchmarking and load-testing the pipeline without Node or a browser
+"""
+
+# asyncio is imported inside the async methods, see renderer.py
+import hashlib
+import html
+import logging
+import struct
+import subprocess
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
+
+from ..models.cli_config import CLIConfig
+from ..models.enums import OutputFormat
+from ..models.mermaid_config import MermaidRenderOptions
+from ..models.render_result import RenderResult
+from ..utils.tracing import async_span, span
+from .process import (
+    LatencyTracker,
+    backoff_delay,
+    is_transient_failure,
+    kill_process_tree,
+    popen_kwargs,
+    run_in_thread,
+)
+from .scheduler import AdaptiveLimiter
+from .worker import RenderWorker, RenderWorkerError
+
+logger = logging.getLogger(__name__)
+
+
+class RenderBackend(Protocol):
+    """Interface of render backends"""
+
+    name: str
+    # Whether several charts can share one invocation (see --batch)
+    supports_batch: bool
+
+    def start(self) -> None:
+        """Acquire long-lived resources, raising if the backend is unusable"""
+
+    def render(
+        self, source: str, options: MermaidRenderOptions, output_format: OutputFormat
+    ) -> Optional[RenderResult]:
+        """
+        Render one chart
+
+        Args:
+            source: Mermaid diagram source
+            options: Fully resolved render options
+            output_format: Format to render to (svg, png or pdf)
+
+        Returns:
+            The artifact, or None if rendering failed (the failure is logged)
+        """
+
+    async def render_async(
+        self, source: str, options: MermaidRenderOptions, output_format: OutputFormat
+    ) -> Optional[RenderResult]:
+        """Render one chart without blocking the event loop"""
+
+    def close(self) -> None:
+        """Release long-lived resources"""
+
+
+def _attempt_rank(attempt: Any) -> int:
+    """Order finished hedged attempts: successes, then failures, then errors"""
+    if attempt.exception() is not None:
+        return 2
+    return 0 if attempt.result().returncode == 0 else 1
+
+
+class MmdcBackend:
+    """Render each chart with its own mermaid-cli process"""
+
+    name = "mmdc"
+    supports_batch = True
+
+    def __init__(
+        self,
+        cli_config: CLIConfig,
+        build_command: Callable[[Path, Path, MermaidRenderOptions], List[str]],
+        limiter: Optional[AdaptiveLimiter] = None,
+        latencies: Optional[LatencyTracker] = None,
+    ):
+        """
+        Args:
+            cli_config: CLI configuration (timeouts, retries, hedging)
+            build_command: Builds the mermaid-cli command for input, output
+                and render options
+            limiter: Adaptive limiter tracking the memory of render processes
+            latencies: Latencies of successful renders, for hedging
+        """
+        self.cli_config = cli_config
+        self.build_command = build_command
+        self.limiter = limiter
+        self.latencies = latencies if latencies is not None else LatencyTracker()
+
+    def start(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def prepare(
+        self, options: MermaidRenderOptions, output_format: OutputFormat
+    ) -> List[str]:
+        """Build the command rendering a chart from stdin to stdout"""
+        if self.cli_config.output_format == OutputFormat.ENHANCED_SVG:
+            logger.info("Using enhanced SVG mode: rendering via PDF conversion")
+
+        # Read the source from stdin and write the artifact to stdout, so no
+        # temporary files are involved
+        cmd = self.build_command(Path("-"), Path("-"), options)
+        cmd.extend(["-e", output_format.value, "-q"])
+
+        # Display render command in debug mode
+        logger.debug(f"Render command: {' '.join(cmd)}")
+        # Print render options
+        set_options = dict(filter(lambda x: x[1], options.model_dump().items()))
+        logger.debug(f"Render options: {set_options}")
+        return cmd
+
+    def render(
+        self, source: str, options: MermaidRenderOptions, output_format: OutputFormat
+    ) -> Optional[RenderResult]:
+        """Run mermaid-cli, retrying transient failures with backoff"""
+        cmd = self.prepare(options, output_format)
+        started = time.monotonic()
+        attempts = 1 + max(0, self.cli_config.render_retries)
+        for attempt in range(1, attempts + 1):
+            attempt_started = time.monotonic()
+            with span("mmdc_attempt", attempt=attempt):
+                result = self._run_attempt(cmd, source.encode("utf-8"))
+            if self._render_succeeded(result):
+                self.latencies.record(time.monotonic() - attempt_started)
+                return self._result(result, output_format, started, attempt)
+
+            if attempt < attempts and is_transient_failure(
+                result.returncode, result.stderr
+            ):
+                delay = backoff_delay(attempt)
+                logger.warning(
+                    f"Render attempt {attempt} failed (code {result.returncode}), "
+                    f"retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
+                continue
+
+            self.check_result(result.returncode, "", result.stderr)
+            return None
+        return None
+
+    def _result(
+        self,
+        result: subprocess.CompletedProcess,
+        output_format: OutputFormat,
+        started: float,
+        attempts: int,
+    ) -> RenderResult:
+        return RenderResult(
+            data=result.stdout,
+            output_format=output_format,
+            backend=self.name,
+            elapsed=time.monotonic() - started,
+            attempts=attempts,
+        )
+
+    def _run_attempt(
+        self, cmd: List[str], source: bytes
+    ) -> subprocess.CompletedProcess:
+        """Run one render attempt, hedging it once it exceeds the p95 latency"""
+        timeout = self.cli_config.render_timeout
+        hedge_after = self.latencies.p95() if self.cli_config.hedge else None
+        if hedge_after is None:
+            return self.run_command(cmd, timeout, input=source)
+
+        processes: List[subprocess.Popen] = []
+        primary = run_in_thread(
+            self.run_command, cmd, timeout, processes.append, source
+        )
+        if wait([primary], timeout=hedge_after).done:
+            return primary.result()
+
+        if not self._acquire_hedge_slot():
+            return primary.result()
+        logger.info(
+            f"Render exceeded p95 latency ({hedge_after:.1f}s), starting hedged attempt"
+        )
+        pending = {primary}
+        try:
+            pending.add(
+                run_in_thread(self.run_command, cmd, timeout, processes.append, source)
+            )
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                # Prefer a success when both attempts finished together
+                for future in sorted(done, key=_attempt_rank):
+                    if future.exception() is not None:
+                        if pending:
+                            continue
+                        raise future.exception()
+                    result = future.result()
+                    if result.returncode == 0 or not pending:
+                        return result
+        finally:
+            # First success wins, reap the attempt still running
+            for process in processes:
+                if process.poll() is None:
+                    kill_process_tree(process.pid)
+            wait(pending)
+            if self.limiter:
+                self.limiter.release()
+
+    def _acquire_hedge_slot(self) -> bool:
+        """Take a concurrency slot for a hedged attempt, False if none is free"""
+        if self.limiter is None or self.limiter.try_acquire():
+            return True
+        logger.debug("No free render slot, not hedging")
+        return False
+
+    def run_command(
+        self,
+        cmd: List[str],
+        timeout: Optional[float] = None,
+        on_start: Optional[Callable[[subprocess.Popen], None]] = None,
+        input: Optional[bytes] = None,
+    ) -> subprocess.CompletedProcess:
+        """
+        Run a mermaid-cli command in its own process group
+
+        ``input`` is piped to stdin and stdout is returned as bytes, stderr as
+        text. On timeout the whole process tree is killed and the result has a
+        ``returncode`` of None. Memory is sampled in adaptive mode.
+        """
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            **popen_kwargs(),
+        )
+        if on_start:
+            on_start(process)
+        if self.limiter:
+            self.limiter.track(process.pid)
+        try:
+            stdout, stderr = process.communicate(input, timeout=timeout)
+            returncode = process.returncode
+        except subprocess.TimeoutExpired:
+            kill_process_tree(process.pid)
+            stdout, stderr = process.communicate()
+            stderr += f"\nRender timed out after {timeout}s".encode()
+            returncode = None
+        finally:
+            if self.limiter:
+                self.limiter.untrack(process.pid)
+        return subprocess.CompletedProcess(
+            cmd, returncode, stdout, stderr.decode(errors="replace")
+        )
+
+    def _render_succeeded(self, result: subprocess.CompletedProcess) -> bool:
+        """Check that a piped render exited cleanly and produced an artifact"""
+        if result.returncode == 0 and not result.stdout:
+            result.returncode = 1
+            result.stderr += "\nmermaid-cli produced no output"
+        return result.returncode == 0
+
+    def check_result(self, returncode: int, stdout: str, stderr: str) -> bool:
+        """Log mermaid-cli output and report whether the render succeeded"""
+        # Always print output for debugging
+        if stdout:
+            logger.debug(f"Command stdout: {stdout}")
+        if stderr:
+            logger.debug(f"Command stderr: {stderr}")
+
+        if returncode != 0:
+            logger.error(f"Rendering failed (code {returncode}): {stderr}")
+            return False
+        return True
+
+    async def render_async(
+        self, source: str, options: MermaidRenderOptions, output_format: OutputFormat
+    ) -> Optional[RenderResult]:
+        """Run mermaid-cli on the event loop, retrying transient failures"""
+        import asyncio
+
+        cmd = self.prepare(options, output_format)
+        started = time.monotonic()
+        attempts = 1 + max(0, self.cli_config.render_retries)
+        for attempt in range(1, attempts + 1):
+            attempt_started = time.monotonic()
+            with async_span("mmdc_attempt", attempt=attempt):
+                result = await self._run_attempt_async(cmd, source.encode("utf-8"))
+            if self._render_succeeded(result):
+                self.latencies.record(time.monotonic() - attempt_started)
+                return self._result(result, output_format, started, attempt)
+
+            if attempt < attempts and is_transient_failure(
+                result.returncode, result.stderr
+            ):
+                delay = backoff_delay(attempt)
+                logger.warning(
+                    f"Render attempt {attempt} failed (code {result.returncode}), "
+                    f"retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            self.check_result(result.returncode, "", result.stderr)
+            return None
+        return None
+
+    async def _run_attempt_async(
+        self, cmd: List[str], source: bytes
+    ) -> subprocess.CompletedProcess:
+        """Run one render attempt on the event loop, hedging slow renders"""
+        import asyncio
+
+        timeout = self.cli_config.render_timeout
+        primary = asyncio.ensure_future(self._run_command_async(cmd, timeout, source))
+        hedge_after = self.latencies.p95() if self.cli_config.hedge else None
+        if hedge_after is None:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        if not self._acquire_hedge_slot():
+            return await primary
+        logger.info(
+            f"Render exceeded p95 latency ({hedge_after:.1f}s), starting hedged attempt"
+        )
+        hedge = asyncio.ensure_future(self._run_command_async(cmd, timeout, source))
+
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in sorted(done, key=_attempt_rank):
+                    if task.exception() is not None:
+                        if pending:
+                            continue
+                        raise task.exception()
+                    result = task.result()
+                    if result.returncode == 0 or not pending:
+                        return result
+        finally:
+            # Cancelling kills the process tree of the attempt still running
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if self.limiter:
+                self.limiter.release()
+
+    async def _run_command_async(
+        self,
+        cmd: List[str],
+        timeout: Optional[float] = None,
+        input: Optional[bytes] = None,
+    ) -> subprocess.CompletedProcess:
+        """Run a mermaid-cli command in its own process group on the event loop"""
+        import asyncio
+
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE
+            if input is not None
+            else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            **popen_kwargs(),
+        )
+        if self.limiter:
+            self.limiter.track(process.pid)
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(input), timeout)
+            returncode = process.returncode
+        except asyncio.TimeoutError:
+            kill_process_tree(process.pid)
+            await process.wait()
+            stdout, stderr = b"", f"Render timed out after {timeout}s".encode()
+            returncode = None
+        except asyncio.CancelledError:
+            kill_process_tree(process.pid)
+            await process.wait()
+            raise
+        finally:
+            if self.limiter:
+                self.limiter.untrack(process.pid)
+        return subprocess.CompletedProcess(
+            cmd, returncode, stdout, stderr.decode(errors="replace")
+        )
+
+
+class WorkerBackend:
+    """Render in one long-lived browser worker instead of spawning mermaid-cli"""
+
+    name = "worker"
+    supports_batch = False
+
+    def __init__(
+        self,
+        launcher: List[str],
+        pages: int = 1,
+        render_timeout: Optional[float] = None,
+    ):
+        """
+        Args:
+            launcher: Command prefix running ``node`` with mermaid-cli available
+            pages: Number of warm browser pages
+            render_timeout: Seconds to wait for a single render
+        """
+        self.pages = pages
+        self.render_timeout = render_timeout
+        self.worker = RenderWorker(launcher, pages=pages)
+
+    def start(self) -> None:
+        # npx resolution and the browser launch of the worker
+        with span("launch_worker", pages=self.pages):
+            self.worker.start()
+        logger.info(f"Persistent render worker started ({self.pages} pages)")
+
+    def close(self) -> None:
+        self.worker.close()
+
+    def render(
+        self, source: str, options: MermaidRenderOptions, output_format: OutputFormat
+    ) -> Optional[RenderResult]:
+        started = time.monotonic()
+        future = self.worker.submit(
+            source, output_format.value, self._build_options(options)
+        )
+        try:
+            data = future.result(timeout=self.render_timeout)
+        except FutureTimeoutError:
+            self.worker.abandon(future)
+            raise RenderWorkerError(f"Render timed out after {self.render_timeout}s")
+        return RenderResult(
+            data=data,
+            output_format=output_format,
+            backend=self.name,
+            elapsed=time.monotonic() - started,
+        )
+
+    async def render_async(
+        self, source: str, options: MermaidRenderOptions, output_format: OutputFormat
+    ) -> Optional[RenderResult]:
+        import asyncio
+
+        started = time.monotonic()
+        future = self.worker.submit(
+            source, output_format.value, self._build_options(options)
+        )
+        try:
+            data = await asyncio.wait_for(
+                asyncio.wrap_future(future), self.render_timeout
+            )
+        except asyncio.TimeoutError:
+            self.worker.abandon(future)
+            raise RenderWorkerError(f"Render timed out after {self.render_timeout}s")
+        return RenderResult(
+            data=data,
+            output_format=output_format,
+            backend=self.name,
+            elapsed=time.monotonic() - started,
+        )
+
+    def _build_options(self, options: MermaidRenderOptions) -> Dict[str, Any]:
+        """Build render worker options, mirroring the mermaid-cli command line"""
+        worker_options: Dict[str, Any] = {
+            "width": options.width,
+            "height": options.height,
+            "backgroundColor": options.background_color,
+            "scale": options.scale,
+            "pdfFit": options.pdf_fit,
+            "svgId": options.svg_id,
+        }
+
+        # Custom themes are handled via config file and CSS
+        if options.theme and not options.custom_theme:
+            worker_options["theme"] = options.theme.value
+
+        if options.config_file:
+            config_path = Path(options.config_file)
+            if config_path.exists():
+                worker_options["configFile"] = str(config_path.resolve())
+            else:
+                logger.warning(f"Config file not found: {config_path}")
+
+        if options.css_file:
+            css_path = Path(options.css_file)
+            if css_path.exists():
+                worker_options["cssFile"] = str(css_path.resolve())
+            else:
+                logger.warning(f"CSS file not found: {css_path}")
+
+        return {k: v for k, v in worker_options.items() if v is not None}
+
+
+# Size of placeholders when the options set none, in pixels (points for PDF)
+FAKE_WIDTH = 200
+FAKE_HEIGHT = 100
+
+
+class FakeBackend:
+    """
+    Render deterministic placeholders in-process
+
+    The same source and options always produce the same bytes. Artifacts are
+    valid SVG, PNG and PDF files sized after the render options, so PDF
+    post-processing and everything downstream run exactly as with real renders.
+    """
+
+    name = "fake"
+    supports_batch = False
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Args:
+            latency: Seconds each render takes, to simulate a real engine
+        """
+        self.latency = latency
+
+    def start(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def render(
+        self, source: str, options: MermaidRenderOptions, output_format: OutputFormat
+    ) -> Optional[RenderResult]:
+        started = time.monotonic()
+        if self.latency:
+            time.sleep(self.latency)
+        return self._result(source, options, output_format, started)
+
+    async def render_async(
+        self, source: str, options: MermaidRenderOptions, output_format: OutputFormat
+    ) -> Optional[RenderResult]:
+        import asyncio
+
+        started = time.monotonic()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._result(source, options, output_format, started)
+
+    def _result(
+        self,
+        source: str,
+        options: MermaidRenderOptions,
+        output_format: OutputFormat,
+        started: float,
+    ) -> RenderResult:
+        digest = hashlib.sha256(
+            f"{source}\0{options.model_dump_json()}".encode("utf-8")
+        ).hexdigest()
+        size = (options.width or FAKE_WIDTH, options.height or FAKE_HEIGHT)
+        if output_format == OutputFormat.PNG:
+            data = fake_png(digest, size)
+        elif output_format == OutputFormat.PDF:
+            data = fake_pdf(digest, size)
+        else:
+            data = fake_svg(source, digest, size, options.background_color)
+        return RenderResult(
+            data=data,
+            output_format=output_format,
+            backend=self.name,
+            elapsed=time.monotonic() - started,
+        )
+
+
+def _fake_color(digest: str) -> Tuple[int, int, int]:
+    """Light color derived from a digest, so different charts look different"""
+    return tuple(128 + int(digest[i : i + 2], 16) // 2 for i in (0, 2, 4))
+
+
+def fake_svg(
+    source: str,
+    digest: str,
+    size: Tuple[int, int],
+    background_color: Optional[str] = None,
+) -> bytes:
+    """Placeholder SVG labelled with the first line of the diagram source"""
+    width, height = size
+    lines = source.strip().splitlines()
+    label = html.escape(lines[0].strip() if lines else "", quote=True)
+    fill = "#%02x%02x%02x" % _fake_color(digest)
+    background = (
+        f'<rect width="100%" height="100%" '
+        f'fill="{html.escape(background_color, quote=True)}"/>'
+        if background_color
+        else ""
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" data-fingerprint="{digest}">'
+        f"{background}"
+        f'<rect x="1" y="1" width="{width - 2}" height="{height - 2}" '
+        f'fill="{fill}" stroke="#333"/>'
+        f'<text x="8" y="20" font-family="monospace" font-size="12">{label}</text>'
+        f"</svg>"
+    ).encode("utf-8")
+
+
+def fake_png(digest: str, size: Tuple[int, int]) -> bytes:
+    """Placeholder PNG filled with a color derived from the digest"""
+    width, height = size
+
+    def chunk(kind: bytes, payload: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(payload))
+            + kind
+            + payload
+            + struct.pack(">I", zlib.crc32(kind + payload))
+        )
+
+    row = b"\x00" + bytes(_fake_color(digest)) * width
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(row * height, 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+def fake_pdf(digest: str, size: Tuple[int, int]) -> bytes:
+    """Single-page placeholder PDF filled with a color derived from the digest"""
+    width, height = size
+    red, green, blue = (channel / 255 for channel in _fake_color(digest))
+    content = (f"{red:.3f} {green:.3f} {blue:.3f} rg 0 0 {width} {height} re f").encode(
+        "ascii"
+    )
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] "
+        f"/Contents 4 0 R /Resources << >> >>".encode("ascii"),
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+    ]
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        pdf += b"%010d 00000 n \n" % offset
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return bytes(pdf)
@@ -0,0 +1,284 @@
+"""
+Content-addressed render cache helpers.
+
+Rendered charts are stored as ``media/mermaid_<fingerprint>.<ext>``, where the
+fingerprint covers everything that can change the artifact. A file with that
+name therefore always holds the right output and can be reused without
+running mermaid-cli again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from ..config.env import get_mermaid_cli_version
+from ..models.enums import OutputFormat
+from ..models.mermaid_config import MermaidRenderOptions
+
+logger = logging.getLogger(__name__)
+
+# Bump when the fingerprint payload changes shape
+FINGERPRINT_VERSION = 1
+
+# (path, mtime_ns, size) -> sha256, so theme files are hashed once per change
+_digest_cache: Dict[Tuple[str, int, int], str] = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(path: Optional[str]) -> Optional[str]:
+    """Get the sha256 digest of a file, memoized by path, mtime and size"""
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _digest_lock:
+        digest = _digest_cache.get(key)
+    if digest is None:
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            # Hash in chunks, inputs can be larger than memory
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+        with _digest_lock:
+            _digest_cache[key] = digest
+    return digest
+
+
+def compute_fingerprint(
+    content: str,
+    options: MermaidRenderOptions,
+    output_format: OutputFormat,
+    backend: Optional[str] = None,
+) -> str:
+    """
+    Compute the render fingerprint of a chart
+
+    Args:
+        content: Mermaid diagram source
+        options: Fully resolved render options
+        output_format: Requested output format
+        backend: Render backend, only for backends whose artifacts differ from
+            mermaid-cli's (e.g. the fake backend's placeholders)
+
+    Returns:
+        Hex digest identifying the rendered artifact
+    """
+    resolved = options.model_dump(mode="json")
+    # Theme files are identified by their contents, not by where they live
+    resolved["config_file"] = file_digest(options.config_file)
+    resolved["css_file"] = file_digest(options.css_file)
+
+    payload = {
+        "version": FINGERPRINT_VERSION,
+        "source": content.replace("\r\n", "\n"),
+        "options": resolved,
+        "format": output_format.value,
+        "mermaid_cli": get_mermaid_cli_version(),
+    }
+    if backend:
+        payload["backend"] = backend
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def temporary_sibling(path: Path) -> Path:
+    """Get a unique temporary path next to ``path`` for atomic replacement"""
+    return path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    """Clone ``src`` into ``dst`` with a copy-on-write reflink (Linux only)"""
+    if not sys.platform.startswith("linux"):
+        return False
+
+    import fcntl
+
+    FICLONE = 0x40049409
+    try:
+        with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+        return True
+    except OSError:
+        if dst.exists():
+            dst.unlink()
+        return False
+
+
+def materialize(src: Path, dst: Path) -> str:
+    """
+    Place a copy of ``src`` at ``dst`` as cheaply as the filesystem allows
+
+    Tries a reflink, then a hardlink, then falls back to copying. The target
+    is replaced atomically.
+
+    Returns:
+        The method used: "reflink", "hardlink" or "copy"
+    """
+    temp_dst = temporary_sibling(dst)
+    try:
+        if _reflink(src, temp_dst):
+            method = "reflink"
+        else:
+            try:
+                os.link(src, temp_dst)
+                method = "hardlink"
+            except OSError:
+                shutil.copyfile(src, temp_dst)
+                method = "copy"
+        os.replace(temp_dst, dst)
+    finally:
+        if temp_dst.exists():
+            temp_dst.unlink()
+    return method
+
+
+class SharedRenderCache:
+    """
+    User-level render cache shared by every project on the machine.
+
+    Artifacts are stored by file name (which embeds the render fingerprint)
+    and materialized into each project's media directory on a hit. The store
+    is capped in size; the least recently used artifacts are evicted first.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        """
+        Args:
+            root: Cache store directory
+            max_bytes: Size cap of the store
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _entry_path(self, name: str) -> Path:
+        """Get the store path of an artifact, sharded by fingerprint prefix"""
+        stem = name.split("_", 1)[-1]
+        return self.root / stem[:2] / name
+
+    def fetch(self, name: str, dst: Path) -> bool:
+        """
+        Materialize a cached artifact into ``dst``
+
+        Args:
+            name: Artifact file name (``mermaid_<fingerprint>.<ext>``)
+            dst: Destination path in the project media directory
+
+        Returns:
+            True on a cache hit
+        """
+        entry = self._entry_path(name)
+        try:
+            # Bump mtime so eviction sees this entry as recently used
+            os.utime(entry)
+            method = materialize(entry, dst)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.debug(f"Shared cache fetch failed for {name}: {e}")
+            return False
+
+        logger.debug(f"Shared cache hit ({method}): {entry}")
+        return True
+
+    def store(self, src: Path) -> None:
+        """Add a rendered artifact to the store"""
+        entry = self._entry_path(src.name)
+        if entry.exists():
+            return
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            materialize(src, entry)
+            size = entry.stat().st_size
+        except OSError as e:
+            logger.debug(f"Shared cache store failed for {src.name}: {e}")
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += size
+            over_budget = self._size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Evict least recently used artifacts until the store fits its cap
+
+        Returns:
+            Number of evicted artifacts
+        """
+        with self._lock:
+            entries = [
+                (stat.st_mtime, stat.st_size, path)
+                for path, stat in self._iter_entries()
+            ]
+
+            total = sum(size for _, size, _ in entries)
+            # Evict down to a low watermark so we don't rescan on every store
+            target = int(self.max_bytes * 0.9)
+            evicted = 0
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                evicted += 1
+
+            self._size = total
+
+        if evicted:
+            logger.debug(f"Evicted {evicted} artifacts from shared cache {self.root}")
+        return evicted
+
+    def _iter_entries(self) -> Iterator[Tuple[str, os.stat_result]]:
+        """
+        Iterate over stored artifacts and their stat, skipping in-progress
+        temporary files
+
+        Other processes share the store and may evict concurrently, entries
+        that vanish during the scan are skipped.
+        """
+        try:
+            shards = list(os.scandir(self.root))
+        except OSError:
+            return
+        for shard in shards:
+            try:
+                if not shard.is_dir(follow_symlinks=False):
+                    continue
+                entries = list(os.scandir(shard.path))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                yield entry.path, stat
+
+    def _scan_size(self) -> int:
+        """Get the current total size of the store"""
+        return sum(stat.st_size for _, stat in self._iter_entries())
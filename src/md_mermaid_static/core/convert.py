@@ -0,0 +1,48 @@
+"""
+PDF post-processing for rendered charts.
+
+Kept as module-level functions on plain bytes so they can run in a process
+pool: PyMuPDF holds the GIL for long stretches, which would otherwise stall
+the threads driving mermaid-cli. PyMuPDF is imported on first use, most runs
+never convert a PDF.
+"""
+
+import time
+from typing import Tuple
+
+from ..models.enums import OutputFormat
+from ..utils.tracing import span
+
+
+def convert_pdf(data: bytes, output_format: OutputFormat, dpi: int = 300) -> bytes:
+    """
+    Convert the first page of a rendered PDF
+
+    Args:
+        data: PDF document bytes
+        output_format: Target format (SVG, enhanced SVG or PNG)
+        dpi: Resolution for PNG output
+
+    Returns:
+        The converted artifact bytes
+    """
+    with span("convert_pdf", format=output_format.value, bytes=len(data)):
+        import pymupdf
+
+        doc = pymupdf.open(stream=data, filetype="pdf")
+        try:
+            page = doc[0]  # Get first page
+            if output_format in (OutputFormat.SVG, OutputFormat.ENHANCED_SVG):
+                return page.get_svg_image().encode("utf-8")
+            if output_format == OutputFormat.PNG:
+                return page.get_pixmap(dpi=dpi).tobytes("png")
+        finally:
+            doc.close()
+    raise ValueError(f"Conversion from PDF to {output_format.value} is not supported")
+
+
+def convert_pdf_timed(data: bytes, output_format: OutputFormat) -> Tuple[bytes, float]:
+    """Convert a rendered PDF, also returning the conversion time in seconds"""
+    started = time.perf_counter()
+    converted = convert_pdf(data, output_format)
+    return converted, time.perf_counter() - started
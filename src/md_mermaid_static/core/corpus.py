@@ -0,0 +1,445 @@
+"""
+Processing of many Markdown documents in one run.
+
+Inputs may be files, directories (searched recursively) and glob patterns. The
+directory structure below each directory or glob base is mirrored into the
+output directory. All documents share one renderer: charts from every
+document feed a single bounded render pool, identical charts are rendered once
+across the whole corpus, and themes and the persistent worker are set up once.
+
+With ``parse_workers`` set, reading, parsing and rewriting documents moves to a
+process pool. Workers finish documents whose charts are all rendered already
+and send back only the charts still missing; the coordinator renders those and
+hands the document back to a worker to be written.
+"""
+
+import glob
+import logging
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..models.cli_config import CLIConfig
+from ..models.document_scan import ChartRequest, DocumentScan
+from ..models.mermaid_block import MermaidBlock
+from ..models.run_report import BlockReport
+from ..utils.logger import logger as app_logger
+from ..utils.tracing import span, submit_traced
+from .processor import MarkdownProcessor
+from .renderer import MermaidRenderer
+
+logger = logging.getLogger(__name__)
+
+MARKDOWN_SUFFIXES = (".md", ".markdown")
+
+_GLOB_MAGIC = re.compile(r"[*?[]")
+
+
+def _glob_base(pattern: str) -> Path:
+    """Leading directories of a glob pattern that contain no wildcards"""
+    parts = []
+    for part in Path(pattern).parts[:-1]:
+        if _GLOB_MAGIC.search(part):
+            break
+        parts.append(part)
+    return Path(*parts) if parts else Path(".")
+
+
+def _is_excluded(path: Path, root: Path, excluded: List[Path]) -> bool:
+    """Skip hidden files and directories below ``root`` and the output tree"""
+    if any(part.startswith(".") for part in path.relative_to(root).parts):
+        return True
+    resolved = path.resolve()
+    return any(resolved == ex or ex in resolved.parents for ex in excluded)
+
+
+def discover_inputs(
+    patterns: Iterable[str], exclude: Iterable[Path] = ()
+) -> List[Tuple[Path, Path]]:
+    """
+    Expand files, directories and glob patterns into Markdown documents
+
+    Args:
+        patterns: Input files, directories or glob patterns
+        exclude: Directories to skip, e.g. the output directory
+
+    Returns:
+        (input file, output path relative to the output directory) pairs
+
+    Raises:
+        FileNotFoundError: If a pattern matches nothing
+        ValueError: If two inputs would be written to the same output
+    """
+    excluded = [Path(path).resolve() for path in exclude]
+    found: List[Tuple[Path, Path]] = []
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_file():
+            found.append((path, Path(path.name)))
+            continue
+
+        if path.is_dir():
+            root = path
+            matches = [
+                Path(dirpath) / name
+                for dirpath, _, filenames in os.walk(root)
+                for name in filenames
+                if name.lower().endswith(MARKDOWN_SUFFIXES)
+            ]
+        elif _GLOB_MAGIC.search(pattern):
+            root = _glob_base(pattern)
+            matches = [Path(match) for match in glob.glob(pattern, recursive=True)]
+            matches = [match for match in matches if match.is_file()]
+        else:
+            raise FileNotFoundError(f"Input not found: {pattern}")
+
+        matches = [
+            match
+            for match in sorted(matches)
+            if not _is_excluded(match, root, excluded)
+        ]
+        if not matches:
+            raise FileNotFoundError(f"No Markdown files found in: {pattern}")
+        found.extend((match, match.relative_to(root)) for match in matches)
+
+    # The same file listed twice is processed once
+    inputs: Dict[Path, Tuple[Path, Path]] = {}
+    for input_file, output_name in found:
+        key = input_file.resolve()
+        if key not in inputs:
+            inputs[key] = (input_file, output_name)
+
+    outputs: Dict[Path, Path] = {}
+    for input_file, output_name in inputs.values():
+        other = outputs.setdefault(output_name, input_file)
+        if other != input_file:
+            raise ValueError(
+                f"{other} and {input_file} would both be written to {output_name}"
+            )
+    return list(inputs.values())
+
+
+# Per-process state of parse workers
+_worker_config: Optional[CLIConfig] = None
+_worker_renderer: Optional[MermaidRenderer] = None
+
+
+def _init_parse_worker(cli_config: CLIConfig, log_level: int) -> None:
+    """Set up a parse worker process, logging at the coordinator's level"""
+    global _worker_config, _worker_renderer
+    from ..utils.logger import logger as app_logger, setup_logging
+
+    setup_logging(debug_mode=cli_config.debug)
+    app_logger.setLevel(log_level)
+    CLIConfig.set_instance(cli_config)
+    _worker_config = cli_config
+    # Only used to fingerprint charts and look them up, never to render
+    _worker_renderer = MermaidRenderer(cli_config.output_dir, cli_config)
+
+
+def _scan_document(input_file: str, output_name: str) -> DocumentScan:
+    """
+    Parse a document in a parse worker
+
+    Returns:
+        The finished document when all of its charts are rendered already,
+        otherwise the charts the coordinator has to render
+    """
+    with span("scan_document", file=input_file):
+        return _scan(input_file, output_name)
+
+
+def _scan(input_file: str, output_name: str) -> DocumentScan:
+    """Parse a document, finishing it when its charts are all rendered"""
+    processor = MarkdownProcessor(
+        input_file, _worker_config, _worker_renderer, Path(output_name)
+    )
+    if _worker_config.incremental:
+        output_file = processor._skip_unchanged()
+        if output_file:
+            return DocumentScan(
+                input_file=input_file,
+                output_file=str(output_file),
+                blocks=processor.block_reports,
+            )
+
+    stat = processor.input_file.stat()
+    content, blocks = processor._parse()
+    if not blocks:
+        output_file = processor._save_unchanged(content)
+        return DocumentScan(input_file=input_file, output_file=str(output_file))
+
+    rendered_blocks = []
+    missing = []
+    for i, block in enumerate(blocks):
+        image_path = _worker_renderer.lookup_rendered(block)
+        if image_path is None:
+            missing.append(
+                ChartRequest(
+                    index=i,
+                    content=block.content,
+                    config=block.config,
+                    line_start=block.line_start,
+                    line_end=block.line_end,
+                )
+            )
+        rendered_blocks.append((block, image_path))
+
+    if not missing:
+        output_file = processor._finish(content, blocks, rendered_blocks)
+        return DocumentScan(
+            input_file=input_file,
+            output_file=str(output_file),
+            blocks=processor.block_reports,
+        )
+    return DocumentScan(
+        input_file=input_file,
+        missing=missing,
+        input_size=stat.st_size,
+        input_mtime_ns=stat.st_mtime_ns,
+    )
+
+
+def _finish_document(
+    input_file: str,
+    output_name: str,
+    input_state: Tuple[int, int],
+    rendered: Dict[int, Optional[str]],
+) -> DocumentScan:
+    """
+    Write a document in a parse worker once its missing charts are rendered
+
+    The document is parsed again instead of being shipped between processes.
+
+    Args:
+        input_file: Markdown file to write the output of
+        output_name: Output path relative to the output directory
+        input_state: Size and mtime of the input when it was scanned
+        rendered: Image path of each chart the coordinator rendered, by index
+    """
+    with span("finish_document", file=input_file):
+        return _finish(input_file, output_name, input_state, rendered)
+
+
+def _finish(
+    input_file: str,
+    output_name: str,
+    input_state: Tuple[int, int],
+    rendered: Dict[int, Optional[str]],
+) -> DocumentScan:
+    """Parse a document again and write it with the rendered charts"""
+    processor = MarkdownProcessor(
+        input_file, _worker_config, _worker_renderer, Path(output_name)
+    )
+    stat = processor.input_file.stat()
+    if (stat.st_size, stat.st_mtime_ns) != input_state:
+        raise RuntimeError(f"{input_file} changed while it was being processed")
+    if _worker_config.incremental:
+        # Records the input state for the manifest
+        processor._skip_unchanged()
+
+    content, blocks = processor._parse()
+    rendered_blocks = []
+    for i, block in enumerate(blocks):
+        if i in rendered:
+            image_path = Path(rendered[i]) if rendered[i] else None
+        else:
+            image_path = _worker_renderer.lookup_rendered(block)
+        rendered_blocks.append((block, image_path))
+    output_file = processor._finish(content, blocks, rendered_blocks)
+    return DocumentScan(
+        input_file=input_file,
+        output_file=str(output_file),
+        blocks=processor.block_reports,
+    )
+
+
+class CorpusProcessor:
+    """Process many Markdown documents through one shared render pool"""
+
+    def __init__(
+        self, inputs: List[Tuple[Path, Path]], cli_config: CLIConfig = CLIConfig()
+    ):
+        """
+        Args:
+            inputs: (input file, relative output path) pairs from discover_inputs
+            cli_config: CLI configuration
+        """
+        self.inputs = inputs
+        self.cli_config = cli_config
+        self.renderer = MermaidRenderer(
+            cli_config.output_dir, CLIConfig.get_instance() or cli_config
+        )
+        if cli_config.concurrent:
+            self.renderer.start_render_pool()
+        # Run report records of every processed block (--report)
+        self.block_reports: List[BlockReport] = []
+
+    def __enter__(self) -> "CorpusProcessor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the shared renderer"""
+        self.renderer.close()
+
+    def _documents_in_flight(self) -> int:
+        """
+        Documents processed at once
+
+        Twice the render workers, so that while some documents are being
+        parsed or written the others keep the render pool busy. Sequential
+        mode processes one document at a time.
+        """
+        if not self.cli_config.concurrent:
+            return 1
+        return 2 * (self.cli_config.max_workers or os.cpu_count() or 1)
+
+    def _process_one(self, input_file: Path, output_name: Path) -> Optional[Path]:
+        """Process one document, errors are logged and reported as None"""
+        processor = MarkdownProcessor(
+            str(input_file), self.cli_config, self.renderer, output_name
+        )
+        try:
+            output_file = processor.process()
+            self.block_reports.extend(processor.block_reports)
+            return output_file
+        except Exception as e:
+            logger.error(
+                f"Error processing {input_file}: {e}",
+                exc_info=logger.isEnabledFor(logging.DEBUG),
+            )
+            return None
+        finally:
+            processor.close()
+
+    def _render_missing(
+        self, pool: ProcessPoolExecutor, scan: DocumentScan, output_name: Path
+    ) -> DocumentScan:
+        """Render the charts a parse worker reported missing, then write the document"""
+        blocks = [
+            MermaidBlock(
+                content=chart.content,
+                config=chart.config,
+                line_start=chart.line_start,
+                line_end=chart.line_end,
+            )
+            for chart in scan.missing
+        ]
+        rendered_blocks = self.renderer.render_blocks(blocks)
+        rendered = {
+            chart.index: str(image_path) if image_path else None
+            for chart, (_, image_path) in zip(scan.missing, rendered_blocks)
+        }
+        finished = submit_traced(
+            pool,
+            _finish_document,
+            scan.input_file,
+            str(output_name),
+            (scan.input_size, scan.input_mtime_ns),
+            rendered,
+        ).result()
+        if finished.blocks:
+            # Only this process knows how the missing charts were rendered
+            for chart, (block, image_path) in zip(scan.missing, rendered_blocks):
+                finished.blocks[chart.index] = self.renderer.block_report(
+                    block, scan.input_file, image_path
+                )
+        return finished
+
+    def _process_in_workers(self, executor: ThreadPoolExecutor) -> List[Future]:
+        """
+        Process documents with parse workers, rendering in this process
+
+        Returns:
+            A future per document, resolving to the DocumentScan of the
+            finished document
+        """
+        workers = self.cli_config.parse_workers
+        logger.info(f"Parsing with {workers} processes")
+        # spawn: forking a process that runs render threads is unsafe
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_parse_worker,
+            initargs=(self.cli_config, app_logger.getEffectiveLevel()),
+        )
+        try:
+            scans = {
+                submit_traced(
+                    pool, _scan_document, str(input_file), str(output_name)
+                ): i
+                for i, (input_file, output_name) in enumerate(self.inputs)
+            }
+            futures: List[Future] = [None] * len(self.inputs)
+            for scan_future in as_completed(scans):
+                i = scans[scan_future]
+                futures[i] = scan_future
+                if scan_future.exception() is None and scan_future.result().missing:
+                    futures[i] = executor.submit(
+                        self._render_missing,
+                        pool,
+                        scan_future.result(),
+                        self.inputs[i][1],
+                    )
+            # Documents go back to the workers to be written
+            wait(futures)
+        finally:
+            pool.shutdown()
+        return futures
+
+    def process(self) -> List[Tuple[Path, Optional[Path]]]:
+        """
+        Process every document
+
+        Returns:
+            (input file, output file) pairs, the output is None if the
+            document failed
+        """
+        started = time.monotonic()
+        logger.info(f"Processing {len(self.inputs)} Markdown files")
+
+        with ThreadPoolExecutor(
+            max_workers=self._documents_in_flight(), thread_name_prefix="document"
+        ) as executor:
+            if self.cli_config.parse_workers:
+                futures = self._process_in_workers(executor)
+            else:
+                futures = [
+                    executor.submit(self._process_one, input_file, output_name)
+                    for input_file, output_name in self.inputs
+                ]
+
+        results = []
+        for (input_file, _), future in zip(self.inputs, futures):
+            try:
+                output_file = future.result()
+            except Exception as e:
+                logger.error(
+                    f"Error processing {input_file}: {e}",
+                    exc_info=logger.isEnabledFor(logging.DEBUG),
+                )
+                output_file = None
+            if isinstance(output_file, DocumentScan):
+                self.block_reports.extend(output_file.blocks)
+                output_file = output_file.output_file
+            results.append((input_file, Path(output_file) if output_file else None))
+
+        failed = sum(1 for _, output_file in results if output_file is None)
+        logger.info(
+            f"Processed {len(results)} files in {time.monotonic() - started:.2f}s"
+            + (f", {failed} failed" if failed else "")
+        )
+        return results
@@ -0,0 +1,82 @@
+"""
+Per-document manifests for incremental processing.
+
+After a document is processed, a manifest recording the input hash, the
+settings, the theme files its charts used and every block's fingerprint,
+span and media file is written next to the output. A later run compares
+against it to skip unchanged documents without parsing or rendering them.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+from ..config.env import get_mermaid_cli_version
+from ..models.cli_config import CLIConfig
+from ..models.enums import RenderBackendType
+from ..models.manifest import DocumentManifest
+from .cache import FINGERPRINT_VERSION, file_digest, temporary_sibling
+
+logger = logging.getLogger(__name__)
+
+# Bump when the manifest layout changes
+MANIFEST_VERSION = 2
+
+# CLI settings that change the rendered images or the output Markdown
+OUTPUT_SETTINGS = {
+    "output_format",
+    "theme",
+    "custom_theme",
+    "width",
+    "height",
+    "background_color",
+    "scale",
+    "pdf_fit",
+    "themes_dir",
+}
+
+
+def manifest_path(output_file: Path) -> Path:
+    """Get the manifest path of an output file"""
+    return output_file.with_name(f".{output_file.name}.manifest.json")
+
+
+def settings_digest(cli_config: CLIConfig) -> str:
+    """Digest of every setting that affects a document's output"""
+    payload = cli_config.model_dump(mode="json", include=OUTPUT_SETTINGS)
+    payload["config_file"] = file_digest(cli_config.config_file)
+    payload["css_file"] = file_digest(cli_config.css_file)
+    payload["fingerprint_version"] = FINGERPRINT_VERSION
+    payload["mermaid_cli"] = get_mermaid_cli_version()
+    if cli_config.backend == RenderBackendType.FAKE:
+        # Placeholder images must never satisfy a real run
+        payload["backend"] = cli_config.backend.value
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def load_manifest(path: Path) -> Optional[DocumentManifest]:
+    """Load a manifest, None if missing, unreadable or from another version"""
+    try:
+        manifest = DocumentManifest.model_validate_json(path.read_bytes())
+    except (OSError, ValueError) as e:
+        if path.exists():
+            logger.debug(f"Ignoring unreadable manifest {path}: {e}")
+        return None
+    if manifest.version != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(manifest: DocumentManifest, path: Path) -> None:
+    """Write a manifest atomically"""
+    temp_path = temporary_sibling(path)
+    try:
+        temp_path.write_text(manifest.model_dump_json(indent=2), encoding="utf-8")
+        os.replace(temp_path, path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
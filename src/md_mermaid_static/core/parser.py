@@ -3,11 +3,65 @@ Markdown parser for extracting Mermaid code blocks.
 """
 
 import re
-import yaml
-from typing import List, Tuple, Dict, Any
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from md_mermaid_static.models import MermaidBlock, MermaidConfig, Theme
-from md_mermaid_static.utils import logger
+from pydantic import ConfigDict
+
+from md_mermaid_static.models import (
+    MermaidBlock,
+    MermaidConfig,
+    MermaidRenderOptions,
+    Theme,
+)
+from md_mermaid_static.models.mermaid_block import block_brief, block_render_options
+from md_mermaid_static.utils import logger, tracing
+
+# Flat ``key: value`` header lines, parsed without YAML
+FLAT_LINE_PATTERN = re.compile(r"([^\W\d][\w-]*):(?:[ \t]+(.*?))?[ \t]*")
+
+# Values whose YAML type is obvious; anything else goes through YAML
+PLAIN_STRING_PATTERN = re.compile(r"[^\W\d_][^:#\x00-\x1f]*")
+QUOTED_STRING_PATTERN = re.compile(r"\"([^\"\\]*)\"|'([^']*)'")
+INT_PATTERN = re.compile(r"0|[1-9][0-9]*")
+FLOAT_PATTERN = re.compile(r"[0-9]+\.[0-9]+")
+
+# Plain scalars YAML resolves to booleans or null
+YAML_KEYWORDS = {"yes", "no", "true", "false", "on", "off", "null"}
+
+
+def parse_flat_header(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse a frontmatter header made only of flat ``key: value`` lines
+
+    Returns:
+        The same mapping ``yaml.safe_load`` would produce, or None when the
+        header uses anything beyond simple scalars and must go through YAML
+    """
+    config: Dict[str, Any] = {}
+    for line in text.split("\n"):
+        if not line.strip():
+            continue
+        match = FLAT_LINE_PATTERN.fullmatch(line)
+        if not match:
+            return None
+
+        key, value = match.groups()
+        if not value:
+            config[key] = None
+        elif INT_PATTERN.fullmatch(value):
+            config[key] = int(value)
+        elif FLOAT_PATTERN.fullmatch(value):
+            config[key] = float(value)
+        elif QUOTED_STRING_PATTERN.fullmatch(value):
+            config[key] = value[1:-1]
+        elif PLAIN_STRING_PATTERN.fullmatch(value) and (
+            value.lower() not in YAML_KEYWORDS
+        ):
+            config[key] = value
+        else:
+            return None
+    return config
 
 
 class MarkdownParser:
@@ -22,21 +76,55 @@ class MarkdownParser:
     # Support Mermaid directive syntax
     MERMAID_DIRECTIVE_PATTERN = re.compile(r":::mermaid\s*\n(.*?)\n:::", re.DOTALL)
 
+    # Every supported style in one pattern, used for the single-pass scan
+    MERMAID_FENCE_PATTERN = re.compile(
+        r"```mermaid\s*\n(.*?)\n\s*```|:::mermaid\s*\n(.*?)\n:::", re.DOTALL
+    )
+
     @staticmethod
     def parse_frontmatter(content: str) -> Tuple[Dict[str, Any], str]:
         """Parse frontmatter and actual content"""
         if content.startswith("---\n"):
             parts = content.split("---\n", 2)
             if len(parts) >= 3:
-                try:
-                    config = yaml.safe_load(parts[1])
-                    logger.debug(f"Parsed config from frontmatter: {config}")
-                    return config or {}, parts[2]
-                except yaml.YAMLError as e:
-                    logger.warning(f"Failed to parse frontmatter: {str(e)}")
+                config = MarkdownParser._load_frontmatter(parts[1])
+                if config is None:
                     return {}, content
+                # The parsed header is cached, hand out a copy
+                return dict(config), parts[2]
         return {}, content
 
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _load_frontmatter(header: str) -> Optional[Dict[str, Any]]:
+        """Parse a frontmatter header, memoized by its text (None if invalid)"""
+        config = parse_flat_header(header)
+        if config is None:
+            # Imported here, most headers never need a YAML parser
+            import yaml
+
+            # libyaml-backed loader when PyYAML was built with it
+            loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+            try:
+                config = yaml.load(header, Loader=loader) or {}
+            except yaml.YAMLError as e:
+                logger.warning(f"Failed to parse frontmatter: {str(e)}")
+                return None
+            if not isinstance(config, dict):
+                logger.warning(f"Frontmatter is not a mapping: {config!r}")
+                return None
+        logger.debug(f"Parsed config from frontmatter: {config}")
+        return config
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _load_block_config(header: str) -> Optional["SharedBlockConfig"]:
+        """Build the normalized block config of a header, memoized by its text"""
+        config = MarkdownParser._load_frontmatter(header)
+        if config is None:
+            return None
+        return SharedBlockConfig(**MarkdownParser._normalize_config_keys(config))
+
     @staticmethod
     def _normalize_config_keys(config: Dict[str, Any]) -> Dict[str, Any]:
         """Normalize config keys (convert hyphens to underscores)"""
@@ -67,65 +155,225 @@ class MarkdownParser:
         logger.debug(f"Normalized config: {normalized_config}")
         return normalized_config
 
-    def _extract_blocks(
-        self, pattern: re.Pattern, markdown_content: str
-    ) -> List[MermaidBlock]:
-        """Extract Mermaid code blocks from Markdown content"""
-        blocks = []
+    def _split_frontmatter(
+        self, source: str, start: int, end: int
+    ) -> Tuple[Optional["SharedBlockConfig"], int]:
+        """
+        Locate the frontmatter of the fence body ``source[start:end]``
+
+        Returns:
+            The cached block config (None without valid frontmatter) and the
+            offset where the diagram source starts
+        """
+        if not source.startswith("---\n", start, end):
+            return None, start
+        separator = source.find("---\n", start + 4, end)
+        if separator == -1:
+            return None, start
+        # Identical headers are parsed and normalized only once
+        config = self._load_block_config(source[start + 4 : separator])
+        if config is None:
+            return None, start
+        return config, separator + 4
+
+    def _build_block(
+        self,
+        content: str,
+        line_start: int,
+        line_end: int,
+        span: Tuple[Optional[int], Optional[int]] = (None, None),
+    ) -> MermaidBlock:
+        """Create a block from the body of a Mermaid fence"""
+        config, body_start = self._split_frontmatter(content, 0, len(content))
+        return BlockSpan(
+            content, body_start, len(content), config, line_start, line_end, *span
+        ).to_block()
+
+    def _scan(self, pattern: re.Pattern, markdown_content: str) -> List["BlockSpan"]:
+        """Find Mermaid code blocks matching ``pattern`` in document order"""
+        spans = []
+        # Line numbers are counted incrementally between matches, so the
+        # document is walked once no matter how many blocks it holds
+        line, position = 1, 0
 
         for match in pattern.finditer(markdown_content):
-            content = match.group(1)
-            config_dict, mermaid_content = self.parse_frontmatter(content)
-
-            # Normalize config keys
-            normalized_config = self._normalize_config_keys(config_dict)
-
-            # Calculate line numbers
-            line_start = markdown_content.count("\n", 0, match.start()) + 1
-            line_end = markdown_content.count("\n", 0, match.end()) + 1
-
-            # Create block
-            block = MermaidBlock(
-                content=mermaid_content.strip(),
-                config=MermaidConfig(**normalized_config),
-                line_start=line_start,
-                line_end=line_end,
+            line += markdown_content.count("\n", position, match.start())
+            line_end = line + markdown_content.count("\n", match.start(), match.end())
+            position = match.end()
+
+            # Spans cover the whole fence lines, like the line numbers do
+            span_start = markdown_content.rfind("\n", 0, match.start()) + 1
+            span_end = markdown_content.find("\n", match.end())
+            if span_end == -1:
+                span_end = len(markdown_content)
+
+            # The body is whichever alternative of the pattern matched
+            group = match.lastindex or 1
+            config, body_start = self._split_frontmatter(
+                markdown_content, match.start(group), match.end(group)
             )
+            spans.append(
+                BlockSpan(
+                    markdown_content,
+                    body_start,
+                    match.end(group),
+                    config,
+                    line,
+                    line_end,
+                    span_start,
+                    span_end,
+                )
+            )
+            line = line_end
 
-            # Log found code block
-            logger.debug(f"Found Mermaid block (lines {line_start}-{line_end})")
-            blocks.append(block)
+        return spans
 
-        return blocks
+    def _extract_blocks(
+        self, pattern: re.Pattern, markdown_content: str
+    ) -> List[MermaidBlock]:
+        """Extract Mermaid code blocks matching ``pattern`` in document order"""
+        return [span.to_block() for span in self._scan(pattern, markdown_content)]
+
+    def scan_blocks(self, markdown_content: str) -> List["BlockSpan"]:
+        """
+        Find all Mermaid code blocks as lightweight spans
+
+        Spans reference ``markdown_content`` instead of copying diagram
+        sources; use this for large corpora and build ``MermaidBlock`` models
+        only where needed.
+        """
+        with tracing.span("scan_blocks", chars=len(markdown_content)) as traced:
+            spans = self._scan(self.MERMAID_FENCE_PATTERN, markdown_content)
+        if traced is not None:
+            traced.args["blocks"] = len(spans)
+        return spans
 
     def find_mermaid_blocks(self, markdown_content: str) -> List[MermaidBlock]:
         """Find all Mermaid code blocks in Markdown content"""
-        blocks = []
+        # A single scan recognizes every fence style; matches never overlap,
+        # so each block is found exactly once
+        blocks = [span.to_block() for span in self.scan_blocks(markdown_content)]
+        logger.debug(f"Found {len(blocks)} Mermaid blocks")
+        return blocks
 
-        # Find standard format blocks
-        logger.debug("Searching for standard Mermaid blocks")
-        standard_blocks = self._extract_blocks(
-            self.MERMAID_BLOCK_PATTERN, markdown_content
-        )
-        blocks.extend(standard_blocks)
-        logger.debug(f"Found {len(standard_blocks)} standard format blocks")
+    def iter_mermaid_blocks(self, lines: Iterable[str]) -> Iterator[MermaidBlock]:
+        """
+        Find Mermaid code blocks line by line
+
+        Used for streaming very large inputs: only the body of the block being
+        read is buffered. Fences must start their line (after indentation).
+
+        Args:
+            lines: Document lines including their line endings
+
+        Yields:
+            Blocks in document order
+        """
+        body: List[str] = []
+        closer = None
+        line_start = span_start = offset = 0
+
+        for number, line in enumerate(lines, start=1):
+            line_offset, offset = offset, offset + len(line)
+            text = line.rstrip("\r\n")
+            if closer is None:
+                opener = text.strip()
+                if opener.startswith("```mermaid") and not opener[10:].strip():
+                    closer = "```"
+                elif text.startswith(":::mermaid") and not text[10:].strip():
+                    closer = ":::"
+                else:
+                    continue
+                body, line_start, span_start = [], number, line_offset
+            elif (closer == "```" and text.lstrip().startswith("```")) or (
+                closer == ":::" and text.startswith(":::")
+            ):
+                yield self._build_block(
+                    "\n".join(body),
+                    line_start,
+                    number,
+                    (span_start, line_offset + len(text)),
+                )
+                closer = None
+            else:
+                body.append(text)
+
+
+class SharedBlockConfig(MermaidConfig):
+    """Block config shared by the spans of identical headers, read-only"""
 
-        # Find GitHub-style blocks
-        logger.debug("Searching for GitHub-style Mermaid blocks")
-        github_blocks = self._extract_blocks(
-            self.GITHUB_MERMAID_PATTERN, markdown_content
+    model_config = ConfigDict(extra="allow", frozen=True)
+
+
+# Config of blocks without frontmatter, shared by their spans
+DEFAULT_BLOCK_CONFIG = SharedBlockConfig()
+
+
+class BlockSpan:
+    """
+    Compact record of a Mermaid block inside a source document
+
+    Stores offsets into the source instead of a copy of the diagram, and the
+    shared (cached) block config, which is frozen. The content is sliced out
+    on access and pydantic models are only built by ``to_block``. Spans are
+    ``RenderableBlock``s and can be passed to the renderer in place of blocks.
+    """
+
+    __slots__ = (
+        "source",
+        "body_start",
+        "body_end",
+        "config",
+        "line_start",
+        "line_end",
+        "span_start",
+        "span_end",
+    )
+
+    def __init__(
+        self,
+        source: str,
+        body_start: int,
+        body_end: int,
+        config: Optional[SharedBlockConfig],
+        line_start: int,
+        line_end: int,
+        span_start: Optional[int] = None,
+        span_end: Optional[int] = None,
+    ):
+        self.source = source
+        self.body_start = body_start
+        self.body_end = body_end
+        self.config = config or DEFAULT_BLOCK_CONFIG
+        self.line_start = line_start
+        self.line_end = line_end
+        self.span_start = span_start
+        self.span_end = span_end
+
+    @property
+    def content(self) -> str:
+        """Diagram source without frontmatter"""
+        return self.source[self.body_start : self.body_end].strip()
+
+    def get_render_options(self) -> MermaidRenderOptions:
+        """Get rendering options, like the block model"""
+        return block_render_options(self.config)
+
+    def get_brief(self) -> str:
+        """Get a brief description of the code block, like the block model"""
+        return block_brief(self.content)
+
+    def to_block(self) -> MermaidBlock:
+        """Build the public block model"""
+        # Validated into a mutable copy of the frozen shared config
+        config = MermaidConfig.model_validate(
+            self.config.model_dump(exclude_unset=True)
         )
-        # Exclude already matched blocks (avoid duplicates)
-        new_github_blocks = [b for b in github_blocks if b not in blocks]
-        blocks.extend(new_github_blocks)
-        logger.debug(f"Found {len(new_github_blocks)} additional GitHub-style blocks")
-
-        # Find directive style blocks
-        logger.debug("Searching for directive-style Mermaid blocks")
-        directive_blocks = self._extract_blocks(
-            self.MERMAID_DIRECTIVE_PATTERN, markdown_content
+        return MermaidBlock(
+            content=self.content,
+            config=config,
+            line_start=self.line_start,
+            line_end=self.line_end,
+            span_start=self.span_start,
+            span_end=self.span_end,
         )
-        blocks.extend(directive_blocks)
-        logger.debug(f"Found {len(directive_blocks)} directive-style blocks")
-
-        return blocks
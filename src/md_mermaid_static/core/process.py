@@ -0,0 +1,124 @@
+"""
+Supervision of mermaid-cli render processes.
+
+A render runs npx -> node -> Chromium, and a stuck browser never exits on its
+own. Each render therefore runs in its own process group so that a timeout can
+reap the whole tree, and failures are classified so that only transient
+crashes are retried.
+"""
+
+import bisect
+import os
+import re
+import signal
+import subprocess
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+# Failures caused by the diagram itself, retrying cannot help
+PERMANENT_ERROR = re.compile(
+    r"Parse error|Syntax error|Lexical error|UnknownDiagramError"
+    r"|No diagram type detected",
+    re.IGNORECASE,
+)
+
+# Browser or protocol failures that usually succeed on a second attempt
+TRANSIENT_ERROR = re.compile(
+    r"TargetCloseError|Target closed|Protocol error|Navigation timeout"
+    r"|browser has disconnected|Session closed|ECONNRESET|socket hang up",
+    re.IGNORECASE,
+)
+
+# Latency samples needed before hedging kicks in
+HEDGE_MIN_SAMPLES = 20
+
+
+def popen_kwargs() -> Dict[str, Any]:
+    """Popen arguments that start the render in a new process group"""
+    if os.name == "posix":
+        return {"start_new_session": True}
+    return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+
+
+def kill_process_tree(pid: int) -> None:
+    """Kill a render process and everything it spawned"""
+    try:
+        if os.name == "posix":
+            os.killpg(pid, signal.SIGKILL)
+        else:
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(pid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+    except (OSError, subprocess.SubprocessError):
+        pass
+
+
+def is_transient_failure(returncode: Optional[int], stderr: str) -> bool:
+    """
+    Check whether a failed render is worth retrying
+
+    Args:
+        returncode: Exit code of the render, None when it timed out
+        stderr: Error output of the render
+
+    Returns:
+        True for timeouts, crashes and browser errors, False for diagram errors
+    """
+    if PERMANENT_ERROR.search(stderr or ""):
+        return False
+    if returncode is None or returncode < 0:
+        # Timed out or killed by a signal (OOM killer, crashed browser)
+        return True
+    return bool(TRANSIENT_ERROR.search(stderr or ""))
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Delay before retry number ``attempt`` (1-based), doubling each time"""
+    return min(cap, base * 2 ** (attempt - 1))
+
+
+class LatencyTracker:
+    """Latencies of successful renders in a run, for hedging and reporting"""
+
+    def __init__(self, min_samples: int = HEDGE_MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._samples: List[float] = []
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        """Record the latency of a successful render"""
+        with self._lock:
+            bisect.insort(self._samples, latency)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Latency percentile, None until enough renders have completed"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            index = min(len(self._samples) - 1, int(len(self._samples) * fraction))
+            return self._samples[index]
+
+    def p95(self) -> Optional[float]:
+        """95th percentile latency"""
+        return self.percentile(0.95)
+
+
+def run_in_thread(fn, *args) -> Future:
+    """Run ``fn(*args)`` in a daemon thread, returns a future of its result"""
+    future: Future = Future()
+
+    def run() -> None:
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
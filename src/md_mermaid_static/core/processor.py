@@ -2,11 +2,31 @@
 Markdown processor that handles the conversion of Markdown files with Mermaid diagrams to output files.
 """
 
+import filecmp
+import os
+import re
+import shutil
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, List, Optional, TextIO, Tuple
 
-from md_mermaid_static.models import MermaidBlock, CLIConfig
+from md_mermaid_static.models import (
+    BlockRecord,
+    BlockReport,
+    CLIConfig,
+    DocumentManifest,
+    RenderableBlock,
+    RenderStats,
+)
 from md_mermaid_static.utils import logger, display_mermaid_block, display_summary
+from md_mermaid_static.utils.tracing import async_span, span
+from .cache import file_digest, temporary_sibling
+from .manifest import (
+    MANIFEST_VERSION,
+    load_manifest,
+    manifest_path,
+    save_manifest,
+    settings_digest,
+)
 from .parser import MarkdownParser
 from .renderer import MermaidRenderer
 
@@ -14,30 +34,115 @@ from .renderer import MermaidRenderer
 class MarkdownProcessor:
     """Markdown Processor"""
 
-    def __init__(self, input_file: str, cli_config: CLIConfig = CLIConfig()):
+    def __init__(
+        self,
+        input_file: str,
+        cli_config: CLIConfig = CLIConfig(),
+        renderer: Optional[MermaidRenderer] = None,
+        output_name: Optional[Path] = None,
+    ):
+        """
+        Args:
+            input_file: Markdown file to process
+            cli_config: CLI configuration
+            renderer: Renderer shared with other documents (owned by the caller)
+            output_name: Output path relative to the output directory
+                (default: the input file name)
+        """
         self.input_file = Path(input_file)
         self.output_dir = Path(cli_config.output_dir)
+        self.output_name = Path(output_name or self.input_file.name)
         # Store reference to CLI config, but also rely on singleton for consistency
         self.cli_config = cli_config
+        self._owns_renderer = renderer is None
         # Pass singleton instance to renderer to ensure consistency
-        self.renderer = MermaidRenderer(
+        self.renderer = renderer or MermaidRenderer(
             cli_config.output_dir, CLIConfig.get_instance() or cli_config
         )
+        # Incremental mode: manifest of the previous run and input state
+        self._manifest: Optional[DocumentManifest] = None
+        self._input_state: Optional[Tuple[str, int, int]] = None
+        # Run report records of the blocks of the last run (--report)
+        self.block_reports: List[BlockReport] = []
+
+    def __enter__(self) -> "MarkdownProcessor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release renderer resources"""
+        if self._owns_renderer:
+            self.renderer.close()
 
     def process(self) -> Path:
         """Process Markdown file"""
-        logger.info(f"Processing file: {self.input_file}")
+        self.block_reports = []
+        with span("process", file=str(self.input_file)):
+            if self.cli_config.incremental:
+                output_file = self._skip_unchanged()
+                if output_file:
+                    return output_file
+
+            content, blocks = self._parse()
+            if not blocks:
+                return self._save_unchanged(content)
+
+            # Process all code blocks concurrently or sequentially
+            rendered_blocks, stats = self.renderer.render_blocks_with_stats(blocks)
+
+            return self._finish(content, blocks, rendered_blocks, stats)
+
+    async def process_async(self) -> Path:
+        """Process Markdown file, rendering charts on the asyncio event loop"""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        self.block_reports = []
+        with async_span("process", file=str(self.input_file)):
+            if self.cli_config.incremental:
+                output_file = await loop.run_in_executor(None, self._skip_unchanged)
+                if output_file:
+                    return output_file
+
+            content, blocks = await loop.run_in_executor(None, self._parse)
+            if not blocks:
+                return await loop.run_in_executor(None, self._save_unchanged, content)
+
+            rendered_blocks, stats = await self.renderer.render_blocks_with_stats_async(
+                blocks
+            )
+
+            return await loop.run_in_executor(
+                None, self._finish, content, blocks, rendered_blocks, stats
+            )
+
+    def _parse(self) -> Tuple[Optional[str], List[RenderableBlock]]:
+        """
+        Read the input file and find its Mermaid code blocks
 
-        # Read input file
-        content = self.input_file.read_text(encoding="utf-8")
+        In streaming mode the document is scanned line by line and not kept
+        in memory, the returned content is None.
+        """
+        logger.info(f"Processing file: {self.input_file}")
 
-        # Parse Mermaid code blocks
         parser = MarkdownParser()
-        blocks = parser.find_mermaid_blocks(content)
+        if self.cli_config.stream:
+            content = None
+            with span("scan_blocks", stream=True), self._open_input() as f:
+                blocks = list(parser.iter_mermaid_blocks(f))
+        else:
+            # Read input file
+            with span("read_input", file=str(self.input_file)):
+                content = self.input_file.read_text(encoding="utf-8")
+
+            # Parse Mermaid code blocks, as lightweight spans into the content
+            blocks = parser.scan_blocks(content)
 
         if not blocks:
             logger.warning("No Mermaid code blocks found")
-            return self._save_output(content)
+            return content, blocks
 
         logger.info(f"Found {len(blocks)} Mermaid code blocks")
 
@@ -47,40 +152,86 @@ class MarkdownProcessor:
 
         # Render all code blocks
         logger.info("Starting chart rendering...")
+        return content, blocks
 
-        # Process all code blocks concurrently or sequentially
-        rendered_blocks = self.renderer.render_blocks(blocks)
+    def _finish(
+        self,
+        content: Optional[str],
+        blocks: List[RenderableBlock],
+        rendered_blocks: List[Tuple[RenderableBlock, Optional[Path]]],
+        stats: Optional[RenderStats] = None,
+    ) -> Path:
+        """
+        Write the output file for rendered blocks and display the summary
 
+        Args:
+            content: Source document, None in streaming mode
+            blocks: Blocks found in the document
+            rendered_blocks: Blocks with their rendered image (None if failed)
+            stats: Statistics of the render_blocks call that rendered them
+        """
         logger.info(f"Completed rendering {len(blocks)} charts")
 
-        # Update Markdown content
-        new_content = self._replace_blocks(content, rendered_blocks)
+        with span("write_output", file=str(self._output_file())):
+            if content is None:
+                # Streaming mode: copy the input through, splicing in images
+                output_file = self._stream_output(rendered_blocks)
+            else:
+                # Splice the image references straight into the output file
+                output_file = self._write_output(
+                    lambda f: self._replace_blocks(content, rendered_blocks, f)
+                )
+        with span("record_manifest"):
+            self._record_manifest(rendered_blocks)
+        if self.cli_config.report_file:
+            self.block_reports = [
+                self.renderer.block_report(block, str(self.input_file), image_path)
+                for block, image_path in rendered_blocks
+            ]
 
         # Count successful and failed renders
         success_count = sum(1 for _, path in rendered_blocks if path is not None)
         failed_count = len(rendered_blocks) - success_count
 
-        # Save output file
-        output_file = self._save_output(new_content)
-
         # Display processing summary
         display_summary(
             total_blocks=len(blocks),
             success_count=success_count,
             failed_count=failed_count,
             output_file=output_file,
+            duplicate_count=stats.duplicates if stats else 0,
         )
 
         return output_file
 
     def _replace_blocks(
-        self, content: str, rendered_blocks: List[Tuple[MermaidBlock, Path]]
-    ) -> str:
-        """Replace Mermaid code blocks in Markdown"""
-        lines = content.split("\n")
-        offset = 0
+        self,
+        content: str,
+        rendered_blocks: List[Tuple[RenderableBlock, Path]],
+        out: Optional[TextIO] = None,
+    ) -> Optional[str]:
+        """
+        Replace Mermaid code blocks in Markdown
 
-        for block, image_path in rendered_blocks:
+        The output is assembled in one pass from slices of the source and the
+        image references, using the character span of each block.
+
+        Args:
+            content: Source document
+            rendered_blocks: Blocks with their rendered image (None if failed)
+            out: File to write the result to instead of returning it
+
+        Returns:
+            The new content, or None when written to ``out``
+        """
+        pieces: List[str] = []
+        write = out.write if out is not None else pieces.append
+        line_offsets: Optional[List[int]] = None
+        position = 0
+
+        for block, image_path in sorted(
+            rendered_blocks, key=lambda item: item[0].line_start
+        ):
             # Check if image path is empty
             if image_path is None:
                 logger.warning(
@@ -88,29 +239,260 @@ class MarkdownProcessor:
                 )
                 continue
 
-            # Calculate relative path
-            rel_path = image_path.relative_to(self.output_dir)
-
-            # Create new image reference
-            image_ref = f"![{block.config.caption or ''}]({rel_path})"
+            start, end = block.span_start, block.span_end
+            if start is None or end is None:
+                # Block built without spans, derive them from its line numbers
+                if line_offsets is None:
+                    line_offsets = [0]
+                    line_offsets.extend(m.end() for m in re.finditer("\n", content))
+                start = line_offsets[block.line_start - 1]
+                end = (
+                    line_offsets[block.line_end] - 1
+                    if block.line_end < len(line_offsets)
+                    else len(content)
+                )
 
-            # Replace original code block
-            start_idx = block.line_start - 1 + offset
-            end_idx = block.line_end - 1 + offset
-            lines[start_idx : end_idx + 1] = [image_ref]
+            # Copy the text before the block, then the image reference
+            write(content[position:start])
+            write(self._image_ref(block, image_path))
+            position = end
 
             logger.debug(
-                f"Replaced code block at lines {block.line_start}-{block.line_end} with image: {rel_path}"
+                f"Replaced code block at lines {block.line_start}-{block.line_end} with image: {image_path}"
             )
 
-            # Update offset
-            offset += 1 - (end_idx - start_idx + 1)
-
-        return "\n".join(lines)
+        write(content[position:])
+        return None if out is not None else "".join(pieces)
 
     def _save_output(self, content: str) -> Path:
         """Save output file"""
-        output_file = self.output_dir / self.input_file.name
-        output_file.write_text(content, encoding="utf-8")
-        logger.debug(f"Saved output file: {output_file}")
+        return self._write_output(lambda f: f.write(content))
+
+    def _save_unchanged(self, content: Optional[str]) -> Path:
+        """Save the output of a document without Mermaid code blocks"""
+        if content is not None:
+            output_file = self._save_output(content)
+        else:
+            output_file = self._output_file()
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            if output_file.resolve() != self.input_file.resolve():
+                shutil.copyfile(self.input_file, output_file)
+        self._record_manifest([])
+        return output_file
+
+    def _write_output(
+        self, write: Callable[[TextIO], None], newline: Optional[str] = None
+    ) -> Path:
+        """
+        Write the output file atomically through ``write``
+
+        In incremental mode an output identical to the existing one is not
+        replaced, so its timestamp does not change.
+        """
+        output_file = self._output_file()
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = temporary_sibling(output_file)
+        try:
+            with temp_file.open("w", encoding="utf-8", newline=newline) as f:
+                write(f)
+            if (
+                self.cli_config.incremental
+                and output_file.is_file()
+                and filecmp.cmp(temp_file, output_file, shallow=False)
+            ):
+                logger.info(f"Output unchanged: {output_file}")
+            else:
+                os.replace(temp_file, output_file)
+                logger.debug(f"Saved output file: {output_file}")
+        finally:
+            if temp_file.exists():
+                temp_file.unlink()
         return output_file
+
+    def _skip_unchanged(self) -> Optional[Path]:
+        """
+        Check the manifest of the previous run
+
+        Returns:
+            The output file when the input, the settings, the output and every
+            rendered image are unchanged, None when the document must be
+            processed
+        """
+        with span("check_manifest", file=str(self.input_file)):
+            output_file = self._check_manifest()
+        if output_file and self.cli_config.report_file:
+            self.block_reports = self._manifest_reports()
+        return output_file
+
+    def _manifest_reports(self) -> List[BlockReport]:
+        """Report the blocks of an unchanged document from its manifest"""
+        reports = []
+        for record in self._manifest.blocks:
+            media = self.output_dir / record.media if record.media else None
+            reports.append(
+                BlockReport(
+                    source=str(self.input_file),
+                    line_start=record.line_start,
+                    line_end=record.line_end,
+                    diagram_type=record.diagram_type or "",
+                    fingerprint=record.fingerprint,
+                    cache_hit=media is not None,
+                    output_bytes=media.stat().st_size if media else None,
+                    output=record.media,
+                    error=None if media else "Rendering failed",
+                )
+            )
+        return reports
+
+    def _check_manifest(self) -> Optional[Path]:
+        """Compare the input, settings and outputs with the manifest"""
+        output_file = self._output_file()
+        stat = self.input_file.stat()
+        manifest = load_manifest(manifest_path(output_file))
+        self._manifest = manifest
+
+        if manifest and (manifest.input_size, manifest.input_mtime_ns) == (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            # Same size and timestamp, no need to hash the input again
+            digest = manifest.input_sha256
+        else:
+            digest = file_digest(str(self.input_file))
+        self._input_state = (digest, stat.st_size, stat.st_mtime_ns)
+
+        if manifest is None or manifest.input_sha256 != digest:
+            return None
+        if manifest.settings != settings_digest(self.cli_config):
+            logger.info("Settings changed since the last run, reprocessing")
+            return None
+        if any(
+            file_digest(path) != digest
+            for path, digest in manifest.dependencies.items()
+        ):
+            logger.info("Theme files changed since the last run, reprocessing")
+            return None
+        try:
+            output_stat = output_file.stat()
+        except OSError:
+            return None
+        if (manifest.output_size, manifest.output_mtime_ns) != (
+            output_stat.st_size,
+            output_stat.st_mtime_ns,
+        ):
+            return None
+        if any(
+            record.media and not (self.output_dir / record.media).is_file()
+            for record in manifest.blocks
+        ):
+            return None
+
+        logger.info(f"Unchanged since the last run, skipping: {self.input_file}")
+        return output_file
+
+    def _record_manifest(
+        self, rendered_blocks: List[Tuple[RenderableBlock, Optional[Path]]]
+    ) -> None:
+        """Write the manifest of this run in incremental mode"""
+        if not self.cli_config.incremental or self._input_state is None:
+            return
+
+        records = []
+        dependencies = {}
+        for block, image_path in rendered_blocks:
+            render_options = block.get_render_options()
+            # Theme files of the CLI and of the block, compared before skipping
+            for path in (render_options.config_file, render_options.css_file):
+                if path:
+                    dependencies[path] = file_digest(path)
+            records.append(
+                BlockRecord(
+                    fingerprint=self.renderer.get_fingerprint(block, render_options),
+                    line_start=block.line_start,
+                    line_end=block.line_end,
+                    span_start=block.span_start,
+                    span_end=block.span_end,
+                    media=image_path.relative_to(self.output_dir).as_posix()
+                    if image_path
+                    else None,
+                    diagram_type=block.get_brief(),
+                )
+            )
+        if self._manifest:
+            previous = {record.fingerprint for record in self._manifest.blocks}
+            changed = sum(1 for record in records if record.fingerprint not in previous)
+            logger.info(
+                f"{changed} of {len(records)} charts changed since the last run"
+            )
+
+        output_file = self._output_file()
+        output_stat = output_file.stat()
+        digest, size, mtime_ns = self._input_state
+        manifest = DocumentManifest(
+            version=MANIFEST_VERSION,
+            input_sha256=digest,
+            input_size=size,
+            input_mtime_ns=mtime_ns,
+            settings=settings_digest(self.cli_config),
+            output_size=output_stat.st_size,
+            output_mtime_ns=output_stat.st_mtime_ns,
+            blocks=records,
+            dependencies=dependencies,
+        )
+        save_manifest(manifest, manifest_path(output_file))
+
+    def _image_ref(self, block: RenderableBlock, image_path: Path) -> str:
+        """Markdown image reference replacing a rendered block"""
+        # Relative to the output document, which may sit in a subdirectory
+        rel_path = Path(os.path.relpath(image_path, self._output_file().parent))
+        return f"![{block.config.caption or ''}]({rel_path})"
+
+    def _open_input(self):
+        """Open the input for line-by-line reading, keeping line endings as-is"""
+        return self.input_file.open(encoding="utf-8", newline="\n")
+
+    def _output_file(self) -> Path:
+        """Path of the output Markdown file"""
+        return self.output_dir / self.output_name
+
+    def _stream_output(
+        self, rendered_blocks: List[Tuple[RenderableBlock, Optional[Path]]]
+    ) -> Path:
+        """
+        Write the output by streaming the input a second time
+
+        Lines outside rendered blocks are copied straight through, so memory
+        use does not depend on the document size. The output is written to a
+        temporary file first, the input may live in the output directory.
+        """
+        replacements = {
+            block.line_start: (block.line_end, self._image_ref(block, image_path))
+            for block, image_path in rendered_blocks
+            if image_path is not None
+        }
+        for block, image_path in rendered_blocks:
+            if image_path is None:
+                logger.warning(
+                    f"Chart at line {block.line_start} failed to render, "
+                    "keeping original code block"
+                )
+
+        def write(dst: TextIO) -> None:
+            with self._open_input() as src:
+                skip_until = 0
+                for number, line in enumerate(src, start=1):
+                    if number <= skip_until:
+                        if number == skip_until:
+                            # Keep the line ending of the closing fence
+                            dst.write(line[len(line.rstrip("\r\n")) :])
+                        continue
+                    replacement = replacements.get(number)
+                    if replacement is None:
+                        dst.write(line)
+                        continue
+                    skip_until, image_ref = replacement
+                    dst.write(image_ref)
+                    if number == skip_until:
+                        dst.write(line[len(line.rstrip("\r\n")) :])
+
+        return self._write_output(write, newline="")
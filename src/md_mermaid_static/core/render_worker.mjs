@@ -0,0 +1,158 @@
+// Long-lived Mermaid render worker.
+//
+// Started once per run by md_mermaid_static.core.worker.RenderWorker. Keeps a
+// single headless browser and a pool of warm pages, and renders diagrams sent
+// over a JSON-lines protocol:
+//
+//   stdin:  {"id": 1, "definition": "graph TD ...", "format": "svg", "options": {...}}
+//   stdout: {"id": 1, "ok": true, "data": "<base64>"}
+//           {"id": 1, "ok": false, "error": "..."}
+//
+// A {"ready": true} line is written once the browser is up. The worker exits
+// when stdin is closed.
+
+import { existsSync, readFileSync } from "node:fs";
+import { createRequire } from "node:module";
+import { delimiter, join } from "node:path";
+import { createInterface } from "node:readline";
+import { pathToFileURL } from "node:url";
+
+function findMermaidCli() {
+  if (process.env.MERMAID_CLI_DIR) {
+    return process.env.MERMAID_CLI_DIR;
+  }
+  // npx/pnpm dlx put `<prefix>/node_modules/.bin` on PATH for --package
+  for (const entry of (process.env.PATH || "").split(delimiter)) {
+    const candidate = join(entry, "..", "@mermaid-js", "mermaid-cli");
+    if (existsSync(join(candidate, "package.json"))) {
+      return candidate;
+    }
+  }
+  throw new Error("Unable to locate @mermaid-js/mermaid-cli on PATH");
+}
+
+function send(message) {
+  process.stdout.write(JSON.stringify(message) + "\n");
+}
+
+class PagePool {
+  constructor(browser, size) {
+    this.browser = browser;
+    this.size = size;
+    this.idle = [];
+    this.created = 0;
+    this.waiters = [];
+  }
+
+  async acquire() {
+    if (this.idle.length) {
+      return this.idle.pop();
+    }
+    if (this.created < this.size) {
+      this.created += 1;
+      return this.browser.newPage();
+    }
+    return new Promise((resolve) => this.waiters.push(resolve));
+  }
+
+  release(page) {
+    page.removeAllListeners("console");
+    const waiter = this.waiters.shift();
+    if (waiter) {
+      waiter(page);
+    } else {
+      this.idle.push(page);
+    }
+  }
+
+  // renderMermaid() opens a page per call and closes it when done; hand it a
+  // facade whose pages go back to the pool instead of being closed.
+  facade() {
+    return {
+      newPage: async () => {
+        const page = await this.acquire();
+        const close = page.close;
+        page.close = async () => {
+          page.close = close;
+          this.release(page);
+        };
+        return page;
+      },
+    };
+  }
+}
+
+function buildRenderOptions(options) {
+  const mermaidConfig = { theme: options.theme || "default" };
+  if (options.configFile) {
+    Object.assign(mermaidConfig, JSON.parse(readFileSync(options.configFile, "utf-8")));
+  }
+  return {
+    viewport: {
+      width: options.width || 800,
+      height: options.height || 600,
+      deviceScaleFactor: options.scale || 1,
+    },
+    backgroundColor: options.backgroundColor || "white",
+    mermaidConfig,
+    myCSS: options.cssFile ? readFileSync(options.cssFile, "utf-8") : undefined,
+    pdfFit: Boolean(options.pdfFit),
+    svgId: options.svgId || undefined,
+  };
+}
+
+async function main() {
+  const pages = Math.max(1, parseInt(process.argv[2] || "1", 10));
+  const cliDir = findMermaidCli();
+  const require = createRequire(join(cliDir, "package.json"));
+  const { renderMermaid } = await import(pathToFileURL(join(cliDir, "src", "index.js")));
+  const puppeteerModule = await import(pathToFileURL(require.resolve("puppeteer")));
+  const puppeteer = puppeteerModule.default ?? puppeteerModule;
+
+  const browser = await puppeteer.launch({ headless: "shell" });
+  const pool = new PagePool(browser, pages);
+  const facade = pool.facade();
+  const inflight = new Set();
+
+  send({ ready: true, pages, cliDir });
+
+  const lines = createInterface({ input: process.stdin, crlfDelay: Infinity });
+  lines.on("line", (line) => {
+    if (!line.trim()) {
+      return;
+    }
+    let request;
+    try {
+      request = JSON.parse(line);
+    } catch (err) {
+      send({ id: null, ok: false, error: `Invalid request: ${err.message}` });
+      return;
+    }
+    const task = (async () => {
+      try {
+        const { data } = await renderMermaid(
+          facade,
+          request.definition,
+          request.format,
+          buildRenderOptions(request.options || {}),
+        );
+        send({ id: request.id, ok: true, data: Buffer.from(data).toString("base64") });
+      } catch (err) {
+        send({ id: request.id, ok: false, error: String((err && err.stack) || err) });
+      }
+    })();
+    inflight.add(task);
+    task.finally(() => inflight.delete(task));
+  });
+
+  lines.on("close", async () => {
+    await Promise.allSettled([...inflight]);
+    await browser.close();
+    process.exit(0);
+  });
+}
+
+main().catch((err) => {
+  send({ ready: false, error: String((err && err.stack) || err) });
+  process.exit(1);
+});
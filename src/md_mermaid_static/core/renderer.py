@@ -2,22 +2,49 @@
 Mermaid渲染器模块
 """
 
-import hashlib
+# asyncio is imported inside the async methods: they only run on an event
+# loop, where it is loaded already, and importing it up front slows every start
 import logging
+import multiprocessing
+import os
 import platform
 import subprocess
 import tempfile
-from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
 from pathlib import Path
-from typing import List, Optional, Tuple
-
-import pymupdf
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 from ..models.cli_config import CLIConfig
-from ..models.enums import OutputFormat
-from ..models.mermaid_block import MermaidBlock
+from ..models.enums import OutputFormat, RenderBackendType
+from ..models.mermaid_block import RenderableBlock
 from ..models.mermaid_config import MermaidRenderOptions
-from ..config.env import get_mermaid_cli_package
+from ..models.render_result import RenderResult
+from ..models.run_report import BlockReport
+from ..models.render_stats import RenderStats
+from ..config.env import get_mermaid_cli_package, get_shared_cache_dir
+from ..utils.tracing import async_span, span, submit_traced
+from .backends import FakeBackend, MmdcBackend, RenderBackend, WorkerBackend
+from .cache import SharedRenderCache, compute_fingerprint, temporary_sibling
+from .convert import convert_pdf, convert_pdf_timed
+from .process import LatencyTracker
+from .scheduler import AdaptiveLimiter
+from .worker import RenderWorkerError
 
 logger = logging.getLogger(__name__)
 
@@ -30,9 +57,141 @@ class MermaidRenderer:
         self.cli_config = cli_config
         self.media_dir = self.output_dir / "media"
         self.media_dir.mkdir(parents=True, exist_ok=True)
+        self._backend: Optional[RenderBackend] = None
+        self._backend_lock = threading.Lock()
+        self._convert_pool: Optional[ProcessPoolExecutor] = None
+        self._convert_slots: Optional[threading.BoundedSemaphore] = None
+        self._convert_lock = threading.Lock()
+
+        # Renders in flight across concurrent render_blocks calls, by output path
+        self._inflight: Dict[Path, Future] = {}
+        self._inflight_lock = threading.Lock()
+        # Render pool shared by all render_blocks calls (many documents at once)
+        self._render_pool: Optional[ThreadPoolExecutor] = None
+        # Latencies of successful renders, for hedging slow renders
+        self._latencies = LatencyTracker()
+        # Render time of every chart rendered by any backend, for reporting
+        self.render_latencies = LatencyTracker(min_samples=1)
+        # Per-chart timings and outcome by media file name (--report)
+        self._records: Optional[Dict[str, Dict[str, Any]]] = (
+            {} if cli_config.report_file else None
+        )
+        self._records_lock = threading.Lock()
+
+        # Adaptive concurrency (--max-workers auto) within max_workers
+        self._limiter: Optional[AdaptiveLimiter] = None
+        if cli_config.adaptive_workers:
+            self._limiter = AdaptiveLimiter(
+                cli_config.max_workers or os.cpu_count() or 1,
+                memory_budget=cli_config.memory_budget_mb * 1024 * 1024
+                if cli_config.memory_budget_mb
+                else None,
+            )
+
+        # Per-chart mermaid-cli runs, also used for batches and as the fallback
+        # when the persistent worker cannot start
+        self._mmdc = MmdcBackend(
+            cli_config, self._build_render_command, self._limiter, self._latencies
+        )
+
+        # Optional user-level cache shared across projects and output dirs
+        self.shared_cache: Optional[SharedRenderCache] = None
+        if cli_config.cache and cli_config.shared_cache:
+            self.shared_cache = SharedRenderCache(
+                Path(cli_config.shared_cache_dir or get_shared_cache_dir()),
+                max_bytes=cli_config.shared_cache_size_mb * 1024 * 1024,
+            )
+
+    def start_render_pool(self) -> None:
+        """
+        Render the charts of every render_blocks call on one shared pool
+
+        Used when processing many documents at once, so that concurrency spans
+        document boundaries while staying bounded by ``max_workers``.
+        """
+        if self._render_pool is None:
+            self._render_pool = ThreadPoolExecutor(
+                max_workers=self.cli_config.max_workers or os.cpu_count() or 1,
+                thread_name_prefix="render",
+            )
+
+    def __enter__(self) -> "MermaidRenderer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release long-lived resources such as the persistent render worker"""
+        with self._backend_lock:
+            backend, self._backend = self._backend, None
+        if backend:
+            backend.close()
+        with self._convert_lock:
+            pool, self._convert_pool = self._convert_pool, None
+        if pool:
+            pool.shutdown()
+        render_pool, self._render_pool = self._render_pool, None
+        if render_pool:
+            render_pool.shutdown()
+        if self._limiter:
+            self._limiter.close()
+
+    @property
+    def backend_type(self) -> RenderBackendType:
+        """Render backend selected by the configuration"""
+        backend = self.cli_config.backend
+        if backend == RenderBackendType.MMDC and self.cli_config.persistent_worker:
+            return RenderBackendType.WORKER
+        return backend
+
+    def _get_backend(self) -> RenderBackend:
+        """Get the render backend, starting it on first use"""
+        backend = self._backend
+        if backend is not None:
+            return backend
+
+        with self._backend_lock:
+            if self._backend is None:
+                with span("start_backend", backend=self.backend_type.value):
+                    self._backend = self._start_backend()
+            return self._backend
+
+    def _start_backend(self) -> RenderBackend:
+        """Start the configured backend, falling back to mermaid-cli per chart"""
+        backend_type = self.backend_type
+        if backend_type == RenderBackendType.FAKE:
+            logger.info("Rendering placeholder images with the fake backend")
+            return FakeBackend()
+        if backend_type != RenderBackendType.WORKER:
+            return self._mmdc
+
+        pages = self.cli_config.max_workers or 1 if self.cli_config.concurrent else 1
+        launcher = [
+            self._get_mermaid_cli_cmd(),
+            f"--package={get_mermaid_cli_package()}",
+            "node",
+        ]
+        worker = WorkerBackend(
+            launcher, pages=pages, render_timeout=self.cli_config.render_timeout
+        )
+        try:
+            worker.start()
+        except (OSError, RenderWorkerError) as e:
+            logger.warning(
+                f"Persistent render worker unavailable, "
+                f"falling back to mermaid-cli per chart: {e}"
+            )
+            return self._mmdc
+        return worker
 
     def _get_mermaid_cli_cmd(self) -> str:
         """Get available mermaid-cli command"""
+        with span("resolve_cli", use_command=self.cli_config.use_command):
+            return self._resolve_mermaid_cli_cmd()
+
+    def _resolve_mermaid_cli_cmd(self) -> str:
+        """Pick the user-specified command or detect pnpx/npx"""
         # First check if user specified a command
         if self.cli_config.use_command != "auto":
             logger.debug(f"Using user-specified command: {self.cli_config.use_command}")
@@ -89,163 +248,810 @@ class MermaidRenderer:
             return False
 
     def render_blocks(
-        self, blocks: List[MermaidBlock]
-    ) -> List[Tuple[MermaidBlock, Optional[Path]]]:
-        """Render multiple Mermaid code blocks with concurrent support"""
+        self, blocks: Sequence[RenderableBlock]
+    ) -> List[Tuple[RenderableBlock, Optional[Path]]]:
+        """
+        Render multiple Mermaid code blocks with concurrent support
+
+        Args:
+            blocks: Block models, or the parser's lightweight spans
+
+        Returns:
+            Every block with its image (None if it failed)
+        """
+        rendered, _ = self.render_blocks_with_stats(blocks)
+        return rendered
+
+    def render_blocks_with_stats(
+        self, blocks: Sequence[RenderableBlock]
+    ) -> Tuple[List[Tuple[RenderableBlock, Optional[Path]]], RenderStats]:
+        """
+        Render multiple Mermaid code blocks, like ``render_blocks``
+
+        Returns:
+            Every block with its image (None if it failed), and the statistics
+            of this call
+        """
         if not blocks:
-            return []
+            return [], RenderStats()
+
+        with span("render_blocks", blocks=len(blocks)):
+            return self._render_all(blocks)
+
+    def _render_all(
+        self, blocks: Sequence[RenderableBlock]
+    ) -> Tuple[List[Tuple[RenderableBlock, Optional[Path]]], RenderStats]:
+        """Render, deduplicate and fan out the results of ``render_blocks``"""
+        # Bring the persistent worker up once before dispatching any chart
+        self._get_backend()
+
+        targets, owners, stats = self._deduplicate(blocks)
+        output_paths: List[Any] = [None] * len(blocks)
+        pending, waiting = self._resolve_targets(targets, output_paths, stats)
+
+        try:
+            self._render_pending(blocks, pending, output_paths)
+        finally:
+            for i in pending:
+                self._release(targets[i], output_paths[i])
 
-        if self.cli_config.concurrent and len(blocks) > 1:
+        # Charts another render_blocks call was already rendering
+        for i, future in waiting.items():
+            output_paths[i] = future.result()
+
+        # Fan the results out to every occurrence
+        output_paths = [output_paths[owner] for owner in owners]
+
+        for i, output_path in enumerate(output_paths):
+            if output_path:
+                logger.info(f"Chart #{i + 1} rendered successfully: {output_path}")
+            else:
+                logger.warning(f"Chart #{i + 1} rendering failed")
+
+        return list(zip(blocks, output_paths)), stats
+
+    def _render_pending(
+        self,
+        blocks: Sequence[RenderableBlock],
+        pending: List[int],
+        output_paths: List[Any],
+    ) -> None:
+        """Render the blocks at ``pending`` indices into ``output_paths``"""
+        groups = self._plan_batches(blocks, pending)
+
+        if self._render_pool is not None:
+            # Queue behind the charts of every other document in flight
+            self._render_on(self._render_pool, blocks, groups, pending, output_paths)
+        elif self.cli_config.concurrent and len(groups) > 1:
             logger.info(
-                f"Rendering {len(blocks)} charts in concurrent mode, max workers: {self.cli_config.max_workers}"
+                f"Rendering {len(pending)} charts in concurrent mode, max workers: {self.cli_config.max_workers}"
             )
             with ThreadPoolExecutor(
                 max_workers=self.cli_config.max_workers
             ) as executor:
-                # Create task list
-                futures = []
-                for i, block in enumerate(blocks):
-                    futures.append(executor.submit(self.render_block, block, i))
-
-                # Collect results
-                results = []
-                for i, future in enumerate(futures):
-                    try:
-                        output_path = future.result()
-                        results.append((blocks[i], output_path))
-                        if output_path:
-                            logger.info(
-                                f"Chart #{i + 1} rendered successfully: {output_path}"
-                            )
-                        else:
-                            logger.warning(f"Chart #{i + 1} rendering failed")
-                    except Exception as e:
-                        logger.error(
-                            f"Error rendering chart #{i + 1}: {str(e)}",
-                            exc_info=logger.isEnabledFor(logging.DEBUG),
-                        )
-                        results.append((blocks[i], None))
-
-                return results
+                self._render_on(executor, blocks, groups, pending, output_paths)
         else:
             # Sequential processing
-            results = []
-            for i, block in enumerate(blocks):
+            for group in groups:
+                for i, output_path in zip(group, self._render_group(blocks, group)):
+                    output_paths[i] = output_path
+
+    def _render_on(
+        self,
+        executor: ThreadPoolExecutor,
+        blocks: Sequence[RenderableBlock],
+        groups: List[List[int]],
+        pending: List[int],
+        output_paths: List[Any],
+    ) -> None:
+        """Render groups of blocks on ``executor`` into ``output_paths``"""
+        # Pipeline PDF conversion into a process pool so render threads
+        # move on to the next chart instead of converting in-line
+        defer_conversion = self._needs_conversion()
+        # Create task list
+        futures = [
+            executor.submit(self._render_group, blocks, group, defer_conversion)
+            for group in groups
+        ]
+
+        # Collect results
+        for group, future in zip(groups, futures):
+            for i, output_path in zip(group, future.result()):
+                output_paths[i] = output_path
+
+        # Wait for the conversion stage
+        for i in pending:
+            if isinstance(output_paths[i], Future):
                 try:
-                    output_path = self.render_block(block, i)
-                    results.append((block, output_path))
-                    if output_path:
-                        logger.info(
-                            f"Chart #{i + 1} rendered successfully: {output_path}"
-                        )
-                    else:
-                        logger.warning(f"Chart #{i + 1} rendering failed")
+                    output_paths[i] = output_paths[i].result()
                 except Exception as e:
                     logger.error(
-                        f"Error rendering chart #{i + 1}: {str(e)}",
+                        f"Error converting chart #{i + 1}: {str(e)}",
                         exc_info=logger.isEnabledFor(logging.DEBUG),
                     )
-                    results.append((block, None))
-            return results
+                    output_paths[i] = None
 
-    def render_block(self, block: MermaidBlock, index: int) -> Optional[Path]:
-        """Render a single Mermaid code block"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Create temporary mermaid file
-            mermaid_file = Path(temp_dir) / "diagram.mmd"
-            mermaid_file.write_text(block.content)
+    def _deduplicate(
+        self, blocks: Sequence[RenderableBlock]
+    ) -> Tuple[Dict[int, Path], List[int], RenderStats]:
+        """
+        Collapse blocks with the same render fingerprint into one render job
 
-            # Generate MD5 hash as filename
-            mermaid_content = block.config.model_dump_json() + "\n" + block.content
-            md5_hash = hashlib.md5(mermaid_content.encode("utf-8")).hexdigest()
+        Returns:
+            The output path of each distinct chart keyed by the index of its
+            first occurrence, for every block the index it takes its result
+            from, and the statistics of the call
+        """
+        first_seen: Dict[Path, int] = {}
+        targets: Dict[int, Path] = {}
+        owners: List[int] = []
+        for i, block in enumerate(blocks):
+            target = self._get_output_path(block)
+            owner = first_seen.setdefault(target, i)
+            if owner == i:
+                targets[i] = target
+            owners.append(owner)
 
-            # Get render options - now properly integrated with CLI config from within get_render_options
-            render_options = block.get_render_options()
+        stats = RenderStats(
+            total=len(blocks),
+            unique=len(targets),
+            duplicates=len(blocks) - len(targets),
+        )
+        if stats.duplicates:
+            logger.info(
+                f"Deduplicated {stats.duplicates} identical charts, "
+                f"{len(targets)} distinct charts to render"
+            )
+        return targets, owners, stats
 
-            # Determine output format from CLI config
-            output_format = self.cli_config.output_format
+    def _resolve_targets(
+        self, targets: Dict[int, Path], output_paths: List[Any], stats: RenderStats
+    ) -> Tuple[List[int], Dict[int, Future]]:
+        """
+        Resolve distinct charts from the cache or from renders already in flight
 
-            # Handle enhanced SVG mode (render to PDF first, then convert to SVG)
-            actual_output_format = output_format
-            if output_format == OutputFormat.ENHANCED_SVG:
-                logger.info("Using enhanced SVG mode: rendering via PDF conversion")
-                # Use PDF as intermediate format
-                actual_output_format = OutputFormat.PDF
+        Cache hits are counted into ``stats``.
 
-            # Temporary output file
-            temp_output = Path(temp_dir) / f"output.{actual_output_format.value}"
+        Returns:
+            Indices this call has to render, and futures of charts another
+            call is rendering right now
+        """
+        pending: List[int] = []
+        waiting: Dict[int, Future] = {}
+        for i, target in targets.items():
+            output_paths[i] = self._lookup_cache(target)
+            if output_paths[i] is not None:
+                stats.cached += 1
+                continue
+            future = self._claim(target)
+            if future is None:
+                pending.append(i)
+            else:
+                waiting[i] = future
+
+        if stats.cached:
+            logger.info(f"Reusing {stats.cached} cached charts")
+        return pending, waiting
 
-            # Build render command
-            cmd = self._build_render_command(mermaid_file, temp_output, render_options)
+    def _claim(self, target: Path) -> Optional[Future]:
+        """
+        Claim the render of ``target`` for the calling render_blocks
 
-            # Display render command in debug mode
-            logger.debug(f"Render command: {' '.join(cmd)}")
-            # display_render_command(cmd, index)
+        Returns:
+            None if the caller now owns the render, otherwise the future of
+            the call already rendering it
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(target)
+            if future is None:
+                self._inflight[target] = Future()
+            return future
 
+    def _release(self, target: Path, output_path: Optional[Path]) -> None:
+        """Publish the result of a claimed render to waiting calls"""
+        with self._inflight_lock:
+            future = self._inflight.pop(target, None)
+        if future is not None:
+            future.set_result(output_path)
+
+    def _plan_batches(
+        self, blocks: Sequence[RenderableBlock], indices: List[int]
+    ) -> List[List[int]]:
+        """Group block indices that can share one mermaid-cli invocation"""
+        if not self.cli_config.batch or not self._get_backend().supports_batch:
+            return [[i] for i in indices]
+
+        groups: Dict[str, List[int]] = {}
+        singles: List[List[int]] = []
+        for i in indices:
+            block = blocks[i]
+            # Fences inside the diagram would break the synthetic Markdown input
+            if "```" in block.content or ":::" in block.content:
+                singles.append([i])
+                continue
+            key = block.get_render_options().model_dump_json()
+            groups.setdefault(key, []).append(i)
+
+        # Split large groups so concurrent mode still keeps every worker busy
+        chunks = 1
+        if self.cli_config.concurrent:
+            chunks = max(1, self.cli_config.max_workers or 1)
+
+        batches = []
+        for group in groups.values():
+            size = max(1, -(-len(group) // chunks))
+            batches.extend(
+                group[start : start + size] for start in range(0, len(group), size)
+            )
+        batches.extend(singles)
+        batches.sort(key=lambda batch: batch[0])
+
+        logger.debug(f"Planned {len(batches)} render batches for {len(indices)} charts")
+        return batches
+
+    def _render_group(
+        self,
+        blocks: Sequence[RenderableBlock],
+        indices: List[int],
+        defer_conversion: bool = False,
+    ) -> List[Any]:
+        """Render a group of blocks, batching them when there is more than one"""
+        if len(indices) > 1:
             try:
-                # Execute render command
-                logger.debug(f"Executing render command: {' '.join(cmd)}")
-                # Print render options
-                logger.debug(
-                    f"Render options: {dict(filter(lambda x: x[1], render_options.model_dump().items()))}"
+                output_paths = self._render_batch(
+                    [blocks[i] for i in indices], defer_conversion
+                )
+            except Exception as e:
+                logger.error(
+                    f"Error rendering batch of {len(indices)} charts: {str(e)}",
+                    exc_info=logger.isEnabledFor(logging.DEBUG),
                 )
+                output_paths = [None] * len(indices)
 
-                result = subprocess.run(cmd, capture_output=True, text=True)
+            failed = sum(1 for path in output_paths if path is None)
+            if not failed:
+                return output_paths
+            # One bad diagram fails the whole run, retry the rest individually
+            logger.warning(
+                f"Batch render failed for {failed} of {len(indices)} charts, "
+                f"retrying them individually"
+            )
+        else:
+            output_paths = [None]
 
-                # Always print output for debugging
-                if result.stdout:
-                    logger.debug(f"Command stdout: {result.stdout}")
-                if result.stderr:
-                    logger.debug(f"Command stderr: {result.stderr}")
+        for position, i in enumerate(indices):
+            if output_paths[position] is not None:
+                continue
+            try:
+                output_paths[position] = self._render_block(
+                    blocks[i], i, defer_conversion
+                )
+            except Exception as e:
+                logger.error(
+                    f"Error rendering chart #{i + 1}: {str(e)}",
+                    exc_info=logger.isEnabledFor(logging.DEBUG),
+                )
+        return output_paths
 
-                if result.returncode != 0:
-                    error_msg = result.stderr
-                    logger.error(
-                        f"Rendering failed (code {result.returncode}): {error_msg}"
-                    )
-                    return None
+    def _render_batch(
+        self, blocks: Sequence[RenderableBlock], defer_conversion: bool = False
+    ) -> List[Any]:
+        """Render blocks with identical render options in one mermaid-cli run"""
+        render_options = blocks[0].get_render_options()
+        output_format = self.cli_config.output_format
+        actual_output_format = self._get_actual_output_format(output_format)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # mermaid-cli extracts every chart from a Markdown input and writes
+            # them as output-1.<ext>, output-2.<ext>, ...
+            markdown_file = Path(temp_dir) / "diagrams.md"
+            markdown_file.write_text(
+                "\n".join(f"```mermaid\n{block.content}\n```\n" for block in blocks)
+            )
+            temp_output = Path(temp_dir) / f"output.{actual_output_format.value}"
 
-                # Final output file
-                final_output_ext = (
-                    "svg"
-                    if output_format == OutputFormat.ENHANCED_SVG
-                    else output_format.value
+            cmd = self._build_render_command(markdown_file, temp_output, render_options)
+            logger.debug(
+                f"Executing batch render command for {len(blocks)} charts: "
+                f"{' '.join(cmd)}"
+            )
+            timeout = self.cli_config.render_timeout
+            with self._render_slot(), span("render_batch", charts=len(blocks)):
+                started = time.monotonic()
+                result = self._mmdc.run_command(
+                    cmd, timeout * len(blocks) if timeout else None
                 )
-                final_output = self.media_dir / f"mermaid_{md5_hash}.{final_output_ext}"
-
-                # Handle enhanced SVG mode (PDF to SVG conversion)
-                if output_format == OutputFormat.ENHANCED_SVG:
-                    logger.debug("Converting enhanced PDF to SVG")
-                    self._convert_pdf_to_svg(temp_output, final_output)
-                    return final_output
-
-                # Handle PDF to other format conversion (if needed)
-                if (
-                    actual_output_format == OutputFormat.PDF
-                    and output_format != OutputFormat.PDF
-                ):
-                    logger.debug(f"Converting PDF to {output_format.value}")
-                    self._convert_pdf_to_other_format(
-                        temp_output, final_output, output_format
-                    )
-                else:
-                    # Directly copy file
-                    import shutil
+                elapsed = time.monotonic() - started
+            if not self._mmdc.check_result(
+                result.returncode, result.stdout.decode(errors="replace"), result.stderr
+            ):
+                return [None] * len(blocks)
 
-                    logger.debug(
-                        f"Copying output file: {temp_output} to {final_output}"
+            output_paths: List[Any] = []
+            for number, block in enumerate(blocks, start=1):
+                numbered_output = temp_output.with_name(
+                    f"output-{number}.{actual_output_format.value}"
+                )
+                if not numbered_output.exists():
+                    logger.error(f"Batch render produced no output for chart {number}")
+                    output_paths.append(None)
+                    continue
+                output_path = self._get_output_path(block, render_options)
+                self._note(
+                    output_path, render_ms=elapsed * 1000 / len(blocks), error=None
+                )
+                output_paths.append(
+                    self._store_artifact(
+                        numbered_output.read_bytes(), output_path, defer_conversion
                     )
-                    shutil.copy2(temp_output, final_output)
+                )
+            return output_paths
+
+    def _get_actual_output_format(self, output_format: OutputFormat) -> OutputFormat:
+        """Get the format mermaid-cli should produce for the requested output"""
+        # Enhanced SVG mode renders to PDF first, then converts to SVG
+        if output_format == OutputFormat.ENHANCED_SVG:
+            return OutputFormat.PDF
+        return output_format
+
+    def _needs_conversion(self) -> bool:
+        """Whether rendered artifacts need PDF post-processing"""
+        output_format = self.cli_config.output_format
+        return self._get_actual_output_format(output_format) != output_format
+
+    def get_fingerprint(
+        self,
+        block: RenderableBlock,
+        render_options: Optional[MermaidRenderOptions] = None,
+    ) -> str:
+        """Get the render cache fingerprint of a block"""
+        return compute_fingerprint(
+            block.content,
+            render_options or block.get_render_options(),
+            self.cli_config.output_format,
+            # Keep placeholders apart from real renders in every cache
+            backend="fake" if self.backend_type == RenderBackendType.FAKE else None,
+        )
+
+    def _get_output_path(
+        self,
+        block: RenderableBlock,
+        render_options: Optional[MermaidRenderOptions] = None,
+    ) -> Path:
+        """Get the media path a block renders to"""
+        fingerprint = self.get_fingerprint(block, render_options)
+
+        output_format = self.cli_config.output_format
+        final_output_ext = (
+            "svg" if output_format == OutputFormat.ENHANCED_SVG else output_format.value
+        )
+        return self.media_dir / f"mermaid_{fingerprint}.{final_output_ext}"
 
-                return final_output
+    def _get_cached_output(
+        self,
+        block: RenderableBlock,
+        render_options: Optional[MermaidRenderOptions] = None,
+    ) -> Optional[Path]:
+        """Get the already rendered artifact of a block, if any"""
+        if not self.cli_config.cache:
+            return None
+        return self._lookup_cache(self._get_output_path(block, render_options))
 
+    def lookup_rendered(self, block: RenderableBlock) -> Optional[Path]:
+        """Get the already rendered artifact of a block without rendering it"""
+        return self._get_cached_output(block)
+
+    def _lookup_cache(self, output_path: Path) -> Optional[Path]:
+        """Look up an output path in the local and shared render caches"""
+        if not self.cli_config.cache:
+            return None
+        with span("cache_lookup", file=output_path.name) as traced:
+            hit = self._find_cached(output_path)
+            if traced is not None:
+                traced.args["hit"] = hit is not None
+        if hit is not None and self._records is not None:
+            with self._records_lock:
+                # A chart rendered earlier in this run is not a cache hit
+                self._records.setdefault(
+                    output_path.name,
+                    {"cache_hit": True, "output_bytes": hit.stat().st_size},
+                )
+        return hit
+
+    def _find_cached(self, output_path: Path) -> Optional[Path]:
+        """Find an output path in the local cache, then in the shared cache"""
+        if output_path.is_file():
+            logger.debug(f"Render cache hit: {output_path}")
+            return output_path
+        if self.shared_cache and self.shared_cache.fetch(output_path.name, output_path):
+            return output_path
+        return None
+
+    def _get_convert_pool(self) -> ProcessPoolExecutor:
+        """Get the process pool for PDF conversion, creating it on first use"""
+        with self._convert_lock:
+            if self._convert_pool is None:
+                workers = self.cli_config.convert_workers or os.cpu_count() or 1
+                # spawn: forking a process that runs render threads is unsafe
+                self._convert_pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                # Bounded queue between the render and conversion stages
+                self._convert_slots = threading.BoundedSemaphore(workers * 2)
+                logger.debug(f"Started PDF conversion pool with {workers} processes")
+            return self._convert_pool
+
+    def _store_artifact(
+        self, data: bytes, final_output: Path, defer_conversion: bool = False
+    ) -> Any:
+        """
+        Convert a rendered artifact if needed and write it to the media directory
+
+        Returns:
+            The output path, or a future resolving to it when ``defer_conversion``
+            hands the conversion to the process pool
+        """
+        output_format = self.cli_config.output_format
+        if not self._needs_conversion():
+            return self._write_artifact(data, final_output)
+
+        if not defer_conversion:
+            logger.debug(f"Converting PDF to {output_format.value}")
+            data, elapsed = convert_pdf_timed(data, output_format)
+            self._note(final_output, convert_ms=elapsed * 1000)
+            return self._write_artifact(data, final_output)
+
+        pool = self._get_convert_pool()
+        # Blocks the render thread while the conversion queue is full
+        with span("wait_convert_slot"):
+            self._convert_slots.acquire()
+        result: Future = Future()
+
+        def on_converted(conversion: Future) -> None:
+            self._convert_slots.release()
+            try:
+                converted, elapsed = conversion.result()
+                self._note(final_output, convert_ms=elapsed * 1000)
+                result.set_result(self._write_artifact(converted, final_output))
+            except Exception as e:
+                self._note(final_output, error=str(e))
+                result.set_exception(e)
+
+        try:
+            conversion = submit_traced(pool, convert_pdf_timed, data, output_format)
+        except BaseException:
+            # e.g. BrokenProcessPool after a conversion worker crashed
+            self._convert_slots.release()
+            raise
+        conversion.add_done_callback(on_converted)
+        return result
+
+    def _write_artifact(self, data: bytes, final_output: Path) -> Path:
+        """Atomically write an artifact into the media directory"""
+        # Write next to the target and rename, so an interrupted run never
+        # leaves a truncated file behind that would look like a cache hit
+        with span("write_artifact", file=final_output.name, bytes=len(data)):
+            temp_output = temporary_sibling(final_output)
+            try:
+                temp_output.write_bytes(data)
+                os.replace(temp_output, final_output)
+            finally:
+                if temp_output.exists():
+                    temp_output.unlink()
+
+            if self.shared_cache:
+                # The shared cache is best-effort, the artifact is written
+                try:
+                    self.shared_cache.store(final_output)
+                except OSError as e:
+                    logger.debug(f"Shared cache store failed for {final_output}: {e}")
+
+        self._note(final_output, output_bytes=len(data))
+        return final_output
+
+    def _note(self, output_path: Path, **fields: Any) -> None:
+        """Record timings or the outcome of a chart for the run report"""
+        if self._records is None:
+            return
+        with self._records_lock:
+            self._records.setdefault(output_path.name, {}).update(fields)
+
+    def block_report(
+        self, block: RenderableBlock, source: str, image_path: Optional[Path]
+    ) -> BlockReport:
+        """
+        Build the run report record of a block
+
+        Args:
+            block: The block as found in its document
+            source: Markdown file of the block
+            image_path: Image the block was replaced with, None if it failed
+        """
+        render_options = block.get_render_options()
+        output_path = self._get_output_path(block, render_options)
+        with self._records_lock:
+            record = dict((self._records or {}).get(output_path.name, {}))
+        if not record and image_path is not None:
+            # Looked up by a parse worker, rendered by an earlier run
+            record = {"cache_hit": True, "output_bytes": image_path.stat().st_size}
+        if image_path is None:
+            record.setdefault("error", "Rendering failed")
+        else:
+            record["error"] = None
+        return BlockReport(
+            source=source,
+            line_start=block.line_start,
+            line_end=block.line_end,
+            diagram_type=block.get_brief(),
+            fingerprint=self.get_fingerprint(block, render_options),
+            output=image_path.relative_to(self.output_dir).as_posix()
+            if image_path
+            else None,
+            **record,
+        )
+
+    def render_block(self, block: RenderableBlock, index: int) -> Optional[Path]:
+        """Render a single Mermaid code block"""
+        return self._render_block(block, index)
+
+    def _render_block(
+        self, block: RenderableBlock, index: int, defer_conversion: bool = False
+    ) -> Any:
+        """Render a single block, optionally deferring PDF conversion"""
+        with span("render_block", index=index):
+            return self._render_block_traced(block, index, defer_conversion)
+
+    def _render_block_traced(
+        self, block: RenderableBlock, index: int, defer_conversion: bool
+    ) -> Any:
+        """Look up, render and store a single block"""
+        # Get render options - now properly integrated with CLI config from within get_render_options
+        render_options = block.get_render_options()
+
+        cached_output = self._get_cached_output(block, render_options)
+        if cached_output:
+            return cached_output
+
+        output_path = self._get_output_path(block, render_options)
+        try:
+            with self._render_slot():
+                result = self._render_artifact(block, render_options, index)
+            if result is None:
+                self._note(output_path, error="Rendering failed")
+                return None
+            self._note(output_path, render_ms=result.elapsed * 1000, error=None)
+            return self._store_artifact(result.data, output_path, defer_conversion)
+
+        except Exception as e:
+            error_msg = str(e)
+            self._note(output_path, error=error_msg)
+            logger.error(
+                f"Error during rendering: {error_msg}",
+                exc_info=logger.isEnabledFor(logging.DEBUG),
+            )
+            return None
+
+    def _render_artifact(
+        self,
+        block: RenderableBlock,
+        render_options: MermaidRenderOptions,
+        index: Optional[int] = None,
+    ) -> Optional[RenderResult]:
+        """Run the render stage and return the raw artifact of the backend"""
+        backend = self._get_backend()
+        with span("render", index=index, backend=backend.name):
+            result = backend.render(
+                block.content,
+                render_options,
+                self._get_actual_output_format(self.cli_config.output_format),
+            )
+        if result:
+            self.render_latencies.record(result.elapsed)
+            logger.debug(f"Rendered by {result.backend} in {result.elapsed:.3f}s")
+        return result
+
+    @contextmanager
+    def _render_slot(self) -> Iterator[None]:
+        """Hold an adaptive concurrency slot while a render runs"""
+        if self._limiter is None:
+            yield
+            return
+        with span("wait_slot"):
+            self._limiter.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._limiter.release(time.monotonic() - started)
+
+    @asynccontextmanager
+    async def _render_slot_async(self) -> AsyncIterator[None]:
+        """Hold an adaptive concurrency slot without blocking the event loop"""
+        if self._limiter is None:
+            yield
+            return
+        with async_span("wait_slot"):
+            await self._limiter.acquire_async()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._limiter.release(time.monotonic() - started)
+
+    async def render_blocks_async(
+        self, blocks: Sequence[RenderableBlock]
+    ) -> List[Tuple[RenderableBlock, Optional[Path]]]:
+        """Render multiple Mermaid code blocks on the asyncio event loop"""
+        rendered, _ = await self.render_blocks_with_stats_async(blocks)
+        return rendered
+
+    async def render_blocks_with_stats_async(
+        self, blocks: Sequence[RenderableBlock]
+    ) -> Tuple[List[Tuple[RenderableBlock, Optional[Path]]], RenderStats]:
+        """Like ``render_blocks_async``, also returning the statistics of this call"""
+        if not blocks:
+            return [], RenderStats()
+
+        with async_span("render_blocks", blocks=len(blocks)):
+            return await self._render_all_async(blocks)
+
+    async def _render_all_async(
+        self, blocks: Sequence[RenderableBlock]
+    ) -> Tuple[List[Tuple[RenderableBlock, Optional[Path]]], RenderStats]:
+        """Render, deduplicate and fan out the results of ``render_blocks_async``"""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        # Starting the worker waits for a browser launch, keep it off the loop
+        await loop.run_in_executor(None, self._get_backend)
+
+        # Fingerprinting hashes theme files and the lookups stat and copy
+        # cached outputs, run them off the loop
+        targets, owners, stats = await loop.run_in_executor(
+            None, self._deduplicate, blocks
+        )
+        output_paths: List[Optional[Path]] = [None] * len(blocks)
+        pending, waiting = await loop.run_in_executor(
+            None, self._resolve_targets, targets, output_paths, stats
+        )
+
+        if self.cli_config.batch:
+            logger.warning(
+                "Batch rendering is not supported asynchronously, "
+                "rendering charts one by one"
+            )
+        max_in_flight = (
+            self.cli_config.max_workers or 1 if self.cli_config.concurrent else 1
+        )
+        if self._limiter:
+            # The limiter narrows this down to what the machine can take
+            max_in_flight = self._limiter.max_limit
+        semaphore = asyncio.Semaphore(max_in_flight)
+        logger.info(
+            f"Rendering {len(pending)} charts asynchronously, "
+            f"max in flight: {max_in_flight}"
+        )
+
+        async def render(index: int) -> Tuple[int, Optional[Path]]:
+            output_path = None
+            try:
+                async with semaphore:
+                    output_path = await self.render_block_async(blocks[index], index)
             except Exception as e:
-                error_msg = str(e)
                 logger.error(
-                    f"Error during rendering: {error_msg}",
+                    f"Error rendering chart #{index + 1}: {str(e)}",
                     exc_info=logger.isEnabledFor(logging.DEBUG),
                 )
+            finally:
+                self._release(targets[index], output_path)
+            return index, output_path
+
+        async def wait(index: int, future: Future) -> Tuple[int, Optional[Path]]:
+            return index, await asyncio.wrap_future(future)
+
+        tasks = [asyncio.ensure_future(render(i)) for i in pending]
+        tasks += [asyncio.ensure_future(wait(i, f)) for i, f in waiting.items()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                i, output_path = await next_done
+                output_paths[i] = output_path
+                if output_path:
+                    logger.info(f"Chart #{i + 1} rendered successfully: {output_path}")
+                else:
+                    logger.warning(f"Chart #{i + 1} rendering failed")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        # Fan the results out to every occurrence
+        rendered = [
+            (block, output_paths[owner]) for block, owner in zip(blocks, owners)
+        ]
+        return rendered, stats
+
+    async def render_block_async(
+        self, block: RenderableBlock, index: int
+    ) -> Optional[Path]:
+        """Render a single Mermaid code block without blocking the event loop"""
+        with async_span("render_block", index=index):
+            return await self._render_block_async(block, index)
+
+    async def _render_block_async(
+        self, block: RenderableBlock, index: int
+    ) -> Optional[Path]:
+        """Look up, render, convert and store a single block"""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        render_options = block.get_render_options()
+
+        cached_output = await loop.run_in_executor(
+            None, self._get_cached_output, block, render_options
+        )
+        if cached_output:
+            return cached_output
+
+        output_path = await loop.run_in_executor(
+            None, self._get_output_path, block, render_options
+        )
+        try:
+            async with self._render_slot_async():
+                result = await self._render_artifact_async(block, render_options, index)
+            if result is None:
+                self._note(output_path, error="Rendering failed")
                 return None
+            self._note(output_path, render_ms=result.elapsed * 1000, error=None)
+            data = result.data
+
+            if self._needs_conversion():
+                # PDF conversion is CPU-bound, run it in the conversion pool
+                # when rendering concurrently, otherwise in a thread
+                output_format = self.cli_config.output_format
+                if self.cli_config.concurrent:
+                    data, elapsed = await asyncio.wrap_future(
+                        submit_traced(
+                            self._get_convert_pool(),
+                            convert_pdf_timed,
+                            data,
+                            output_format,
+                        )
+                    )
+                else:
+                    data, elapsed = await loop.run_in_executor(
+                        None, convert_pdf_timed, data, output_format
+                    )
+                self._note(output_path, convert_ms=elapsed * 1000)
+
+            return await loop.run_in_executor(
+                None, self._write_artifact, data, output_path
+            )
+
+        except Exception as e:
+            self._note(output_path, error=str(e))
+            logger.error(
+                f"Error during rendering: {str(e)}",
+                exc_info=logger.isEnabledFor(logging.DEBUG),
+            )
+            return None
+
+    async def _render_artifact_async(
+        self,
+        block: RenderableBlock,
+        render_options: MermaidRenderOptions,
+        index: Optional[int] = None,
+    ) -> Optional[RenderResult]:
+        """Run the render stage on the event loop"""
+        backend = self._get_backend()
+        with async_span("render", index=index, backend=backend.name):
+            result = await backend.render_async(
+                block.content,
+                render_options,
+                self._get_actual_output_format(self.cli_config.output_format),
+            )
+        if result:
+            self.render_latencies.record(result.elapsed)
+        return result
 
     def _build_render_command(
         self, input_file: Path, output_file: Path, options: MermaidRenderOptions
@@ -311,20 +1117,12 @@ class MermaidRenderer:
     def _convert_pdf_to_svg(self, pdf_path: Path, svg_path: Path):
         """Convert PDF to SVG"""
         logger.debug(f"Converting PDF to SVG: {pdf_path} -> {svg_path}")
-        doc = pymupdf.open(str(pdf_path))
-        page = doc[0]  # Get first page
-        svg_data = page.get_svg_image()
-        svg_path.write_text(svg_data, encoding="utf-8")
-        doc.close()
+        svg_path.write_bytes(convert_pdf(pdf_path.read_bytes(), OutputFormat.SVG))
 
     def _convert_pdf_to_png(self, pdf_path: Path, png_path: Path, dpi: int = 300):
         """Convert PDF to PNG"""
         logger.debug(f"Converting PDF to PNG: {pdf_path} -> {png_path}, DPI: {dpi}")
-        doc = pymupdf.open(str(pdf_path))
-        page = doc[0]  # Get first page
-        pix = page.get_pixmap(dpi=dpi)
-        pix.save(str(png_path))
-        doc.close()
+        png_path.write_bytes(convert_pdf(pdf_path.read_bytes(), OutputFormat.PNG, dpi))
 
     def _convert_pdf_to_other_format(
         self, pdf_path: Path, output_path: Path, format: OutputFormat
@@ -0,0 +1,99 @@
+"""
+Machine-readable run reports (--report).
+
+Renderers record the timings and outcome of every chart they handle, the
+processors turn them into one record per block found in their document, and
+the report aggregates those over the run. Aggregated timings count every
+distinct chart once, however many blocks share it.
+"""
+
+import logging
+from pathlib import Path
+from typing import List
+
+from ..models.cli_config import CLIConfig
+from ..models.run_report import BlockReport, RunReport, RunSummary
+from .cache import temporary_sibling
+from .process import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+# Bump when the report layout changes
+REPORT_VERSION = 1
+
+
+def build_report(
+    blocks: List[BlockReport],
+    cli_config: CLIConfig,
+    elapsed: float,
+    documents: int,
+    failed_documents: int = 0,
+) -> RunReport:
+    """
+    Aggregate the block records of a run
+
+    Args:
+        blocks: Records of every block processed, in any order
+        cli_config: CLI configuration of the run
+        elapsed: Wall time of the run in seconds
+        documents: Documents processed
+        failed_documents: Documents that could not be processed
+
+    Returns:
+        The report, blocks sorted by source file and line
+    """
+    blocks = sorted(blocks, key=lambda block: (block.source, block.line_start))
+    backend = cli_config.backend.value
+    if backend == "mmdc" and cli_config.persistent_worker:
+        backend = "worker"
+    summary = RunSummary(
+        backend=backend,
+        output_format=cli_config.output_format.value,
+        elapsed_s=round(elapsed, 3),
+        documents=documents,
+        failed_documents=failed_documents,
+        blocks=len(blocks),
+    )
+
+    render_ms = LatencyTracker(min_samples=1)
+    seen = set()
+    for block in blocks:
+        if block.error is None:
+            summary.rendered += 1
+        else:
+            summary.failed += 1
+        if block.fingerprint in seen:
+            block.duplicate = True
+            summary.duplicates += 1
+            continue
+        seen.add(block.fingerprint)
+        if block.cache_hit:
+            summary.cache_hits += 1
+        if block.render_ms is not None:
+            render_ms.record(block.render_ms)
+            summary.render_ms_total += block.render_ms
+        summary.convert_ms_total += block.convert_ms or 0.0
+        summary.output_bytes_total += block.output_bytes or 0
+
+    summary.unique = len(seen)
+    if seen:
+        summary.cache_hit_rate = round(summary.cache_hits / len(seen), 4)
+    if len(render_ms):
+        summary.render_ms_p50 = render_ms.percentile(0.5)
+        summary.render_ms_p95 = render_ms.p95()
+        summary.render_ms_max = render_ms.percentile(1.0)
+    return RunReport(version=REPORT_VERSION, summary=summary, blocks=blocks)
+
+
+def write_report(report: RunReport, path: str) -> None:
+    """Write a run report as JSON, atomically"""
+    report_path = Path(path)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = temporary_sibling(report_path)
+    try:
+        temp_path.write_text(report.model_dump_json(indent=2), encoding="utf-8")
+        temp_path.replace(report_path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+    logger.info(f"Run report written to {report_path}")
@@ -0,0 +1,271 @@
+"""
+Adaptive concurrency control for concurrent rendering.
+
+Every render runs a full headless Chromium, so the right number of renders in
+flight depends on the machine: too many and a large runner runs out of memory,
+too few and a small container sits idle. ``AdaptiveLimiter`` starts small and
+grows or shrinks the limit based on available memory and load from ``/proc``
+and on the peak RSS and latency observed for each render.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Assumed footprint of one render until the first one has been measured
+DEFAULT_RENDER_RSS = 300 * 1024 * 1024
+
+
+def read_meminfo() -> Dict[str, int]:
+    """Read /proc/meminfo, values in bytes (empty if unavailable)"""
+    info = {}
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                parts = value.split()
+                if parts:
+                    info[key] = int(parts[0]) * 1024
+    except OSError:
+        pass
+    return info
+
+
+def read_loadavg() -> Optional[float]:
+    """Read the one-minute load average"""
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+
+def process_tree_rss(pids) -> Dict[int, int]:
+    """
+    Get the resident memory of each process tree rooted at ``pids``
+
+    mermaid-cli runs as npx -> node -> chromium (several processes), so the
+    footprint of a render is the sum over all of its descendants.
+    """
+    children: Dict[int, list] = {}
+    rss: Dict[int, int] = {}
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces, fields resume after ")"
+        fields = stat[stat.rfind(")") + 2 :].split()
+        pid = int(entry.name)
+        children.setdefault(int(fields[1]), []).append(pid)
+        rss[pid] = int(fields[21]) * page_size
+
+    totals = {}
+    for root in pids:
+        total, stack = 0, [root]
+        while stack:
+            pid = stack.pop()
+            total += rss.get(pid, 0)
+            stack.extend(children.get(pid, ()))
+        totals[root] = total
+    return totals
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that adapts to memory pressure, load and latency"""
+
+    def __init__(
+        self,
+        max_limit: int,
+        memory_budget: Optional[int] = None,
+        sample_interval: float = 0.5,
+    ):
+        """
+        Args:
+            max_limit: Upper bound of renders in flight
+            memory_budget: Bytes renders may use in total (default: 75% of
+                the memory available at start)
+            sample_interval: Seconds between /proc samples
+        """
+        self.max_limit = max(1, max_limit)
+        self.cpu_count = os.cpu_count() or 1
+        if memory_budget is None:
+            available = read_meminfo().get("MemAvailable")
+            memory_budget = int(available * 0.75) if available else None
+        self.memory_budget = memory_budget
+        self.sample_interval = sample_interval
+
+        self.limit = min(self.max_limit, max(1, self.cpu_count // 4))
+        self.in_flight = 0
+        self.render_rss: Optional[float] = None  # EWMA of peak RSS per render
+        self.latency: Optional[float] = None  # EWMA of render latency
+        self.best_latency: Optional[float] = None
+        self._completed_at_limit = 0
+        self._condition = threading.Condition()
+        # Event loops and events of coroutines waiting in acquire_async
+        self._async_waiters: List[Tuple[Any, Any]] = []
+
+        # Peak RSS of tracked render process trees, sampled in the background
+        self._tracked: Dict[int, int] = {}
+        self._sampler: Optional[threading.Thread] = None
+        self._closed = False
+
+    def acquire(self) -> None:
+        """Wait for a free render slot"""
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self) -> None:
+        """Wait for a free render slot without blocking the event loop"""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        while True:
+            event = asyncio.Event()
+            with self._condition:
+                if self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return
+                self._async_waiters.append((loop, event))
+            await event.wait()
+
+    def try_acquire(self) -> bool:
+        """Take a render slot if one is free"""
+        with self._condition:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency: Optional[float] = None) -> None:
+        """Free a render slot, recording the render's latency"""
+        with self._condition:
+            self.in_flight -= 1
+            if latency is not None:
+                self.latency = self._ewma(self.latency, latency)
+                if self.best_latency is None or self.latency < self.best_latency:
+                    self.best_latency = self.latency
+                self._completed_at_limit += 1
+            self._adjust()
+            self._notify()
+
+    def _notify(self) -> None:
+        """Wake every waiter to re-check the limit (call with the condition held)"""
+        self._condition.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The waiter's event loop is closed
+                pass
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold a render slot for the duration of a render"""
+        self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def track(self, pid: int) -> None:
+        """Start sampling the memory of a render process tree"""
+        with self._condition:
+            self._tracked[pid] = 0
+            if self._sampler is None and os.path.isdir("/proc"):
+                self._sampler = threading.Thread(target=self._sample, daemon=True)
+                self._sampler.start()
+
+    def untrack(self, pid: int) -> int:
+        """Stop sampling a render process tree and record its peak RSS"""
+        with self._condition:
+            peak = self._tracked.pop(pid, 0)
+            if peak:
+                self.render_rss = self._ewma(self.render_rss, peak)
+        return peak
+
+    def close(self) -> None:
+        """Stop the background sampler"""
+        self._closed = True
+
+    @staticmethod
+    def _ewma(current: Optional[float], value: float, alpha: float = 0.3) -> float:
+        return value if current is None else alpha * value + (1 - alpha) * current
+
+    def _sample(self) -> None:
+        """Record the peak RSS of every tracked render"""
+        while not self._closed:
+            with self._condition:
+                pids = list(self._tracked)
+            if pids:
+                try:
+                    totals = process_tree_rss(pids)
+                except OSError:
+                    totals = {}
+                with self._condition:
+                    for pid, total in totals.items():
+                        if pid in self._tracked:
+                            self._tracked[pid] = max(self._tracked[pid], total)
+                    self._adjust()
+                    self._notify()
+            time.sleep(self.sample_interval)
+
+    def _memory_cap(self) -> int:
+        """Largest limit the memory budget and current availability allow"""
+        per_render = self.render_rss or DEFAULT_RENDER_RSS
+        caps = [self.max_limit]
+        if self.memory_budget:
+            caps.append(int(self.memory_budget // per_render))
+        available = read_meminfo().get("MemAvailable")
+        if available is not None:
+            # Renders already in flight are part of what is no longer available
+            caps.append(self.in_flight + int(available * 0.9 // per_render))
+        return max(1, min(caps))
+
+    def _adjust(self) -> None:
+        """Grow or shrink the limit (call with the condition held)"""
+        previous = self.limit
+        memory_cap = self._memory_cap()
+        load = read_loadavg()
+        overloaded = load is not None and load > self.cpu_count * 2.5
+        busy = load is not None and load > self.cpu_count * 1.5
+        # Latency well above the best seen means renders are contending.
+        # Judged once per full round at the current limit, so that a
+        # decrease gets a chance to show in the latency before the next one
+        slowing = (
+            self.latency is not None
+            and self.best_latency is not None
+            and self.latency > self.best_latency * 2
+            and self._completed_at_limit >= self.limit
+        )
+
+        if memory_cap < self.limit:
+            self.limit = memory_cap
+        elif overloaded or slowing:
+            # Halve the limit when the machine is overloaded, step down by
+            # one when latency degrades; best_latency stays the true minimum
+            self.limit = max(1, self.limit // 2 if overloaded else self.limit - 1)
+            self._completed_at_limit = 0
+        elif not busy and self._completed_at_limit >= self.limit:
+            # Additive increase once a full round completed at this limit
+            self.limit = min(self.limit + 1, memory_cap)
+            self._completed_at_limit = 0
+
+        if self.limit != previous:
+            logger.debug(
+                f"Adaptive concurrency: {previous} -> {self.limit} "
+                f"(memory cap {memory_cap}, load {load}, "
+                f"render rss {self.render_rss}, latency {self.latency})"
+            )
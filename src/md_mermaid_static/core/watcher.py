@@ -0,0 +1,310 @@
+"""
+File watching for --watch mode.
+
+Waits for changes to the input documents, theme directories and theme files,
+using inotify on Linux and stat polling elsewhere. Bursts of writes (editors
+saving through temporary files, formatters running on save) are debounced into
+a single change set.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..utils.theme_manager import get_theme_manager
+
+if TYPE_CHECKING:
+    from .processor import MarkdownProcessor
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _is_scratch_file(name: str) -> bool:
+    """Editor swap files, backups and our own temporary files"""
+    return name.startswith(".") or name.endswith(("~", ".tmp", ".swp"))
+
+
+class _PollingBackend:
+    """Detect changes by comparing stat snapshots"""
+
+    def __init__(self, files: Set[Path], dirs: List[Path], interval: float):
+        self.files = files
+        self.dirs = dirs
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        paths = set(self.files)
+        for root in self.dirs:
+            for dirpath, _, filenames in os.walk(root):
+                paths.update(
+                    Path(dirpath) / name
+                    for name in filenames
+                    if not _is_scratch_file(name)
+                )
+        snapshot = {}
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self, timeout: Optional[float]) -> Set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return set()
+            time.sleep(
+                self.interval if remaining is None else min(self.interval, remaining)
+            )
+
+            snapshot = self._scan()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changed:
+                return changed
+
+    def close(self) -> None:
+        pass
+
+
+class _InotifyBackend:
+    """Detect changes with Linux inotify through ctypes"""
+
+    def __init__(self, files: Set[Path], dirs: List[Path]):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.files = files
+        self.dirs = dirs
+        self._watches: Dict[int, Path] = {}
+        self._trees: Set[Path] = set()
+        try:
+            # Watch parent directories: editors often replace files on save,
+            # which would silently drop a watch on the file itself
+            for directory in {path.parent for path in files}:
+                self._watch(directory)
+            for root in dirs:
+                self._watch_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch(self, directory: Path) -> None:
+        wd = self._add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(
+                ctypes.get_errno(), f"inotify_add_watch failed for {directory}"
+            )
+        self._watches[wd] = directory
+
+    def _watch_tree(self, root: Path) -> None:
+        self._trees.add(root)
+        for dirpath, _, _ in os.walk(root):
+            self._watch(Path(dirpath))
+
+    def _in_tree(self, path: Path) -> bool:
+        return any(root == path or root in path.parents for root in self._trees)
+
+    def poll(self, timeout: Optional[float]) -> Set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = (
+                None if deadline is None else max(0, deadline - time.monotonic())
+            )
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                return set()
+            changed = self._read_events()
+            if changed:
+                return changed
+
+    def _read_events(self) -> Set[Path]:
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, report everything as changed
+                changed.update(self.files)
+                changed.update(self._trees)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None or not name:
+                continue
+
+            path = directory / name
+            if path in self.files and not mask & IN_ISDIR:
+                # Watched explicitly, even when named like a scratch file
+                changed.add(path)
+            elif _is_scratch_file(name):
+                continue
+            elif mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and self._in_tree(path):
+                    self._watch_tree(path)
+                    changed.add(path)
+            elif self._in_tree(path):
+                changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class FileWatcher:
+    """Wait for debounced changes to files and directory trees"""
+
+    def __init__(
+        self,
+        files: Iterable[Path],
+        dirs: Iterable[Path] = (),
+        debounce: float = 0.2,
+        poll_interval: float = 0.5,
+        use_inotify: bool = True,
+    ):
+        """
+        Args:
+            files: Files to watch
+            dirs: Directory trees to watch (e.g. theme directories)
+            debounce: Quiet period that ends a burst of changes, in seconds
+            poll_interval: Seconds between scans when polling
+            use_inotify: Use inotify when available
+        """
+        files = {Path(path).absolute() for path in files}
+        dirs = [Path(path).absolute() for path in dirs if Path(path).is_dir()]
+        self.debounce = debounce
+
+        self._backend = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._backend = _InotifyBackend(files, dirs)
+                logger.debug("Watching for changes with inotify")
+            except (OSError, AttributeError) as e:
+                logger.debug(f"inotify unavailable, polling for changes: {e}")
+        if self._backend is None:
+            self._backend = _PollingBackend(files, dirs, poll_interval)
+
+    @property
+    def backend(self) -> str:
+        """Name of the change detection backend in use"""
+        return "inotify" if isinstance(self._backend, _InotifyBackend) else "polling"
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """
+        Wait for changes
+
+        Args:
+            timeout: Seconds to wait for the first change (None waits forever)
+
+        Returns:
+            Paths changed during the burst, empty on timeout
+        """
+        changes = self._backend.poll(timeout)
+        if not changes:
+            return set()
+        # Keep collecting until the burst is over
+        while True:
+            more = self._backend.poll(self.debounce)
+            if not more:
+                return changes
+            changes |= more
+
+    def close(self) -> None:
+        """Release the change detection backend"""
+        self._backend.close()
+
+    def __enter__(self) -> "FileWatcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def watch_and_process(processor: "MarkdownProcessor", debounce: float = 0.2) -> None:
+    """
+    Re-process a document whenever it or its theme files change
+
+    The processor and its renderer stay alive between iterations, so a
+    persistent render worker stays warm and unchanged charts are served from
+    the render cache. Runs until interrupted.
+    """
+    cli_config = processor.cli_config
+    theme_manager = get_theme_manager(
+        Path(cli_config.themes_dir) if cli_config.themes_dir else None
+    )
+    files = {processor.input_file.absolute()}
+    for extra in (cli_config.config_file, cli_config.css_file):
+        if extra:
+            files.add(Path(extra).absolute())
+
+    with FileWatcher(files, theme_manager.themes_dirs, debounce=debounce) as watcher:
+        logger.info(
+            f"Watching {processor.input_file} for changes ({watcher.backend}), "
+            "press Ctrl+C to stop"
+        )
+        while True:
+            changed = watcher.wait()
+            if not processor.input_file.exists():
+                # Mid-save in editors that delete and recreate the file
+                continue
+            if changed - files:
+                # Theme files changed, pick up added or removed themes
+                theme_manager.reload()
+
+            logger.info(
+                f"Change detected: {', '.join(sorted(p.name for p in changed))}"
+            )
+            started = time.monotonic()
+            try:
+                output_file = processor.process()
+            except Exception as e:
+                logger.error(
+                    f"Error processing {processor.input_file}: {e}",
+                    exc_info=logger.isEnabledFor(logging.DEBUG),
+                )
+                continue
+            logger.info(f"Updated {output_file} in {time.monotonic() - started:.2f}s")
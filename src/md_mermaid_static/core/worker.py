@@ -0,0 +1,249 @@
+"""
+Persistent Mermaid render worker.
+
+Wraps ``render_worker.mjs``: a Node process that keeps one headless browser and
+a pool of warm pages alive for the whole run, so each diagram only pays for
+layout instead of Node startup, npx resolution and a Chromium launch.
+"""
+
+import base64
+import itertools
+import json
+import logging
+import subprocess
+import threading
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Bundled Node script implementing the JSON-lines protocol
+WORKER_SCRIPT = Path(__file__).with_name("render_worker.mjs")
+
+
+class RenderWorkerError(RuntimeError):
+    """Raised when the render worker cannot start or a render fails"""
+
+
+class RenderWorker:
+    """Client for a long-lived render worker process"""
+
+    def __init__(
+        self, launcher: List[str], pages: int = 1, startup_timeout: float = 300
+    ):
+        """
+        Args:
+            launcher: Command prefix used to run ``node`` with mermaid-cli available
+                (e.g. ``["npx", "--package=@mermaid-js/mermaid-cli@11", "node"]``)
+            pages: Number of warm browser pages kept by the worker
+            startup_timeout: Seconds to wait for the browser to come up
+        """
+        self.pages = max(1, pages)
+        self.command = [*launcher, str(WORKER_SCRIPT), str(self.pages)]
+        self.startup_timeout = startup_timeout
+        self._process: Optional[subprocess.Popen] = None
+        self._pending: Dict[int, Future] = {}
+        # Timed out requests the worker may still be busy with
+        self._abandoned: Set[int] = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._error: Optional[str] = None
+        self._stderr_tail: deque = deque(maxlen=20)
+        self._stdout_reader: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the worker process is alive"""
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        """Start the worker and wait until its browser is ready"""
+        if self.running:
+            return
+
+        logger.debug(f"Starting render worker: {' '.join(self.command)}")
+        self._ready.clear()
+        self._error = None
+        self._process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        self._stdout_reader = threading.Thread(
+            target=self._read_stdout, args=(self._process,), daemon=True
+        )
+        self._stdout_reader.start()
+        threading.Thread(
+            target=self._read_stderr, args=(self._process,), daemon=True
+        ).start()
+
+        if not self._ready.wait(self.startup_timeout):
+            self.close()
+            raise RenderWorkerError(
+                f"Render worker did not start within {self.startup_timeout}s"
+            )
+        if self._error:
+            error = self._error
+            self.close()
+            raise RenderWorkerError(f"Render worker failed to start: {error}")
+
+    def submit(
+        self, definition: str, output_format: str, options: Dict[str, Any]
+    ) -> Future:
+        """Queue a diagram for rendering, returns a future resolving to bytes"""
+        if not self.running:
+            self.start()
+
+        future: Future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            request = {
+                "id": request_id,
+                "definition": definition,
+                "format": output_format,
+                "options": options,
+            }
+            try:
+                self._process.stdin.write(json.dumps(request) + "\n")
+                self._process.stdin.flush()
+            except OSError as e:
+                self._pending.pop(request_id, None)
+                future.set_exception(
+                    RenderWorkerError(f"Render worker is not accepting input: {e}")
+                )
+        return future
+
+    def render(
+        self, definition: str, output_format: str, options: Dict[str, Any]
+    ) -> bytes:
+        """Render a diagram and wait for the artifact bytes"""
+        return self.submit(definition, output_format, options).result()
+
+    def abandon(self, future: Future) -> None:
+        """
+        Give up on a request, e.g. after it timed out
+
+        The worker has no way to cancel a render, its page stays busy until
+        the render completes. Once every page is held by an abandoned request
+        the worker is restarted, failing the requests queued behind them.
+        """
+        future.cancel()
+        with self._lock:
+            request_id = next(
+                (key for key, pending in self._pending.items() if pending is future),
+                None,
+            )
+            if request_id is None:
+                # Already answered
+                return
+            del self._pending[request_id]
+            self._abandoned.add(request_id)
+            if len(self._abandoned) < self.pages:
+                return
+            process, self._process = self._process, None
+            pending, self._pending = self._pending, {}
+            self._abandoned.clear()
+            reader = self._stdout_reader
+
+        logger.warning(
+            f"All {self.pages} render worker pages are stuck, restarting the worker"
+        )
+        if process is not None:
+            process.kill()
+            process.wait()
+        if reader is not None:
+            # Let it wind down before a new worker reuses the ready flag
+            reader.join()
+        for queued in pending.values():
+            self._settle(queued, error="Render worker was restarted")
+
+    def close(self) -> None:
+        """Stop the worker, letting in-flight renders finish"""
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            if process.stdin:
+                process.stdin.close()
+            process.wait(timeout=30)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+        logger.debug("Render worker stopped")
+
+    def __enter__(self) -> "RenderWorker":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _read_stdout(self, process: subprocess.Popen) -> None:
+        """Dispatch worker responses to their pending futures"""
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                logger.debug(f"Render worker: {line.rstrip()}")
+                continue
+
+            if "ready" in message:
+                if not message["ready"]:
+                    self._error = message.get("error", "unknown error")
+                else:
+                    logger.debug(f"Render worker ready: {message}")
+                self._ready.set()
+                continue
+
+            with self._lock:
+                future = self._pending.pop(message.get("id"), None)
+                abandoned = future is None and message.get("id") in self._abandoned
+                self._abandoned.discard(message.get("id"))
+            if abandoned:
+                logger.debug(
+                    f"Render worker finished abandoned request {message['id']}"
+                )
+            elif future is None:
+                logger.debug(f"Unexpected render worker message: {message}")
+            elif message.get("ok"):
+                self._settle(future, data=base64.b64decode(message["data"]))
+            else:
+                self._settle(future, error=message.get("error"))
+
+        # Worker exited, fail everything still waiting on it
+        error = "\n".join(self._stderr_tail) or "render worker exited"
+        if not self._ready.is_set():
+            self._error = error
+            self._ready.set()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            self._settle(future, error=error)
+
+    @staticmethod
+    def _settle(
+        future: Future, data: Optional[bytes] = None, error: Optional[str] = None
+    ) -> None:
+        """Resolve a request, unless its caller cancelled it meanwhile"""
+        try:
+            if error is None:
+                future.set_result(data)
+            else:
+                future.set_exception(RenderWorkerError(error))
+        except InvalidStateError:
+            pass
+
+    def _read_stderr(self, process: subprocess.Popen) -> None:
+        """Drain worker stderr so it never blocks on a full pipe"""
+        for line in process.stderr:
+            line = line.rstrip()
+            self._stderr_tail.append(line)
+            logger.debug(f"Render worker stderr: {line}")
@@ -0,0 +1,398 @@
+"""
+End-to-end load test: diagrams per second across concurrency levels.
+
+Generates a corpus of flowchart, sequence, class, gantt and pie diagrams across
+built-in and custom themes, then processes it once for every combination of
+output format and worker count. Each run happens in a fresh process, so caches,
+warm browsers and peak memory never carry over between runs.
+
+Reports throughput, p50/p95/p99 per-diagram render latency and peak RSS of
+the whole process tree (including mermaid-cli and its browsers), as a table
+and optionally as JSON.
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import click
+
+DIAGRAM_TYPES = {
+    "flowchart": (
+        "flowchart LR\n"
+        "    A{i}[Request {i}] --> B{i}{{Valid?}}\n"
+        "    B{i} -->|yes| C{i}[Handle]\n"
+        "    B{i} -->|no| D{i}[Reject]\n"
+        "    C{i} --> E{i}[(Store)]"
+    ),
+    "sequence": (
+        "sequenceDiagram\n"
+        "    participant C as Client {i}\n"
+        "    participant S as Server\n"
+        "    C->>S: GET /items/{i}\n"
+        "    S-->>C: 200 OK\n"
+        "    C->>S: POST /items/{i}\n"
+        "    S-->>C: 201 Created"
+    ),
+    "class": (
+        "classDiagram\n"
+        "    class Repository{i} {{\n"
+        "        +find(id) Item\n"
+        "        +save(item)\n"
+        "    }}\n"
+        "    class Item{i} {{\n"
+        "        +id: int\n"
+        "        +name: str\n"
+        "    }}\n"
+        "    Repository{i} --> Item{i}"
+    ),
+    "gantt": (
+        "gantt\n"
+        "    title Release {i}\n"
+        "    dateFormat YYYY-MM-DD\n"
+        "    section Build\n"
+        "    Design {i}    :a1, 2024-01-01, 3d\n"
+        "    Implement {i} :a2, after a1, 5d\n"
+        "    section Ship\n"
+        "    Test {i}      :after a2, 2d"
+    ),
+    "pie": (
+        'pie title Traffic {i}\n    "Web" : {web}\n    "API" : {api}\n    "Batch" : 10'
+    ),
+}
+
+BUILTIN_THEMES = ["default", "forest", "dark", "neutral"]
+
+OUTPUT_FORMATS = ["svg", "png", "pdf", "enhanced-svg"]
+
+
+def generate_corpus(
+    root: Path, documents: int, diagrams: int, types: List[str], themes: List[str]
+) -> int:
+    """
+    Write a synthetic corpus into ``root``
+
+    Every diagram is unique, so no run is served by deduplication. Types and
+    themes are cycled independently, covering every combination.
+
+    Returns:
+        The number of diagrams written
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    number = 0
+    for document in range(documents):
+        sections = [f"# Load test document {document}\n"]
+        for _ in range(diagrams):
+            diagram_type = types[number % len(types)]
+            theme = themes[(number // len(types)) % len(themes)]
+            source = DIAGRAM_TYPES[diagram_type].format(
+                i=number, web=30 + number % 50, api=20 + number % 30
+            )
+            sections.append(
+                f"## {diagram_type} {number}\n\n"
+                f"```mermaid\n---\nrender-theme: {theme}\n---\n{source}\n```\n"
+            )
+            number += 1
+        (root / f"doc_{document:04d}.md").write_text(
+            "\n".join(sections), encoding="utf-8"
+        )
+    return number
+
+
+class PeakRSS:
+    """Sample the resident memory of this process and all its descendants"""
+
+    def __init__(self, interval: float = 0.05):
+        import threading
+
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self) -> int:
+        from .core.scheduler import process_tree_rss
+
+        return process_tree_rss([os.getpid()]).get(os.getpid(), 0)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._sample())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "PeakRSS":
+        if os.path.isdir("/proc"):
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        else:
+            # No /proc: peak of this process and of its largest reaped child
+            try:
+                import resource
+            except ImportError:
+                return
+            # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+            scale = 1 if sys.platform == "darwin" else 1024
+            self.peak = scale * max(
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+            )
+
+
+def run_point(
+    corpus_dir: str, output_dir: str, config: Dict[str, Any], diagrams: int
+) -> Dict[str, Any]:
+    """
+    Process the corpus with one configuration, in a fresh process
+
+    Args:
+        corpus_dir: Directory of the generated corpus
+        output_dir: Output directory for this run
+        config: CLIConfig fields of the run
+        diagrams: Number of diagrams in the corpus
+
+    Returns:
+        Measurements of the run
+    """
+    import logging
+
+    from .core.corpus import CorpusProcessor, discover_inputs
+    from .models import CLIConfig
+    from .utils.logger import logger as app_logger, setup_logging
+
+    # Only render failures are worth printing during a sweep
+    setup_logging()
+    app_logger.setLevel(logging.WARNING)
+    logging.getLogger("md_mermaid_static").setLevel(logging.WARNING)
+
+    cli_config = CLIConfig(output_dir=output_dir, **config)
+    CLIConfig.set_instance(cli_config)
+    inputs = discover_inputs([corpus_dir])
+
+    with PeakRSS() as rss:
+        started = time.monotonic()
+        with CorpusProcessor(inputs, cli_config) as corpus:
+            corpus.process()
+            latencies = corpus.renderer.render_latencies
+            elapsed = time.monotonic() - started
+
+    rendered = sum(
+        1 for path in (Path(output_dir) / "media").iterdir() if path.is_file()
+    )
+    return {
+        "seconds": round(elapsed, 3),
+        "diagrams": diagrams,
+        "rendered": rendered,
+        "failed": diagrams - rendered,
+        "diagrams_per_s": round(rendered / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": _ms(latencies.percentile(0.50)),
+        "p95_ms": _ms(latencies.percentile(0.95)),
+        "p99_ms": _ms(latencies.percentile(0.99)),
+        "peak_rss_mb": round(rss.peak / 1024 / 1024, 1),
+    }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _format_table(results: List[Dict[str, Any]]) -> str:
+    columns = [
+        ("format", "format", "{}"),
+        ("workers", "workers", "{}"),
+        ("diagrams/s", "diagrams_per_s", "{:.2f}"),
+        ("p50 ms", "p50_ms", "{:.1f}"),
+        ("p95 ms", "p95_ms", "{:.1f}"),
+        ("p99 ms", "p99_ms", "{:.1f}"),
+        ("peak RSS MB", "peak_rss_mb", "{:.1f}"),
+        ("failed", "failed", "{}"),
+    ]
+    rows = [[title for title, _, _ in columns]]
+    for result in results:
+        rows.append(
+            [
+                "-" if result.get(key) is None else fmt.format(result[key])
+                for _, key, fmt in columns
+            ]
+        )
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    return "\n".join(
+        "  ".join(
+            cell.ljust(width) if i == 0 else cell.rjust(width)
+            for i, (cell, width) in enumerate(zip(row, widths))
+        )
+        for row in rows
+    )
+
+
+@click.command()
+@click.option(
+    "--documents", type=int, default=5, help="Documents in the generated corpus"
+)
+@click.option("--diagrams", type=int, default=10, help="Diagrams per document")
+@click.option(
+    "--types",
+    default=",".join(DIAGRAM_TYPES),
+    help=f"Comma-separated diagram types ({', '.join(DIAGRAM_TYPES)})",
+)
+@click.option(
+    "--themes",
+    default=None,
+    help="Comma-separated themes (default: every built-in and custom theme)",
+)
+@click.option(
+    "--workers",
+    default="1,2,4",
+    help="Comma-separated worker counts to sweep, 'cpu' is the CPU core count",
+)
+@click.option(
+    "--formats",
+    default=",".join(OUTPUT_FORMATS),
+    help=f"Comma-separated output formats to sweep ({', '.join(OUTPUT_FORMATS)})",
+)
+@click.option(
+    "--backend",
+    type=click.Choice(["mmdc", "worker", "fake"]),
+    default="mmdc",
+    help="Render engine (fake measures the pipeline without Node)",
+)
+@click.option(
+    "--use-command",
+    type=click.Choice(["auto", "npx", "pnpx"]),
+    default="auto",
+    help="Specify whether to use npx or pnpx command (default is auto-detect)",
+)
+@click.option(
+    "--themes-dir",
+    type=click.Path(exists=True),
+    help="Directory containing theme folders",
+)
+@click.option(
+    "--work-dir",
+    type=click.Path(),
+    default=None,
+    help="Directory for the corpus and outputs (default: a temporary directory)",
+)
+@click.option(
+    "--json", "json_file", type=click.Path(), help="Write the results as JSON"
+)
+def main(
+    documents: int,
+    diagrams: int,
+    types: str,
+    themes: Optional[str],
+    workers: str,
+    formats: str,
+    backend: str,
+    use_command: str,
+    themes_dir: Optional[str],
+    work_dir: Optional[str],
+    json_file: Optional[str],
+):
+    """Measure diagrams/second across worker counts and output formats."""
+    import multiprocessing
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+
+    diagram_types = _split(types)
+    unknown = sorted(set(diagram_types) - set(DIAGRAM_TYPES))
+    if unknown:
+        raise click.BadParameter(
+            f"unknown diagram types: {', '.join(unknown)}", param_hint="'--types'"
+        )
+    output_formats = _split(formats)
+    unknown = sorted(set(output_formats) - set(OUTPUT_FORMATS))
+    if unknown:
+        raise click.BadParameter(
+            f"unknown formats: {', '.join(unknown)}", param_hint="'--formats'"
+        )
+    try:
+        worker_counts = [
+            os.cpu_count() or 1 if count == "cpu" else int(count)
+            for count in _split(workers)
+        ]
+    except ValueError:
+        raise click.BadParameter(
+            f"'{workers}' is not a list of integers", param_hint="'--workers'"
+        )
+
+    if themes:
+        theme_names = _split(themes)
+    else:
+        from .utils.theme_manager import get_theme_manager
+
+        manager = get_theme_manager(Path(themes_dir) if themes_dir else None)
+        theme_names = BUILTIN_THEMES + sorted(manager.get_available_themes())
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(work_dir or temp_dir)
+        corpus_dir = root / "corpus"
+        total = generate_corpus(
+            corpus_dir, documents, diagrams, diagram_types, theme_names
+        )
+        click.echo(
+            f"Corpus: {total} diagrams in {documents} documents, "
+            f"{len(diagram_types)} types, {len(theme_names)} themes, backend {backend}"
+        )
+
+        results = []
+        # spawn: every run starts from a cold process with its own peak RSS
+        context = multiprocessing.get_context("spawn")
+        for output_format in output_formats:
+            for count in worker_counts:
+                config = {
+                    "output_format": output_format,
+                    "pdf_fit": output_format == "enhanced-svg",
+                    "concurrent": count > 1,
+                    "max_workers": count,
+                    "backend": backend,
+                    "use_command": use_command,
+                    "themes_dir": themes_dir,
+                    # Measure rendering, not the cache
+                    "cache": False,
+                }
+                output_dir = root / f"output-{output_format}-{count}"
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    result = pool.submit(
+                        run_point, str(corpus_dir), str(output_dir), config, total
+                    ).result()
+                result = {"format": output_format, "workers": count, **result}
+                results.append(result)
+                click.echo(
+                    f"{output_format} x{count}: "
+                    f"{result['diagrams_per_s']:.2f} diagrams/s, "
+                    f"{result['failed']} failed"
+                )
+
+    click.echo()
+    click.echo(_format_table(results))
+
+    if json_file:
+        report = {
+            "corpus": {
+                "documents": documents,
+                "diagrams": total,
+                "types": diagram_types,
+                "themes": theme_names,
+            },
+            "backend": backend,
+            "cpu_count": os.cpu_count(),
+            "results": results,
+        }
+        Path(json_file).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        click.echo(f"Results written to {json_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,17 +2,33 @@
 Models package for md_mermaid_static.
 """
 
-from .enums import OutputFormat, Theme, LogLevel
+from .enums import OutputFormat, Theme, LogLevel, RenderBackendType
 from .cli_config import CLIConfig
 from .mermaid_config import MermaidConfig, MermaidRenderOptions
-from .mermaid_block import MermaidBlock
+from .mermaid_block import MermaidBlock, RenderableBlock
+from .render_stats import RenderStats
+from .render_result import RenderResult
+from .manifest import BlockRecord, DocumentManifest
+from .run_report import BlockReport, RunReport, RunSummary
+from .document_scan import ChartRequest, DocumentScan
 
 __all__ = [
     "OutputFormat",
     "Theme",
     "LogLevel",
+    "RenderBackendType",
     "CLIConfig",
     "MermaidConfig",
     "MermaidRenderOptions",
     "MermaidBlock",
+    "RenderableBlock",
+    "RenderStats",
+    "RenderResult",
+    "BlockRecord",
+    "DocumentManifest",
+    "BlockReport",
+    "RunReport",
+    "RunSummary",
+    "ChartRequest",
+    "DocumentScan",
 ]
@@ -5,7 +5,7 @@ CLI Configuration model.
 from typing import Optional, ClassVar
 from pydantic import BaseModel
 
-from .enums import OutputFormat, Theme, LogLevel
+from .enums import OutputFormat, Theme, LogLevel, RenderBackendType
 
 
 class CLIConfig(BaseModel):
@@ -18,6 +18,23 @@ class CLIConfig(BaseModel):
     output_format: OutputFormat = OutputFormat.SVG
     concurrent: bool = False
     max_workers: Optional[int] = 4
+    adaptive_workers: bool = (
+        False  # Adapt renders in flight to load and memory (--max-workers auto)
+    )
+    memory_budget_mb: Optional[int] = None  # Memory renders may use in adaptive mode
+    convert_workers: Optional[int] = (
+        None  # PDF conversion processes, defaults to CPU count
+    )
+    parse_workers: Optional[int] = (
+        None  # Parse/replace processes for many files, None: threads
+    )
+    render_timeout: Optional[float] = (
+        300  # Seconds before a render is killed, None disables
+    )
+    render_retries: int = (
+        1  # Retries of renders that failed transiently (timeout, crash)
+    )
+    hedge: bool = False  # Start a second attempt once a render exceeds the p95 latency
     theme: Optional[Theme] = Theme.DEFAULT
     custom_theme: Optional[str] = None  # Custom theme name when not a built-in theme
     width: Optional[int] = None
@@ -32,6 +49,25 @@ class CLIConfig(BaseModel):
     log_level: LogLevel = LogLevel.INFO  # Log level
     use_command: str = "auto"  # Which command to use for mermaid-cli: auto, npx, pnpx
     themes_dir: Optional[str] = None  # Directory containing theme folders
+    backend: RenderBackendType = RenderBackendType.MMDC  # Engine rendering the charts
+    persistent_worker: bool = (
+        False  # Render through one long-lived browser worker (backend "worker")
+    )
+    incremental: bool = (
+        False  # Skip unchanged documents using a manifest next to the output
+    )
+    stream: bool = (
+        False  # Stream the input line by line instead of loading it into memory
+    )
+    watch: bool = False  # Re-process whenever the input or theme files change
+    batch: bool = False  # Render charts with identical options in one mermaid-cli run
+    cache: bool = True  # Reuse charts already rendered into the media directory
+    shared_cache: bool = False  # Also use the user-level cache shared across projects
+    shared_cache_dir: Optional[str] = (
+        None  # Defaults to $XDG_CACHE_HOME/md-mermaid-static
+    )
+    shared_cache_size_mb: int = 1024  # Size cap of the shared cache (LRU eviction)
+    report_file: Optional[str] = None  # Write a JSON run report with per-block timings
 
     @classmethod
     def set_instance(cls, instance: "CLIConfig") -> None:
@@ -0,0 +1,35 @@
+"""
+Messages exchanged with parse workers in multi-process corpus mode.
+"""
+
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from .mermaid_config import MermaidConfig
+from .run_report import BlockReport
+
+
+class ChartRequest(BaseModel):
+    """A chart a parse worker found no rendered artifact for"""
+
+    index: int  # Position of the block in its document
+    content: str
+    config: MermaidConfig
+    line_start: int
+    line_end: int
+
+
+class DocumentScan(BaseModel):
+    """Result of scanning one document in a parse worker"""
+
+    input_file: str
+    # Set when the worker could finish the document on its own
+    output_file: Optional[str] = None
+    # Charts the coordinator has to render before the document can be written
+    missing: List[ChartRequest] = []
+    # Input state at scan time, the document is re-read to write the output
+    input_size: int = 0
+    input_mtime_ns: int = 0
+    # Per-block records when a run report is requested
+    blocks: List[BlockReport] = []
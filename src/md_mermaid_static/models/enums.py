@@ -31,3 +31,11 @@ class LogLevel(str, Enum):
     WARNING = "warning"
     ERROR = "error"
     CRITICAL = "critical"
+
+
+class RenderBackendType(str, Enum):
+    """Engines that turn a diagram source into an image"""
+
+    MMDC = "mmdc"  # One mermaid-cli process per chart
+    WORKER = "worker"  # One long-lived browser worker
+    FAKE = "fake"  # Deterministic placeholders, no Node or browser needed
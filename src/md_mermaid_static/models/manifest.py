@@ -0,0 +1,36 @@
+"""
+Document manifest models for incremental processing.
+"""
+
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class BlockRecord(BaseModel):
+    """A Mermaid block as processed in the previous run"""
+
+    fingerprint: str  # Render cache fingerprint
+    line_start: int
+    line_end: int
+    span_start: Optional[int] = None
+    span_end: Optional[int] = None
+    media: Optional[str] = (
+        None  # Rendered image relative to the output dir, None if failed
+    )
+    diagram_type: Optional[str] = None  # Brief description of the chart, for --report
+
+
+class DocumentManifest(BaseModel):
+    """State of a processed document, stored next to its output"""
+
+    version: int
+    input_sha256: str
+    input_size: int
+    input_mtime_ns: int
+    settings: str  # Digest of the settings that affect the output
+    output_size: int
+    output_mtime_ns: int
+    blocks: List[BlockRecord] = []
+    # Digest of every theme, config and CSS file the charts were rendered with
+    dependencies: Dict[str, Optional[str]] = {}
@@ -0,0 +1,17 @@
+"""
+Render result model.
+"""
+
+from pydantic import BaseModel
+
+from .enums import OutputFormat
+
+
+class RenderResult(BaseModel):
+    """Artifact produced by a render backend for one chart"""
+
+    data: bytes  # Raw artifact in output_format
+    output_format: OutputFormat  # Format the backend rendered to
+    backend: str  # Name of the backend that rendered it
+    elapsed: float = 0.0  # Seconds spent rendering, including retries
+    attempts: int = 1  # Render attempts, more than one after retries
@@ -0,0 +1,14 @@
+"""
+Render statistics model.
+"""
+
+from pydantic import BaseModel
+
+
+class RenderStats(BaseModel):
+    """Statistics of one render_blocks call"""
+
+    total: int = 0  # Blocks passed in
+    unique: int = 0  # Distinct render fingerprints among them
+    duplicates: int = 0  # Blocks served by another block's render
+    cached: int = 0  # Unique charts reused from the render cache
@@ -0,0 +1,57 @@
+"""
+Run report models.
+"""
+
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class BlockReport(BaseModel):
+    """How one Mermaid block was rendered in a run"""
+
+    source: str  # Markdown file the block was found in
+    line_start: int
+    line_end: int
+    diagram_type: str  # Brief description of the chart (MermaidBlock.get_brief)
+    fingerprint: str  # Render cache fingerprint
+    cache_hit: bool = False  # Reused from the render cache of an earlier run
+    duplicate: bool = False  # Served by an identical block rendered earlier in this run
+    render_ms: Optional[float] = (
+        None  # Backend render time, split evenly across a batch
+    )
+    convert_ms: Optional[float] = None  # PDF post-processing time
+    output_bytes: Optional[int] = None
+    output: Optional[str] = None  # Rendered image relative to the output dir
+    error: Optional[str] = None  # Why the block kept its code, None if rendered
+
+
+class RunSummary(BaseModel):
+    """Aggregates of a run, timings over distinct charts only"""
+
+    backend: str
+    output_format: str
+    elapsed_s: float
+    documents: int
+    failed_documents: int = 0
+    blocks: int = 0
+    rendered: int = 0  # Blocks replaced by an image
+    failed: int = 0
+    unique: int = 0  # Distinct fingerprints
+    cache_hits: int = 0
+    cache_hit_rate: float = 0.0  # Cache hits over distinct charts
+    duplicates: int = 0
+    render_ms_total: float = 0.0
+    render_ms_p50: Optional[float] = None
+    render_ms_p95: Optional[float] = None
+    render_ms_max: Optional[float] = None
+    convert_ms_total: float = 0.0
+    output_bytes_total: int = 0
+
+
+class RunReport(BaseModel):
+    """Machine-readable report of a run (--report)"""
+
+    version: int
+    summary: RunSummary
+    blocks: List[BlockReport] = []
@@ -1,26 +1,22 @@
 """
 Logging utilities for md_mermaid_static.
+
+Rich is only imported for interactive output: when stdout is not a terminal
+logs and summaries are written as plain text, which keeps startup fast for
+scripted runs.
 """
 
-from typing import Optional
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
 from pathlib import Path
-from rich.console import Console
-from rich.logging import RichHandler
 import logging
-from rich.traceback import install as install_rich_traceback
-from rich.panel import Panel
-from rich.syntax import Syntax
-from rich.table import Table
-
-# Import models (avoid circular import by using absolute path)
-from md_mermaid_static.models import CLIConfig, MermaidBlock
+import sys
 
-# Install Rich's better exception handling
-install_rich_traceback(show_locals=True)
+if TYPE_CHECKING:
+    from rich.console import Console
 
-# Configure console
-console = Console()
-error_console = Console(stderr=True)
+    # Import models (avoid circular import by using absolute path)
+    from md_mermaid_static.models import CLIConfig, RenderableBlock
 
 # Log level mapping
 LOG_LEVELS = {
@@ -37,6 +33,28 @@ logger = logging.getLogger("md-mermaid-static")
 logger.propagate = False
 
 
+def is_interactive() -> bool:
+    """Whether output goes to a terminal, i.e. is worth rendering with rich"""
+    return sys.stdout.isatty()
+
+
+@lru_cache(maxsize=None)
+def get_console(stderr: bool = False) -> "Console":
+    """Get the rich console, importing rich on first use"""
+    from rich.console import Console
+
+    return Console(stderr=stderr)
+
+
+def __getattr__(name: str):
+    # Consoles are created lazily, keep ``console`` and ``error_console`` importable
+    if name == "console":
+        return get_console()
+    if name == "error_console":
+        return get_console(stderr=True)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def setup_logging(debug_mode: bool = False, log_file: Optional[str] = None):
     """
     Setup logging system
@@ -53,14 +71,26 @@ def setup_logging(debug_mode: bool = False, log_file: Optional[str] = None):
     if logger.handlers:
         logger.handlers.clear()
 
-    # Create Rich handler
-    handler = RichHandler(
-        rich_tracebacks=True,
-        console=console,
-        show_time=True,
-        show_path=debug_mode,
-        markup=True,
-    )
+    if is_interactive():
+        from rich.logging import RichHandler
+        from rich.traceback import install as install_rich_traceback
+
+        # Install Rich's better exception handling
+        install_rich_traceback(show_locals=True)
+
+        # Create Rich handler
+        handler = RichHandler(
+            rich_tracebacks=True,
+            console=get_console(),
+            show_time=True,
+            show_path=debug_mode,
+            markup=True,
+        )
+    else:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)-8s %(message)s")
+        )
     handler.setLevel(log_level)
     logger.addHandler(handler)
 
@@ -82,7 +112,7 @@ def setup_logging(debug_mode: bool = False, log_file: Optional[str] = None):
         logger.debug("Debug mode enabled")
 
 
-def display_config(config: CLIConfig):
+def display_config(config: "CLIConfig"):
     """
     Display CLI configuration
 
@@ -91,7 +121,15 @@ def display_config(config: CLIConfig):
     """
     if not logger.isEnabledFor(logging.DEBUG):
         return
+    if not is_interactive():
+        for field_name, field_value in config.model_dump().items():
+            logger.debug(f"Config {field_name}: {field_value}")
+        return
+
+    from rich.panel import Panel
+    from rich.table import Table
 
+    console = get_console()
     table = Table(title="Runtime Config")
     table.add_column("Option", style="cyan")
     table.add_column("Value", style="green")
@@ -104,7 +142,7 @@ def display_config(config: CLIConfig):
     )
 
 
-def display_mermaid_block(block: MermaidBlock, index: int):
+def display_mermaid_block(block: "RenderableBlock", index: int):
     """
     Display Mermaid block info in debug mode
 
@@ -114,7 +152,16 @@ def display_mermaid_block(block: MermaidBlock, index: int):
     """
     if not logger.isEnabledFor(logging.DEBUG):
         return
+    if not is_interactive():
+        logger.debug(
+            f"Mermaid Block #{index + 1} (lines {block.line_start}-{block.line_end}): "
+            f"{block.get_brief()}"
+        )
+        return
 
+    from rich.syntax import Syntax
+
+    console = get_console()
     try:
         # Get brief description
         brief_desc = block.get_brief()
@@ -169,8 +216,14 @@ def display_render_command(cmd: list, index: int):
         return
 
     logger.debug(cmd)
+    if not is_interactive():
+        return
+
+    from rich.panel import Panel
+    from rich.syntax import Syntax
+
     command_str = " ".join(cmd)
-    console.print(
+    get_console().print(
         Panel(
             Syntax(command_str, "bash", theme="monokai"),
             title=f"[bold blue]Render Command #{index + 1}[/bold blue]",
@@ -180,7 +233,11 @@ def display_render_command(cmd: list, index: int):
 
 
 def display_summary(
-    total_blocks: int, success_count: int, failed_count: int, output_file: Path
+    total_blocks: int,
+    success_count: int,
+    failed_count: int,
+    output_file: Path,
+    duplicate_count: int = 0,
 ):
     """
     Display processing summary
@@ -190,16 +247,27 @@ def display_summary(
         success_count: Successfully rendered count
         failed_count: Failed count
         output_file: Output file path
+        duplicate_count: Blocks that reused an identical chart's render
     """
     if not logger.isEnabledFor(logging.INFO):
         return
+    if not is_interactive():
+        logger.info(
+            f"Summary: {total_blocks} Mermaid blocks, {success_count} rendered, "
+            f"{failed_count} failed, {duplicate_count} duplicates saved, "
+            f"output file: {output_file}"
+        )
+        return
 
-    console.print(
+    from rich.panel import Panel
+
+    get_console().print(
         Panel(
             f"""[bold]Processing Summary[/bold]
 Total Mermaid blocks: {total_blocks}
 Successfully rendered: {success_count}
 Failed: {failed_count}
+Duplicates saved: {duplicate_count}
 Output file: {output_file}""",
             title="[bold blue]Summary[/bold blue]",
             border_style="blue",
@@ -104,6 +104,10 @@ class ThemeManager:
                         self.themes_cache[theme_name] = theme_files
                         logger.debug(f"Found theme: {theme_name} with files: {theme_files}")
 
+    def reload(self) -> None:
+        """Rescan the theme directories, e.g. after themes were added or removed."""
+        self._load_themes()
+
     def get_theme_files(self, theme_name: str) -> Tuple[Optional[Path], Optional[Path]]:
         """
         Get the config and CSS files for a theme.
@@ -0,0 +1,248 @@
+"""
+Span tracing in the Chrome trace event format.
+
+Stages of a run (parsing, CLI resolution, browser launch, rendering, PDF
+conversion, writing) are wrapped in spans. When tracing is off, ``span``
+returns a shared no-op context manager. When it is on, every span becomes a
+complete event tagged with its process and thread, and the collected trace
+can be opened in chrome://tracing or https://ui.perfetto.dev.
+
+Work handed to process pools goes through ``submit_traced``: the worker
+records its own spans and sends them back with the result, so conversion and
+parse workers show up as separate processes on the same timeline.
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Category of all events
+CATEGORY = "md-mermaid-static"
+
+_NULL_SPAN = nullcontext()
+
+
+class Tracer:
+    """Collects trace events of this process"""
+
+    def __init__(self):
+        # perf_counter is a system-wide monotonic clock on the supported
+        # platforms, so timestamps from pool workers line up with ours
+        self.origin_ns = time.perf_counter_ns()
+        self.events: List[Dict[str, Any]] = []
+        self._named: set = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def _thread_metadata(self, pid: int, tid: int) -> None:
+        """Name the current thread and process in the trace once"""
+        if (pid, tid) in self._named:
+            return
+        self._named.add((pid, tid))
+        self.events.append(
+            {
+                "ph": "M",
+                "name": "thread_name",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": threading.current_thread().name},
+            }
+        )
+        if (pid, None) not in self._named:
+            self._named.add((pid, None))
+            import multiprocessing
+
+            self.events.append(
+                {
+                    "ph": "M",
+                    "name": "process_name",
+                    "pid": pid,
+                    "args": {"name": multiprocessing.current_process().name},
+                }
+            )
+
+    def add(self, event: Dict[str, Any]) -> None:
+        """Record an event of the current thread, ``ts`` in perf_counter ns"""
+        pid, tid = os.getpid(), threading.get_ident()
+        event.update(pid=pid, tid=tid, cat=CATEGORY)
+        with self._lock:
+            self._thread_metadata(pid, tid)
+            self.events.append(event)
+
+    def extend(self, events: List[Dict[str, Any]]) -> None:
+        """Merge events recorded by another process"""
+        with self._lock:
+            self.events.extend(events)
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """Build the Chrome trace document, timestamps in microseconds"""
+        with self._lock:
+            events = [dict(event) for event in self.events]
+        for event in events:
+            if "ts" in event:
+                event["ts"] = (event["ts"] - self.origin_ns) / 1000
+            if "dur" in event:
+                event["dur"] = event["dur"] / 1000
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+_tracer: Optional[Tracer] = None
+
+
+class _Span:
+    """Complete event ("X") around a block of synchronous code"""
+
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer: Tracer, name: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.add(
+            {
+                "ph": "X",
+                "name": self.name,
+                "ts": self.start,
+                "dur": end - self.start,
+                "args": self.args,
+            }
+        )
+
+
+class _AsyncSpan(_Span):
+    """Async begin/end events ("b"/"e"), for spans crossing ``await``"""
+
+    __slots__ = ("id",)
+
+    def __enter__(self) -> "_AsyncSpan":
+        self.id = self.tracer.next_id()
+        self.start = time.perf_counter_ns()
+        self.tracer.add(
+            {
+                "ph": "b",
+                "name": self.name,
+                "id": self.id,
+                "ts": self.start,
+                "args": self.args,
+            }
+        )
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        args = {"error": exc_type.__name__} if exc_type is not None else {}
+        self.tracer.add(
+            {
+                "ph": "e",
+                "name": self.name,
+                "id": self.id,
+                "ts": time.perf_counter_ns(),
+                "args": args,
+            }
+        )
+
+
+def is_enabled() -> bool:
+    """Whether spans are being recorded in this process"""
+    return _tracer is not None
+
+
+def start_tracing() -> Tracer:
+    """Start recording spans in this process"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def stop_tracing() -> Optional[Tracer]:
+    """Stop recording spans, returns the tracer holding the recorded events"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def span(name: str, **args: Any):
+    """
+    Trace a block of synchronous code
+
+    Args:
+        name: Stage name shown in the timeline
+        **args: Tags of the span (block index, backend, file, ...)
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return _Span(tracer, name, args)
+
+
+def async_span(name: str, **args: Any):
+    """Trace a stage of a coroutine, which may interleave with others on a thread"""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return _AsyncSpan(tracer, name, args)
+
+
+def write_trace(path: str, tracer: Optional[Tracer] = None) -> None:
+    """Write the recorded events as a Chrome trace JSON file"""
+    tracer = tracer or _tracer
+    if tracer is None:
+        return
+    trace_path = Path(path)
+    trace_path.parent.mkdir(parents=True, exist_ok=True)
+    trace_path.write_text(json.dumps(tracer.to_chrome()), encoding="utf-8")
+
+
+def _run_traced(fn: Callable, *args: Any) -> Tuple[Any, List[Dict[str, Any]]]:
+    """Run ``fn`` in a pool worker, returning its result and the spans it recorded"""
+    global _tracer
+    previous, _tracer = _tracer, Tracer()
+    try:
+        result = fn(*args)
+        return result, _tracer.events
+    finally:
+        _tracer = previous
+
+
+def submit_traced(executor: Executor, fn: Callable, *args: Any) -> Future:
+    """
+    Submit ``fn(*args)`` to a process pool, collecting its spans when tracing
+
+    Returns:
+        A future of the plain result of ``fn``
+    """
+    tracer = _tracer
+    if tracer is None:
+        return executor.submit(fn, *args)
+
+    result: Future = Future()
+
+    def collect(traced: Future) -> None:
+        try:
+            value, events = traced.result()
+        except BaseException as e:
+            result.set_exception(e)
+            return
+        tracer.extend(events)
+        result.set_result(value)
+
+    executor.submit(_run_traced, fn, *args).add_done_callback(collect)
+    return result
@@ -3,10 +3,81 @@
 """
 import sys
 import os
+import textwrap
 from pathlib import Path
 
+import pytest
+
 # 将src目录添加到Python路径中
 project_root = Path(__file__).parent.parent.absolute()
 src_dir = os.path.join(project_root, 'src')
 if src_dir not in sys.path:
-    sys.path.insert(0, src_dir) 
\ No newline at end of file
+    sys.path.insert(0, src_dir) 
+
+
+FAKE_MMDC = textwrap.dedent(
+    """\
+    #!{python}
+    import os, re, sys
+
+    args = sys.argv[2:]
+    src = args[args.index("-i") + 1]
+    out = args[args.index("-o") + 1]
+    with open(os.environ["FAKE_MMDC_LOG"], "a") as log:
+        log.write(" ".join(sys.argv[1:]) + "\\n")
+
+    text = sys.stdin.read() if src == "-" else open(src).read()
+    if src.endswith(".md"):
+        charts = re.findall(r"```mermaid\\n(.*?)\\n```", text, re.S)
+        stem, ext = os.path.splitext(out)
+        outputs = [(f"{stem}-{n}{ext}", c) for n, c in enumerate(charts, 1)]
+    else:
+        outputs = [(out, text)]
+    if "hang" in text:
+        # 模拟卡死的浏览器：子进程和自身都不退出
+        import subprocess, time
+
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        open(os.environ["FAKE_MMDC_LOG"] + ".child", "w").write(str(child.pid))
+        time.sleep(60)
+    marker = os.environ["FAKE_MMDC_LOG"] + ".once"
+    if ("flaky" in text or "slow" in text) and not os.path.exists(marker):
+        # 仅第一次调用崩溃（flaky）或变慢（slow）
+        open(marker, "w").close()
+        if "flaky" in text:
+            import signal
+
+            os.kill(os.getpid(), signal.SIGKILL)
+        import time
+
+        time.sleep(60)
+    if any("fail" in chart for _, chart in outputs):
+        sys.exit("Parse error on line 1")
+    fmt = args[args.index("-e") + 1] if "-e" in args else None
+    for path, chart in outputs:
+        if fmt == "pdf" or path.endswith(".pdf"):
+            import pymupdf
+
+            doc = pymupdf.open()
+            doc.new_page().insert_text((72, 72), chart)
+            data = doc.tobytes()
+        else:
+            data = f"<svg>{chart}</svg>".encode()
+        if path == "-":
+            sys.stdout.buffer.write(data)
+        else:
+            open(path, "wb").write(data)
+    """
+).replace("{python}", sys.executable)
+
+
+@pytest.fixture
+def fake_mmdc(tmp_path, monkeypatch):
+    """模拟 mermaid-cli 命令，返回记录调用的日志文件"""
+    script = tmp_path / "fake-npx"
+    script.write_text(FAKE_MMDC)
+    script.chmod(0o755)
+    log_file = tmp_path / "mmdc.log"
+    log_file.touch()
+    monkeypatch.setenv("FAKE_MMDC_LOG", str(log_file))
+    return script, log_file
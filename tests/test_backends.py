@@ -0,0 +1,165 @@
+import asyncio
+
+import pymupdf
+import pytest
+from md_mermaid_static.core.backends import FakeBackend
+from md_mermaid_static.core.processor import MarkdownProcessor
+from md_mermaid_static.core.renderer import MermaidRenderer
+from md_mermaid_static.models import (
+    CLIConfig,
+    MermaidBlock,
+    MermaidConfig,
+    MermaidRenderOptions,
+    OutputFormat,
+    RenderBackendType,
+)
+
+
+@pytest.fixture(autouse=True)
+def no_global_config(monkeypatch):
+    """渲染器优先使用全局配置单例，测试中清空"""
+    monkeypatch.setattr(CLIConfig, "_instance", None)
+
+
+def _block(content):
+    return MermaidBlock(
+        content=content, config=MermaidConfig(), line_start=1, line_end=3
+    )
+
+
+def test_fake_backend_is_deterministic():
+    """测试占位后端对相同输入输出相同字节，且产物是合法的 SVG/PNG/PDF"""
+    backend = FakeBackend()
+    options = MermaidRenderOptions(width=120, height=80)
+    for output_format in (OutputFormat.SVG, OutputFormat.PNG, OutputFormat.PDF):
+        first = backend.render("graph TD\n    A --> B", options, output_format)
+        again = backend.render("graph TD\n    A --> B", options, output_format)
+        other = backend.render("graph TD\n    A --> C", options, output_format)
+        assert first.data == again.data
+        assert first.data != other.data
+        assert first.backend == "fake"
+        assert first.output_format == output_format
+
+    svg = backend.render("graph TD", options, OutputFormat.SVG).data
+    assert svg.startswith(b"<svg") and b'width="120"' in svg
+    png = backend.render("graph TD", options, OutputFormat.PNG).data
+    assert png.startswith(b"\x89PNG")
+    assert pymupdf.Pixmap(png).width == 120
+    pdf = backend.render("graph TD", options, OutputFormat.PDF).data
+    assert pymupdf.open(stream=pdf, filetype="pdf")[0].rect.height == 80
+
+
+def test_fake_svg_escapes_quotes():
+    """测试占位 SVG 转义引号，包含引号的图表和背景色仍生成合法 XML"""
+    from xml.etree import ElementTree
+
+    options = MermaidRenderOptions(background_color='red" onload="x')
+    svg = FakeBackend().render('A["a & b"] --> B', options, OutputFormat.SVG).data
+
+    background, _, label = ElementTree.fromstring(svg)
+    assert background.get("fill") == 'red" onload="x'
+    assert label.text == 'A["a & b"] --> B'
+
+
+def test_fake_backend_fingerprints_apart_from_mmdc(tmp_path):
+    """测试占位图与真实渲染使用不同的缓存指纹"""
+    block = _block("graph TD\n    A --> B")
+    mmdc = MermaidRenderer(str(tmp_path), CLIConfig(output_dir=str(tmp_path)))
+    fake = MermaidRenderer(
+        str(tmp_path),
+        CLIConfig(output_dir=str(tmp_path), backend=RenderBackendType.FAKE),
+    )
+    assert mmdc.get_fingerprint(block) != fake.get_fingerprint(block)
+
+
+@pytest.mark.parametrize("output_format", ["svg", "png", "enhanced-svg"])
+def test_processor_with_fake_backend(tmp_path, output_format):
+    """测试占位后端无需 Node 即可跑通解析、渲染、缓存和替换全流程"""
+    doc = tmp_path / "doc.md"
+    doc.write_text(
+        "# 文档\n\n```mermaid\ngraph TD\n    A --> B\n```\n\n"
+        "```mermaid\nsequenceDiagram\n    A->>B: hi\n```\n"
+    )
+    config = CLIConfig(
+        output_dir=str(tmp_path / "output"),
+        output_format=OutputFormat(output_format),
+        backend=RenderBackendType.FAKE,
+        # 若仍调用 mermaid-cli 会因命令不存在而失败
+        use_command="no-such-mermaid-cli",
+        concurrent=True,
+        max_workers=2,
+    )
+    with MarkdownProcessor(str(doc), config) as processor:
+        output_file = processor.process()
+
+    output = output_file.read_text()
+    assert "```mermaid" not in output
+    images = sorted((tmp_path / "output" / "media").iterdir())
+    assert len(images) == 2
+    assert all(image.stat().st_size > 0 for image in images)
+    assert all(f"media/{image.name}" in output for image in images)
+
+
+def test_async_render_with_fake_backend(tmp_path):
+    """测试异步渲染路径同样使用所选后端"""
+    config = CLIConfig(
+        output_dir=str(tmp_path),
+        backend=RenderBackendType.FAKE,
+        use_command="no-such-mermaid-cli",
+    )
+    with MermaidRenderer(str(tmp_path), config) as renderer:
+        results = asyncio.run(
+            renderer.render_blocks_async([_block("graph TD"), _block("graph LR")])
+        )
+    assert all(path is not None and path.is_file() for _, path in results)
+
+
+def _hedging_backend(monkeypatch, attempts, limiter=None):
+    """对冲已开启、p95 很低的 mermaid-cli 后端，run_command 依次执行 attempts"""
+    import subprocess
+    import time
+
+    from md_mermaid_static.core.backends import MmdcBackend
+
+    backend = MmdcBackend(CLIConfig(hedge=True), lambda *args: [], limiter)
+    for _ in range(20):
+        backend.latencies.record(0.01)
+    calls = []
+
+    def run_command(cmd, timeout=None, on_start=None, input=None):
+        delay, outcome = attempts[len(calls)]
+        calls.append(outcome)
+        time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return subprocess.CompletedProcess(cmd, outcome, b"<svg/>", "")
+
+    monkeypatch.setattr(backend, "run_command", run_command)
+    return backend, calls
+
+
+def test_hedge_survives_an_attempt_that_raises(monkeypatch):
+    """测试对冲时某次尝试抛出异常（如 Popen 失败）不会丢弃另一次尝试的结果"""
+    backend, calls = _hedging_backend(
+        monkeypatch, [(0.2, OSError("mmdc not found")), (0.4, 0)]
+    )
+    assert backend._run_attempt(["mmdc"], b"graph TD").returncode == 0
+
+    backend, calls = _hedging_backend(
+        monkeypatch, [(0.2, 0), (0.0, OSError("mmdc not found"))]
+    )
+    assert backend._run_attempt(["mmdc"], b"graph TD").returncode == 0
+    assert len(calls) == 2
+
+
+def test_hedge_needs_a_free_limiter_slot(monkeypatch):
+    """测试自适应并发没有空闲名额时不启动对冲渲染"""
+    from md_mermaid_static.core.scheduler import AdaptiveLimiter
+
+    limiter = AdaptiveLimiter(max_limit=1, memory_budget=1024**4)
+    limiter.acquire()
+    backend, calls = _hedging_backend(monkeypatch, [(0.2, 0), (0.0, 0)], limiter)
+
+    assert backend._run_attempt(["mmdc"], b"graph TD").returncode == 0
+    assert len(calls) == 1
+    assert limiter.in_flight == 1
@@ -0,0 +1,44 @@
+import importlib.util
+from pathlib import Path
+
+from md_mermaid_static.models import CLIConfig
+
+BENCHMARKS_DIR = Path(__file__).parent.parent / "benchmarks"
+
+
+def _load_suite():
+    spec = importlib.util.spec_from_file_location(
+        "bench_suite", BENCHMARKS_DIR / "bench_suite.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_suite_runs_offline_on_every_corpus():
+    """测试基准套件在缩小的语料上跑通，并覆盖基线中的每一项"""
+    suite = _load_suite()
+    previous = CLIConfig.get_instance()
+
+    results = suite.run_suite(scale=0.01, repeat=1)
+
+    assert CLIConfig.get_instance() is previous
+    assert set(results) == set(suite.load_baselines()["results"])
+    assert all(
+        result["mb_per_s"] > 0 and result["blocks_per_s"] > 0
+        for result in results.values()
+    )
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    """测试吞吐低于基线超过阈值时报告回退"""
+    suite = _load_suite()
+    baselines = {"large/scan": {"blocks_per_s": 1000.0}}
+
+    assert suite.compare({"large/scan": {"blocks_per_s": 800.0}}, baselines, 0.25) == []
+    regressions = suite.compare(
+        {"large/scan": {"blocks_per_s": 700.0}}, baselines, 0.25
+    )
+    assert len(regressions) == 1 and "large/scan" in regressions[0]
+    # 基线中没有的基准不参与比较
+    assert suite.compare({"small/scan": {"blocks_per_s": 1.0}}, baselines) == []
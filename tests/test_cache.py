@@ -0,0 +1,140 @@
+import os
+
+import pytest
+from md_mermaid_static.core.cache import (
+    SharedRenderCache,
+    compute_fingerprint,
+    file_digest,
+    materialize,
+)
+from md_mermaid_static.models import MermaidRenderOptions, OutputFormat, Theme
+
+
+def test_fingerprint_is_stable():
+    """测试相同输入生成相同指纹"""
+    options = MermaidRenderOptions(theme=Theme.DARK, width=800)
+    first = compute_fingerprint("graph TD\n    A --> B", options, OutputFormat.SVG)
+    second = compute_fingerprint(
+        "graph TD\r\n    A --> B",
+        MermaidRenderOptions(theme=Theme.DARK, width=800),
+        OutputFormat.SVG,
+    )
+    assert first == second
+
+
+@pytest.mark.parametrize(
+    "content, options, output_format",
+    [
+        ("graph LR", MermaidRenderOptions(), OutputFormat.SVG),
+        ("graph TD", MermaidRenderOptions(theme=Theme.FOREST), OutputFormat.SVG),
+        ("graph TD", MermaidRenderOptions(scale=2.0), OutputFormat.SVG),
+        ("graph TD", MermaidRenderOptions(), OutputFormat.PNG),
+        ("graph TD", MermaidRenderOptions(), OutputFormat.ENHANCED_SVG),
+    ],
+)
+def test_fingerprint_covers_inputs(content, options, output_format):
+    """测试源码、选项和输出格式都会影响指纹"""
+    base = compute_fingerprint("graph TD", MermaidRenderOptions(), OutputFormat.SVG)
+    assert compute_fingerprint(content, options, output_format) != base
+
+
+def test_fingerprint_uses_theme_file_contents(tmp_path):
+    """测试指纹基于主题文件内容而不是路径"""
+    css_a = tmp_path / "a.css"
+    css_b = tmp_path / "b.css"
+    css_a.write_text(".node { fill: red; }")
+    css_b.write_text(".node { fill: red; }")
+
+    fingerprint_a = compute_fingerprint(
+        "graph TD", MermaidRenderOptions(css_file=str(css_a)), OutputFormat.SVG
+    )
+    fingerprint_b = compute_fingerprint(
+        "graph TD", MermaidRenderOptions(css_file=str(css_b)), OutputFormat.SVG
+    )
+    assert fingerprint_a == fingerprint_b
+
+    css_b.write_text(".node { fill: blue; }")
+    assert file_digest(str(css_b)) != file_digest(str(css_a))
+    fingerprint_b = compute_fingerprint(
+        "graph TD", MermaidRenderOptions(css_file=str(css_b)), OutputFormat.SVG
+    )
+    assert fingerprint_a != fingerprint_b
+
+
+def _artifact(directory, fingerprint, size):
+    path = directory / f"mermaid_{fingerprint}.svg"
+    path.write_bytes(b"x" * size)
+    return path
+
+
+def test_shared_cache_roundtrip(tmp_path):
+    """测试共享缓存存储并物化到另一个媒体目录"""
+    cache = SharedRenderCache(tmp_path / "store", max_bytes=1024)
+    project_a = tmp_path / "a"
+    project_b = tmp_path / "b"
+    project_a.mkdir()
+    project_b.mkdir()
+
+    artifact = _artifact(project_a, "ab" * 32, 10)
+    cache.store(artifact)
+
+    target = project_b / artifact.name
+    assert cache.fetch(artifact.name, target)
+    assert target.read_bytes() == artifact.read_bytes()
+    assert not cache.fetch("mermaid_" + "cd" * 32 + ".svg", project_b / "missing.svg")
+
+
+def test_shared_cache_evicts_least_recently_used(tmp_path):
+    """测试共享缓存超过上限时按 LRU 淘汰"""
+    cache = SharedRenderCache(tmp_path / "store", max_bytes=250)
+    project = tmp_path / "project"
+    project.mkdir()
+
+    names = []
+    for i, fingerprint in enumerate(["aa", "bb", "cc"]):
+        artifact = _artifact(project, fingerprint * 32, 100)
+        cache.store(artifact)
+        entry = cache._entry_path(artifact.name)
+        os.utime(entry, (1000 + i, 1000 + i))
+        names.append(artifact.name)
+
+    # 第三个条目写入后超过上限，最旧的条目被淘汰
+    cache.evict()
+    assert not cache._entry_path(names[0]).exists()
+    assert cache._entry_path(names[1]).exists()
+    assert cache._entry_path(names[2]).exists()
+
+
+def test_shared_cache_skips_entries_evicted_concurrently(tmp_path, monkeypatch):
+    """测试扫描共享缓存时跳过被其他进程同时淘汰的条目"""
+    cache = SharedRenderCache(tmp_path / "store", max_bytes=150)
+    project = tmp_path / "project"
+    project.mkdir()
+    for fingerprint in ["aa", "bb"]:
+        cache.store(_artifact(project, fingerprint * 32, 100))
+
+    real_scandir = os.scandir
+
+    def racing_scandir(path):
+        entries = list(real_scandir(path))
+        if os.fspath(path) != os.fspath(cache.root):
+            # 另一个进程在列目录之后删除了条目
+            for entry in entries:
+                os.unlink(entry.path)
+        return iter(entries)
+
+    monkeypatch.setattr(os, "scandir", racing_scandir)
+    assert cache.evict() == 0
+    assert cache._scan_size() == 0
+
+
+def test_materialize_replaces_target(tmp_path):
+    """测试物化时原子替换目标文件"""
+    src = tmp_path / "src.svg"
+    dst = tmp_path / "dst.svg"
+    src.write_text("new")
+    dst.write_text("old")
+
+    assert materialize(src, dst) in {"reflink", "hardlink", "copy"}
+    assert dst.read_text() == "new"
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".")] == []
@@ -76,3 +76,48 @@ def test_cli_config_with_none_theme():
         use_command="auto",
     )
     assert config.theme is None
+
+
+def test_invalid_max_workers_is_a_usage_error(tmp_path):
+    """Test that a bad --max-workers value exits with a usage error before any setup"""
+    from click.testing import CliRunner
+    from md_mermaid_static.cli import main
+
+    doc = tmp_path / "doc.md"
+    doc.write_text("# Title\n")
+    output_dir = tmp_path / "out"
+
+    result = CliRunner().invoke(main, [str(doc), "-o", str(output_dir), "-j", "abc"])
+
+    assert result.exit_code == 2
+    assert "Invalid value for '--max-workers'" in result.output
+    assert not output_dir.exists()
+
+
+def test_watch_with_many_inputs_is_a_usage_error(tmp_path):
+    """Test that --watch with a directory input exits with a usage error"""
+    from click.testing import CliRunner
+    from md_mermaid_static.cli import main
+
+    result = CliRunner().invoke(
+        main, [str(tmp_path), "-o", str(tmp_path / "out"), "--watch"]
+    )
+
+    assert result.exit_code == 2
+    assert "--watch supports a single input file" in result.output
+    assert "Aborted" not in result.output
+
+
+def test_missing_input_is_a_usage_error(tmp_path):
+    """Test that a missing input file exits with a usage error naming it"""
+    from click.testing import CliRunner
+    from md_mermaid_static.cli import main
+
+    missing = tmp_path / "missing.md"
+    output_dir = tmp_path / "out"
+
+    result = CliRunner().invoke(main, [str(missing), "-o", str(output_dir)])
+
+    assert result.exit_code == 2
+    assert f"Path '{missing}' does not exist" in result.output
+    assert not output_dir.exists()
@@ -0,0 +1,133 @@
+import os
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+from md_mermaid_static.cli import main
+from md_mermaid_static.core.corpus import CorpusProcessor, discover_inputs
+from md_mermaid_static.models import CLIConfig
+
+
+CHART = "```mermaid\ngraph TD\n    A --> B\n```\n"
+
+
+@pytest.fixture
+def docs(tmp_path):
+    """创建包含子目录的文档树"""
+    root = tmp_path / "docs"
+    (root / "guide" / "advanced").mkdir(parents=True)
+    (root / ".hidden").mkdir()
+    (root / "index.md").write_text(f"# 首页\n\n{CHART}")
+    (root / "guide" / "intro.md").write_text(f"# 入门\n\n{CHART}")
+    (root / "guide" / "advanced" / "deep.md").write_text(
+        f"# 进阶\n\n{CHART}\n```mermaid\ngraph LR\n    C --> D\n```\n"
+    )
+    (root / "guide" / "notes.txt").write_text("不是 Markdown")
+    (root / ".hidden" / "draft.md").write_text(CHART)
+    return root
+
+
+def test_discover_inputs_mirrors_directories_and_globs(docs, tmp_path):
+    """测试目录和 glob 展开为镜像的输出路径"""
+    found = discover_inputs([str(docs)])
+    assert sorted(str(output) for _, output in found) == [
+        "guide/advanced/deep.md",
+        "guide/intro.md",
+        "index.md",
+    ]
+
+    found = discover_inputs([f"{docs}/guide/**/*.md", str(docs / "index.md")])
+    assert sorted(str(output) for _, output in found) == [
+        "advanced/deep.md",
+        "index.md",
+        "intro.md",
+    ]
+
+
+def test_discover_inputs_skips_output_dir_and_rejects_collisions(docs, tmp_path):
+    """测试跳过输出目录，并拒绝写入同一输出路径的输入"""
+    output_dir = docs / "site"
+    output_dir.mkdir()
+    (output_dir / "index.md").write_text("上次运行的输出")
+    found = discover_inputs([str(docs), str(docs / "index.md")], exclude=[output_dir])
+    assert len(found) == 3
+
+    other = tmp_path / "other" / "index.md"
+    other.parent.mkdir()
+    other.write_text("# 另一个首页")
+    with pytest.raises(ValueError, match="index.md"):
+        discover_inputs([str(docs / "index.md"), str(other)])
+    with pytest.raises(FileNotFoundError):
+        discover_inputs([str(tmp_path / "missing" / "*.md")])
+
+
+def test_corpus_shares_one_render_pool(docs, tmp_path, fake_mmdc):
+    """测试多个文档共享渲染池，跨文件相同的图表只渲染一次"""
+    script, log_file = fake_mmdc
+    output_dir = tmp_path / "output"
+    config = CLIConfig(
+        output_dir=str(output_dir),
+        use_command=str(script),
+        concurrent=True,
+        max_workers=2,
+    )
+
+    with CorpusProcessor(discover_inputs([str(docs)]), config) as corpus:
+        results = corpus.process()
+
+    assert all(output_file is not None for _, output_file in results)
+    # 4 个图表中只有 2 个不同
+    assert len(log_file.read_text().splitlines()) == 2
+    assert len(list((output_dir / "media").iterdir())) == 2
+
+    deep = (output_dir / "guide" / "advanced" / "deep.md").read_text()
+    assert "](../../media/mermaid_" in deep
+    assert "](media/mermaid_" in (output_dir / "index.md").read_text()
+
+
+def test_cli_processes_directory(docs, tmp_path, fake_mmdc, monkeypatch):
+    """测试命令行接受目录输入"""
+    script, _ = fake_mmdc
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "npx").symlink_to(script)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    # 命令行会设置全局配置单例，测试结束后恢复
+    monkeypatch.setattr(CLIConfig, "_instance", None)
+    output_dir = tmp_path / "output"
+    result = CliRunner().invoke(
+        main,
+        [str(docs), "-o", str(output_dir), "-p", "-j", "2", "--use-command", "npx"],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert (output_dir / "guide" / "intro.md").is_file()
+    assert not (output_dir / ".hidden").exists()
+    assert "```mermaid" not in Path(output_dir / "guide" / "intro.md").read_text()
+
+
+def test_corpus_parse_workers(docs, tmp_path, fake_mmdc):
+    """测试多进程解析：缓存命中的文档由子进程直接完成，输出与线程模式一致"""
+    script, log_file = fake_mmdc
+    outputs = {}
+    for parse_workers in (None, 2):
+        output_dir = tmp_path / f"output-{parse_workers}"
+        config = CLIConfig(
+            output_dir=str(output_dir),
+            use_command=str(script),
+            concurrent=True,
+            max_workers=2,
+            parse_workers=parse_workers,
+        )
+        for _ in range(2):
+            with CorpusProcessor(discover_inputs([str(docs)]), config) as corpus:
+                results = corpus.process()
+            assert all(output_file is not None for _, output_file in results)
+        outputs[parse_workers] = {
+            path.relative_to(output_dir): path.read_bytes()
+            for path in output_dir.rglob("*.md")
+        }
+
+    assert outputs[None] == outputs[2]
+    # 每种模式只在第一次运行时渲染 2 个不同的图表，第二次全部命中缓存
+    assert len(log_file.read_text().splitlines()) == 4
@@ -0,0 +1,70 @@
+import json
+
+from click.testing import CliRunner
+from md_mermaid_static.core.parser import MarkdownParser
+from md_mermaid_static.loadtest import DIAGRAM_TYPES, generate_corpus, main
+
+
+def test_generate_corpus_covers_types_and_themes(tmp_path):
+    """测试生成的语料覆盖所有图表类型和主题的组合，且图表互不相同"""
+    themes = ["default", "dark", "deep-sea-blue"]
+    total = generate_corpus(tmp_path, 3, 10, list(DIAGRAM_TYPES), themes)
+    assert total == 30
+
+    parser = MarkdownParser()
+    blocks = [
+        block
+        for doc in sorted(tmp_path.glob("*.md"))
+        for block in parser.find_mermaid_blocks(doc.read_text())
+    ]
+    assert len(blocks) == 30
+    assert len({block.content for block in blocks}) == 30
+    assert {block.content.split()[0] for block in blocks} == {
+        "flowchart",
+        "sequenceDiagram",
+        "classDiagram",
+        "gantt",
+        "pie",
+    }
+    assert {block.config.custom_theme for block in blocks} == {None, "deep-sea-blue"}
+
+
+def test_loadtest_sweep_with_fake_backend(tmp_path):
+    """测试使用占位后端遍历并发数和输出格式，输出表格和 JSON"""
+    report = tmp_path / "report.json"
+    result = CliRunner().invoke(
+        main,
+        [
+            "--backend",
+            "fake",
+            "--documents",
+            "2",
+            "--diagrams",
+            "5",
+            "--workers",
+            "1,2",
+            "--formats",
+            "svg,enhanced-svg",
+            "--themes",
+            "default,forest",
+            "--work-dir",
+            str(tmp_path / "work"),
+            "--json",
+            str(report),
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "diagrams/s" in result.output
+    results = json.loads(report.read_text())["results"]
+    assert [(r["format"], r["workers"]) for r in results] == [
+        ("svg", 1),
+        ("svg", 2),
+        ("enhanced-svg", 1),
+        ("enhanced-svg", 2),
+    ]
+    for r in results:
+        assert r["rendered"] == 10 and r["failed"] == 0
+        assert r["diagrams_per_s"] > 0
+        assert r["p50_ms"] <= r["p95_ms"] <= r["p99_ms"]
+        assert r["peak_rss_mb"] > 0
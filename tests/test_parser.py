@@ -1,4 +1,6 @@
 import pytest
+import yaml
+from pydantic import ValidationError
 from md_mermaid_static.core.parser import MarkdownParser
 from md_mermaid_static.models import MermaidBlock, MermaidConfig
 
@@ -53,3 +55,163 @@ def test_empty_markdown():
     parser = MarkdownParser()
     blocks = parser.find_mermaid_blocks("")
     assert len(blocks) == 0
+
+
+def test_find_mermaid_blocks_in_document_order():
+    """测试各种格式的代码块按文档顺序找到，且行号正确"""
+    markdown_content = """# 标题
+
+:::mermaid
+graph LR
+    A --> B
+:::
+
+```mermaid
+graph TD
+    C --> D
+```
+
+  ```mermaid  
+  pie
+      "a": 1
+  ```
+"""
+
+    blocks = MarkdownParser().find_mermaid_blocks(markdown_content)
+
+    assert [block.content.split()[0] for block in blocks] == ["graph", "graph", "pie"]
+    assert "A --> B" in blocks[0].content
+    assert [(block.line_start, block.line_end) for block in blocks] == [
+        (3, 6),
+        (8, 11),
+        (13, 16),
+    ]
+
+
+def test_find_mermaid_blocks_many():
+    """测试大量代码块时行号计算正确"""
+    markdown_content = "".join(
+        f"段落 {i}\n\n```mermaid\ngraph TD\n    A{i} --> B\n```\n\n"
+        for i in range(2000)
+    )
+
+    blocks = MarkdownParser().find_mermaid_blocks(markdown_content)
+
+    assert len(blocks) == 2000
+    assert blocks[-1].line_start == 1999 * 7 + 3
+    assert blocks[-1].line_end == 1999 * 7 + 6
+    assert "A1999 --> B" in blocks[-1].content
+
+
+def test_iter_mermaid_blocks_matches_find():
+    """测试逐行扫描与整体扫描结果一致"""
+    markdown_content = """# 标题
+
+```mermaid
+---
+caption: 图表1
+---
+graph TD
+    A --> B
+```
+
+:::mermaid
+pie
+    "a": 1
+:::
+
+  ```mermaid
+  graph LR
+  ```
+"""
+    parser = MarkdownParser()
+    streamed = list(parser.iter_mermaid_blocks(markdown_content.splitlines(True)))
+
+    assert streamed == parser.find_mermaid_blocks(markdown_content)
+    assert streamed[0].config.caption == "图表1"
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        "caption: 测试图表\nrender-theme: dark",
+        "width: 800\nscale: 1.5\n\nbackground-color: '#f0f0f0'",
+        'caption: "引号标题"\nheight:',
+        "caption: yes",
+        "created: 2024-01-01",
+        "width: 0x20",
+        "caption: a: b",
+        "caption: x\ty",
+        "theme: [dark]",
+    ],
+)
+def test_flat_header_matches_yaml(header):
+    """测试简单 frontmatter 快速解析与 YAML 结果一致，复杂情况回退到 YAML"""
+    from md_mermaid_static.core.parser import parse_flat_header
+
+    config = parse_flat_header(header)
+    if config is not None:
+        assert config == yaml.safe_load(header)
+
+
+def test_frontmatter_is_memoized():
+    """测试相同 frontmatter 只解析一次，且各代码块配置互不影响"""
+    parser = MarkdownParser()
+    block = (
+        "```mermaid\n---\ncaption: 缓存测试\nwidth: 640\n---\n"
+        "graph TD\n    A --> B\n```\n"
+    )
+    MarkdownParser._load_block_config.cache_clear()
+
+    blocks = parser.find_mermaid_blocks(block * 50)
+
+    info = MarkdownParser._load_block_config.cache_info()
+    assert (info.misses, info.hits) == (1, 49)
+    assert all(b.config.caption == "缓存测试" and b.config.width == 640 for b in blocks)
+    blocks[0].config.caption = "修改"
+    assert blocks[1].config.caption == "缓存测试"
+
+
+def test_scan_blocks_spans():
+    """测试轻量 span 表示与模型一致，且引用原文而非复制"""
+    from md_mermaid_static.core.parser import BlockSpan
+
+    markdown_content = """# 标题
+
+```mermaid
+---
+caption: 图表1
+---
+graph TD
+    A --> B
+```
+
+```mermaid
+pie
+    "a": 1
+```
+"""
+    parser = MarkdownParser()
+    spans = parser.scan_blocks(markdown_content)
+
+    assert all(isinstance(span, BlockSpan) for span in spans)
+    assert all(span.source is markdown_content for span in spans)
+    assert not hasattr(spans[0], "__dict__")
+    assert [span.to_block() for span in spans] == parser.find_mermaid_blocks(
+        markdown_content
+    )
+    assert spans[0].content == "graph TD\n    A --> B"
+    assert (
+        spans[0].get_render_options().theme
+        == spans[0].to_block().get_render_options().theme
+    )
+    assert spans[1].config.caption is None
+
+    # 共享的配置不可修改，模型拿到的是可修改的副本
+    with pytest.raises(ValidationError):
+        spans[1].config.caption = "修改"
+    block = spans[0].to_block()
+    block.config.caption = "修改"
+    assert type(block.config) is MermaidConfig
+    assert spans[0].config.caption == "图表1"
+    assert parser.scan_blocks(markdown_content)[0].config.caption == "图表1"
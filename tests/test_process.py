@@ -0,0 +1,35 @@
+from md_mermaid_static.core.process import (
+    LatencyTracker,
+    backoff_delay,
+    is_transient_failure,
+)
+
+
+def test_is_transient_failure():
+    """测试区分可重试的失败和图表语法错误"""
+    assert is_transient_failure(None, "Render timed out after 5s")
+    assert is_transient_failure(-9, "")
+    assert is_transient_failure(
+        1, "TargetCloseError: Protocol error (Runtime.callFunctionOn)"
+    )
+    assert not is_transient_failure(1, "Error: Parse error on line 2")
+    assert not is_transient_failure(1, "Lexical error on line 1")
+    assert not is_transient_failure(1, "some other error")
+
+
+def test_backoff_delay():
+    """测试指数退避并有上限"""
+    assert [backoff_delay(n) for n in range(1, 5)] == [0.5, 1.0, 2.0, 4.0]
+    assert backoff_delay(10) == 8.0
+
+
+def test_latency_tracker_p95():
+    """测试样本不足时不计算 p95"""
+    tracker = LatencyTracker(min_samples=20)
+    for i in range(19):
+        tracker.record(float(i))
+    assert tracker.p95() is None
+
+    for i in range(19, 100):
+        tracker.record(float(i))
+    assert tracker.p95() == 95.0
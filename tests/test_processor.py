@@ -1,8 +1,9 @@
+import asyncio
 import pytest
 from pathlib import Path
 import tempfile
 from md_mermaid_static.core.processor import MarkdownProcessor
-from md_mermaid_static.models import MermaidBlock, MermaidConfig, CLIConfig
+from md_mermaid_static.models import MermaidBlock, MermaidConfig, CLIConfig, Theme
 
 
 @pytest.fixture
@@ -87,3 +88,238 @@ graph TD
 
     new_content = processor._replace_blocks(content, blocks)
     assert "![测试图](media/test.svg)" in new_content
+
+
+def test_process_async(temp_dir, sample_md_file, fake_mmdc):
+    """测试异步处理 Markdown 文件"""
+    script, _ = fake_mmdc
+    output_dir = temp_dir / "output"
+    processor = MarkdownProcessor(
+        str(sample_md_file),
+        CLIConfig(output_dir=str(output_dir), use_command=str(script), concurrent=True),
+    )
+
+    output_file = asyncio.run(processor.process_async())
+
+    content = output_file.read_text()
+    assert "```mermaid" not in content
+    assert "![流程图](media/mermaid_" in content
+    assert len(list((output_dir / "media").iterdir())) == 2
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_summary_counts_duplicates(temp_dir, monkeypatch, use_async):
+    """测试同步和异步处理的摘要中重复图表数一致"""
+    from md_mermaid_static.core import processor as processor_module
+    from md_mermaid_static.models import RenderBackendType
+
+    summaries = []
+    monkeypatch.setattr(
+        processor_module, "display_summary", lambda **kwargs: summaries.append(kwargs)
+    )
+    doc = temp_dir / "dup.md"
+    doc.write_text(
+        "```mermaid\ngraph TD\n    A --> B\n```\n\n" * 3
+        + '```mermaid\npie\n    "a": 1\n```\n'
+    )
+    processor = MarkdownProcessor(
+        str(doc),
+        CLIConfig(
+            output_dir=str(temp_dir / "output"),
+            backend=RenderBackendType.FAKE,
+            concurrent=True,
+        ),
+    )
+
+    with processor:
+        if use_async:
+            asyncio.run(processor.process_async())
+        else:
+            processor.process()
+
+    assert summaries[-1]["total_blocks"] == 4
+    assert summaries[-1]["duplicate_count"] == 2
+
+
+def test_block_reports_reset_between_runs(temp_dir):
+    """测试重复处理同一文档（监视模式）时不保留上一次的图表记录"""
+    from md_mermaid_static.models import RenderBackendType
+
+    doc = temp_dir / "watched.md"
+    doc.write_text("```mermaid\ngraph TD\n    A --> B\n```\n")
+    processor = MarkdownProcessor(
+        str(doc),
+        CLIConfig(
+            output_dir=str(temp_dir / "output"),
+            backend=RenderBackendType.FAKE,
+            report_file=str(temp_dir / "report.json"),
+        ),
+    )
+
+    with processor:
+        processor.process()
+        assert len(processor.block_reports) == 1
+        doc.write_text("# No charts left\n")
+        processor.process()
+        assert processor.block_reports == []
+
+
+def test_process_streaming(temp_dir, sample_md_file, fake_mmdc):
+    """测试流式处理与普通处理输出一致"""
+    script, _ = fake_mmdc
+    # 包含渲染失败的图表，应保留原代码块
+    with sample_md_file.open("a") as f:
+        f.write("\r\n```mermaid\r\ngraph fail\r\n```\r\n结尾\r\n")
+
+    outputs = []
+    for stream in (False, True):
+        output_dir = temp_dir / f"output-{stream}"
+        config = CLIConfig(
+            output_dir=str(output_dir), use_command=str(script), stream=stream
+        )
+        with MarkdownProcessor(str(sample_md_file), config) as processor:
+            outputs.append(processor.process().read_bytes())
+
+    # 流式模式保留原始换行符
+    assert outputs[0] == outputs[1].replace(b"\r\n", b"\n")
+    assert b"![\xe6\xb5\x81\xe7\xa8\x8b\xe5\x9b\xbe](media/mermaid_" in outputs[1]
+    assert b"```mermaid\r\ngraph fail\r\n```\r\n" in outputs[1]
+
+
+def test_replace_blocks_by_span():
+    """测试按字符区间一次性拼接输出"""
+    from md_mermaid_static.core.parser import MarkdownParser
+
+    content = "".join(
+        f"第 {i} 节\n```mermaid\ngraph TD\n    A{i} --> B\n```\n" for i in range(3000)
+    )
+    blocks = MarkdownParser().find_mermaid_blocks(content)
+    rendered = [
+        (block, None if i % 2 else Path(f"output/media/{i}.svg"))
+        for i, block in enumerate(blocks)
+    ]
+    processor = MarkdownProcessor("test.md", CLIConfig(output_dir="output"))
+
+    new_content = processor._replace_blocks(content, rendered)
+
+    expected = "".join(
+        f"第 {i} 节\n"
+        + (
+            f"```mermaid\ngraph TD\n    A{i} --> B\n```"
+            if i % 2
+            else f"![](media/{i}.svg)"
+        )
+        + "\n"
+        for i in range(3000)
+    )
+    assert new_content == expected
+
+
+def test_replace_blocks_without_spans_on_many_blocks():
+    """测试大量只有行号的代码块：按行号推导区间，写入文件与返回字符串一致"""
+    import io
+
+    count = 5000
+    content = "".join(
+        f"第 {i} 节\n```mermaid\ngraph TD\n    A{i} --> B\n```\n" for i in range(count)
+    )
+    rendered = [
+        (
+            MermaidBlock(
+                content=f"graph TD\n    A{i} --> B",
+                config=MermaidConfig(),
+                line_start=5 * i + 2,
+                line_end=5 * i + 5,
+            ),
+            None if i % 3 == 0 else Path(f"output/media/{i}.svg"),
+        )
+        for i in reversed(range(count))
+    ]
+    processor = MarkdownProcessor("test.md", CLIConfig(output_dir="output"))
+
+    new_content = processor._replace_blocks(content, rendered)
+    out = io.StringIO()
+    assert processor._replace_blocks(content, rendered, out) is None
+
+    expected = "".join(
+        f"第 {i} 节\n"
+        + (
+            f"```mermaid\ngraph TD\n    A{i} --> B\n```"
+            if i % 3 == 0
+            else f"![](media/{i}.svg)"
+        )
+        + "\n"
+        for i in range(count)
+    )
+    assert new_content == expected
+    assert out.getvalue() == expected
+
+
+def test_incremental_processing(temp_dir, sample_md_file, fake_mmdc):
+    """测试增量处理：未变化的文档直接跳过，仅重新渲染变化的图表"""
+    script, log_file = fake_mmdc
+    output_dir = temp_dir / "output"
+    config = CLIConfig(
+        output_dir=str(output_dir), use_command=str(script), incremental=True
+    )
+
+    def run(cli_config=config):
+        with MarkdownProcessor(str(sample_md_file), cli_config) as processor:
+            return processor.process()
+
+    output_file = run()
+    manifest = output_dir / ".test.md.manifest.json"
+    assert manifest.exists()
+    assert len(log_file.read_text().splitlines()) == 2
+    output_mtime = output_file.stat().st_mtime_ns
+    manifest_mtime = manifest.stat().st_mtime_ns
+
+    # 输入未变化：不解析、不渲染、不改写输出
+    assert run() == output_file
+    assert output_file.stat().st_mtime_ns == output_mtime
+    assert manifest.stat().st_mtime_ns == manifest_mtime
+    assert len(log_file.read_text().splitlines()) == 2
+
+    # 修改一个图表：只重新渲染该图表
+    sample_md_file.write_text(
+        sample_md_file.read_text().replace("Hello John", "Hi John")
+    )
+    run()
+    assert len(log_file.read_text().splitlines()) == 3
+    assert "```mermaid" not in output_file.read_text()
+
+    # 设置变化：重新处理
+    manifest_mtime = manifest.stat().st_mtime_ns
+    run(config.model_copy(update={"theme": Theme.DARK}))
+    assert manifest.stat().st_mtime_ns != manifest_mtime
+
+
+def test_incremental_processing_tracks_theme_files(temp_dir, monkeypatch):
+    """测试增量处理：主题文件内容变化后重新处理文档"""
+    from md_mermaid_static.models import RenderBackendType
+    from md_mermaid_static.utils import theme_manager
+
+    monkeypatch.setattr(theme_manager, "_instance", None)
+    theme_dir = temp_dir / "themes" / "mytheme"
+    theme_dir.mkdir(parents=True)
+    (theme_dir / "style.css").write_text("svg { color: red; }")
+    doc = temp_dir / "themed.md"
+    doc.write_text("```mermaid\ngraph TD\n    A --> B\n```\n")
+    config = CLIConfig(
+        output_dir=str(temp_dir / "output"),
+        backend=RenderBackendType.FAKE,
+        custom_theme="mytheme",
+        themes_dir=str(temp_dir / "themes"),
+        incremental=True,
+    )
+    monkeypatch.setattr(CLIConfig, "_instance", config)
+
+    def run():
+        with MarkdownProcessor(str(doc), config) as processor:
+            output_file = processor.process()
+        return output_file.read_text()
+
+    first = run()
+    assert run() == first
+    (theme_dir / "style.css").write_text("svg { color: blue; }")
+    assert run() != first
@@ -1,8 +1,16 @@
+import asyncio
+import os
+import time
 import pytest
 from pathlib import Path
 import tempfile
 from md_mermaid_static.core.renderer import MermaidRenderer
-from md_mermaid_static.models import MermaidBlock, MermaidConfig
+from md_mermaid_static.models import (
+    CLIConfig,
+    MermaidBlock,
+    MermaidConfig,
+    OutputFormat,
+)
 
 
 @pytest.fixture
@@ -38,3 +46,412 @@ def test_check_command_exists(renderer):
     assert renderer._check_command_exists("python")
     # 测试一个不存在的命令
     assert not renderer._check_command_exists("nonexistentcommand123")
+
+
+def _blocks(*contents, **config):
+    return [
+        MermaidBlock(
+            content=content,
+            config=MermaidConfig(**config),
+            line_start=1,
+            line_end=3,
+        )
+        for content in contents
+    ]
+
+
+def test_batch_render_single_invocation(temp_dir, fake_mmdc):
+    """测试相同渲染选项的图表合并为一次 mermaid-cli 调用"""
+    script, log_file = fake_mmdc
+    cli_config = CLIConfig(
+        output_dir=str(temp_dir), batch=True, use_command=str(script)
+    )
+    renderer = MermaidRenderer(str(temp_dir), cli_config)
+
+    blocks = _blocks("graph TD\n    A --> B", "graph LR\n    C --> D", "pie")
+    results = renderer.render_blocks(blocks)
+
+    assert len(log_file.read_text().splitlines()) == 1
+    assert [block for block, _ in results] == blocks
+    for block, path in results:
+        assert path.read_text() == f"<svg>{block.content}</svg>"
+
+
+def test_batch_render_groups_by_options(temp_dir, fake_mmdc):
+    """测试不同渲染选项的图表分组渲染"""
+    script, log_file = fake_mmdc
+    cli_config = CLIConfig(
+        output_dir=str(temp_dir), batch=True, use_command=str(script)
+    )
+    renderer = MermaidRenderer(str(temp_dir), cli_config)
+
+    blocks = _blocks("graph TD", "graph LR") + _blocks("pie", width=400)
+    assert renderer._plan_batches(blocks, [0, 1, 2]) == [[0, 1], [2]]
+
+    results = renderer.render_blocks(blocks)
+    assert all(path is not None for _, path in results)
+    assert len(log_file.read_text().splitlines()) == 2
+
+
+def test_batch_render_falls_back_on_failure(temp_dir, fake_mmdc):
+    """测试批量渲染失败时逐个重试"""
+    script, log_file = fake_mmdc
+    cli_config = CLIConfig(
+        output_dir=str(temp_dir), batch=True, use_command=str(script)
+    )
+    renderer = MermaidRenderer(str(temp_dir), cli_config)
+
+    results = renderer.render_blocks(_blocks("graph TD", "fail", "pie"))
+
+    assert [path is not None for _, path in results] == [True, False, True]
+    # 一次批量调用 + 三次单独调用
+    assert len(log_file.read_text().splitlines()) == 4
+
+
+def test_render_cache_skips_unchanged_charts(temp_dir, fake_mmdc):
+    """测试缓存命中时不再调用 mermaid-cli"""
+    script, log_file = fake_mmdc
+    cli_config = CLIConfig(output_dir=str(temp_dir), use_command=str(script))
+
+    first = MermaidRenderer(str(temp_dir), cli_config).render_blocks(
+        _blocks("graph TD", "pie")
+    )
+    assert len(log_file.read_text().splitlines()) == 2
+
+    renderer = MermaidRenderer(str(temp_dir), cli_config)
+    second, stats = renderer.render_blocks_with_stats(
+        _blocks("graph TD", "pie", "graph LR")
+    )
+    assert len(log_file.read_text().splitlines()) == 3
+    assert [path for _, path in second][:2] == [path for _, path in first]
+    assert stats.cached == 2
+
+
+def test_render_cache_disabled(temp_dir, fake_mmdc):
+    """测试禁用缓存时总是重新渲染"""
+    script, log_file = fake_mmdc
+    cli_config = CLIConfig(
+        output_dir=str(temp_dir), use_command=str(script), cache=False
+    )
+    renderer = MermaidRenderer(str(temp_dir), cli_config)
+
+    renderer.render_blocks(_blocks("graph TD"))
+    renderer.render_blocks(_blocks("graph TD"))
+    assert len(log_file.read_text().splitlines()) == 2
+
+
+def test_shared_cache_across_output_dirs(temp_dir, fake_mmdc):
+    """测试共享缓存在不同输出目录之间复用图表"""
+    script, log_file = fake_mmdc
+    shared = dict(
+        use_command=str(script),
+        shared_cache=True,
+        shared_cache_dir=str(temp_dir / "store"),
+    )
+
+    for project in ("a", "b"):
+        output_dir = temp_dir / project
+        renderer = MermaidRenderer(
+            str(output_dir), CLIConfig(output_dir=str(output_dir), **shared)
+        )
+        ((_, path),) = renderer.render_blocks(_blocks("graph TD"))
+        assert path.parent == output_dir / "media"
+        assert path.read_text() == "<svg>graph TD</svg>"
+
+    assert len(log_file.read_text().splitlines()) == 1
+
+
+def test_shared_cache_failure_keeps_render(temp_dir, fake_mmdc, monkeypatch):
+    """测试共享缓存写入失败时图表仍然渲染成功"""
+    from md_mermaid_static.core.cache import SharedRenderCache
+
+    def failing_store(self, src):
+        raise FileNotFoundError(src)
+
+    monkeypatch.setattr(SharedRenderCache, "store", failing_store)
+    script, _ = fake_mmdc
+    cli_config = CLIConfig(
+        output_dir=str(temp_dir),
+        use_command=str(script),
+        shared_cache=True,
+        shared_cache_dir=str(temp_dir / "store"),
+    )
+    renderer = MermaidRenderer(str(temp_dir), cli_config)
+
+    ((_, path),) = renderer.render_blocks(_blocks("graph TD"))
+
+    assert path.read_text() == "<svg>graph TD</svg>"
+
+
+def test_render_blocks_async(temp_dir, fake_mmdc):
+    """测试异步渲染引擎"""
+    script, log_file = fake_mmdc
+    cli_config = CLIConfig(
+        output_dir=str(temp_dir),
+        use_command=str(script),
+        concurrent=True,
+        max_workers=2,
+    )
+    renderer = MermaidRenderer(str(temp_dir), cli_config)
+    blocks = _blocks("graph TD", "fail", "pie", "graph LR")
+
+    results = asyncio.run(renderer.render_blocks_async(blocks))
+
+    assert [block for block, _ in results] == blocks
+    assert [path is not None for _, path in results] == [True, False, True, True]
+    assert results[2][1].read_text() == "<svg>pie</svg>"
+    assert len(log_file.read_text().splitlines()) == 4
+
+
+def test_render_blocks_async_looks_up_off_the_loop(temp_dir, fake_mmdc, caplog):
+    """测试异步渲染时指纹计算和缓存查找不在事件循环线程中执行"""
+    import threading
+
+    script, _ = fake_mmdc
+    cli_config = CLIConfig(
+        output_dir=str(temp_dir), use_command=str(script), batch=True
+    )
+    renderer = MermaidRenderer(str(temp_dir), cli_config)
+    threads = []
+    for name in ("_deduplicate", "_resolve_targets", "_get_cached_output"):
+        original = getattr(renderer, name)
+
+        def traced(*args, _original=original):
+            threads.append(threading.current_thread())
+            return _original(*args)
+
+        setattr(renderer, name, traced)
+
+    async def render():
+        return threading.current_thread(), await renderer.render_blocks_async(
+            _blocks("graph TD", "pie")
+        )
+
+    loop_thread, results = asyncio.run(render())
+
+    assert all(path is not None for _, path in results)
+    assert len(threads) == 4 and loop_thread not in threads
+    assert "Batch rendering is not supported asynchronously" in caplog.text
+
+
+def test_enhanced_svg_pipeline(temp_dir, fake_mmdc):
+    """测试并发模式下 PDF 转换在独立进程池中完成"""
+    script, log_file = fake_mmdc
+    cli_config = CLIConfig(
+        output_dir=str(temp_dir),
+        use_command=str(script),
+        output_format=OutputFormat.ENHANCED_SVG,
+        concurrent=True,
+        max_workers=2,
+        convert_workers=2,
+    )
+    with MermaidRenderer(str(temp_dir), cli_config) as renderer:
+        results = renderer.render_blocks(_blocks("graph TD", "pie", "fail", "graph LR"))
+        assert renderer._convert_pool is not None
+
+    assert [path is not None for _, path in results] == [True, True, False, True]
+    for _, path in results:
+        if path:
+            assert path.suffix == ".svg"
+            assert path.read_text().startswith("<svg")
+
+
+def test_failed_conversion_submit_releases_slot(temp_dir):
+    """测试转换进程池提交失败时释放转换队列名额，不会耗尽后永久阻塞"""
+    import threading
+    from concurrent.futures.process import BrokenProcessPool
+
+    class BrokenPool:
+        def submit(self, *args):
+            raise BrokenProcessPool("conversion worker crashed")
+
+    cli_config = CLIConfig(
+        output_dir=str(temp_dir), output_format=OutputFormat.ENHANCED_SVG
+    )
+    renderer = MermaidRenderer(str(temp_dir), cli_config)
+    renderer._convert_pool = BrokenPool()
+    renderer._convert_slots = threading.BoundedSemaphore(2)
+
+    for _ in range(5):
+        with pytest.raises(BrokenProcessPool):
+            renderer._store_artifact(b"%PDF", temp_dir / "media" / "x.svg", True)
+
+    assert renderer._convert_slots.acquire(blocking=False)
+    assert renderer._convert_slots.acquire(blocking=False)
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_render_blocks_deduplicates(temp_dir, fake_mmdc, concurrent):
+    """测试相同图表只渲染一次并分发给所有出现位置"""
+    script, log_file = fake_mmdc
+    cli_config = CLIConfig(
+        output_dir=str(temp_dir), use_command=str(script), concurrent=concurrent
+    )
+    renderer = MermaidRenderer(str(temp_dir), cli_config)
+    blocks = _blocks("graph TD", "pie", "graph TD", "graph TD")
+
+    results, stats = renderer.render_blocks_with_stats(blocks)
+
+    assert len(log_file.read_text().splitlines()) == 2
+    paths = [path for _, path in results]
+    assert paths[0] == paths[2] == paths[3] != paths[1]
+    assert stats.duplicates == 2
+    assert stats.unique == 2
+
+
+def test_render_stats_are_per_call(temp_dir):
+    """测试共享渲染器上并发调用各自返回自己的统计，互不覆盖"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from md_mermaid_static.models import RenderBackendType
+
+    cli_config = CLIConfig(output_dir=str(temp_dir), backend=RenderBackendType.FAKE)
+    renderer = MermaidRenderer(str(temp_dir), cli_config)
+    documents = [
+        _blocks(*[f"graph TD\n    D{doc}"] * (doc + 1), f"pie\n    D{doc}")
+        for doc in range(8)
+    ]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        outcomes = list(executor.map(renderer.render_blocks_with_stats, documents))
+
+    for doc, (results, stats) in enumerate(outcomes):
+        assert all(path is not None for _, path in results)
+        assert (stats.total, stats.unique, stats.duplicates) == (doc + 2, 2, doc)
+
+
+def test_render_claims_are_shared_between_calls(renderer, temp_dir):
+    """测试并发调用之间共享进行中的渲染"""
+    target = temp_dir / "media" / "mermaid_x.svg"
+    assert renderer._claim(target) is None
+    future = renderer._claim(target)
+    assert future is not None and not future.done()
+
+    renderer._release(target, target)
+    assert future.result() == target
+    assert renderer._claim(target) is None
+
+
+def test_adaptive_concurrency(temp_dir, fake_mmdc):
+    """测试自适应并发模式渲染"""
+    script, log_file = fake_mmdc
+    cli_config = CLIConfig(
+        output_dir=str(temp_dir),
+        use_command=str(script),
+        concurrent=True,
+        max_workers=4,
+        adaptive_workers=True,
+    )
+    with MermaidRenderer(str(temp_dir), cli_config) as renderer:
+        results = renderer.render_blocks(
+            _blocks(*(f"graph TD\n    A{i}" for i in range(6)))
+        )
+        assert renderer._limiter.in_flight == 0
+
+    assert all(path is not None for _, path in results)
+    assert len(log_file.read_text().splitlines()) == 6
+
+
+def _process_gone(pid: int) -> bool:
+    """进程已退出（或仅剩僵尸进程）"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] == "Z"
+    except FileNotFoundError:
+        return True
+
+
+@pytest.mark.skipif(os.name != "posix", reason="需要进程组")
+def test_render_timeout_kills_process_tree(temp_dir, fake_mmdc):
+    """测试渲染超时后终止整个进程组"""
+    script, log_file = fake_mmdc
+    cli_config = CLIConfig(
+        output_dir=str(temp_dir),
+        use_command=str(script),
+        render_timeout=1,
+        render_retries=0,
+    )
+    renderer = MermaidRenderer(str(temp_dir), cli_config)
+
+    started = time.monotonic()
+    assert renderer.render_block(_blocks("graph hang")[0], 0) is None
+    assert time.monotonic() - started < 10
+
+    child = int(Path(f"{log_file}.child").read_text())
+    deadline = time.monotonic() + 5
+    while not _process_gone(child) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert _process_gone(child)
+
+
+def test_render_retries_transient_failures(temp_dir, fake_mmdc):
+    """测试崩溃后重试，语法错误不重试"""
+    script, log_file = fake_mmdc
+    cli_config = CLIConfig(
+        output_dir=str(temp_dir), use_command=str(script), render_retries=2
+    )
+    renderer = MermaidRenderer(str(temp_dir), cli_config)
+
+    assert renderer.render_block(_blocks("graph flaky")[0], 0) is not None
+    assert len(log_file.read_text().splitlines()) == 2
+
+    assert renderer.render_block(_blocks("graph fail")[0], 1) is None
+    assert len(log_file.read_text().splitlines()) == 3
+
+
+def test_hedged_render(temp_dir, fake_mmdc):
+    """测试渲染超过 p95 延迟后启动对冲渲染"""
+    script, log_file = fake_mmdc
+    cli_config = CLIConfig(
+        output_dir=str(temp_dir), use_command=str(script), hedge=True
+    )
+    renderer = MermaidRenderer(str(temp_dir), cli_config)
+    for _ in range(20):
+        renderer._latencies.record(0.5)
+
+    started = time.monotonic()
+    output_path = renderer.render_block(_blocks("graph slow")[0], 0)
+    assert output_path is not None
+    assert output_path.read_text() == "<svg>graph slow</svg>"
+    assert time.monotonic() - started < 30
+    assert len(log_file.read_text().splitlines()) == 2
+
+
+def test_hedged_render_async(temp_dir, fake_mmdc):
+    """测试异步模式下的对冲渲染"""
+    script, log_file = fake_mmdc
+    cli_config = CLIConfig(
+        output_dir=str(temp_dir), use_command=str(script), hedge=True
+    )
+    renderer = MermaidRenderer(str(temp_dir), cli_config)
+    for _ in range(20):
+        renderer._latencies.record(0.5)
+
+    started = time.monotonic()
+    results = asyncio.run(renderer.render_blocks_async(_blocks("graph slow")))
+    assert results[0][1] is not None
+    assert time.monotonic() - started < 30
+
+
+def test_render_pipes_source_and_artifact(temp_dir, fake_mmdc, monkeypatch):
+    """测试单图渲染通过 stdin/stdout 传递，不创建临时文件"""
+    script, log_file = fake_mmdc
+    cli_config = CLIConfig(
+        output_dir=str(temp_dir),
+        use_command=str(script),
+        output_format=OutputFormat.ENHANCED_SVG,
+    )
+    renderer = MermaidRenderer(str(temp_dir), cli_config)
+
+    def no_temp_dir(*args, **kwargs):
+        raise AssertionError("temporary directory created")
+
+    monkeypatch.setattr(tempfile, "TemporaryDirectory", no_temp_dir)
+    output_path = renderer.render_block(_blocks("graph TD\n    A-->B")[0], 0)
+
+    assert output_path is not None
+    assert "<svg" in output_path.read_text()
+    args = log_file.read_text().split()
+    assert args[args.index("-i") + 1] == "-" and args[args.index("-o") + 1] == "-"
+    assert args[args.index("-e") + 1] == "pdf"
+    assert [p.name for p in renderer.media_dir.iterdir()] == [output_path.name]
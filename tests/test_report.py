@@ -0,0 +1,141 @@
+import json
+
+import pytest
+from click.testing import CliRunner
+from md_mermaid_static.cli import main
+from md_mermaid_static.models import CLIConfig
+
+
+@pytest.fixture(autouse=True)
+def no_global_config(monkeypatch):
+    """CLI 会设置全局配置单例，测试后恢复"""
+    monkeypatch.setattr(CLIConfig, "_instance", None)
+
+
+def _run(inputs, output_dir, report, *options):
+    return CliRunner().invoke(
+        main,
+        [
+            *inputs,
+            "--output-dir",
+            str(output_dir),
+            "--backend",
+            "fake",
+            "--report",
+            str(report),
+            *options,
+        ],
+    )
+
+
+def test_report_records_timings_and_cache_hits(tmp_path):
+    """测试 --report 输出每个图表的耗时、指纹和缓存命中，以及运行汇总"""
+    doc = tmp_path / "doc.md"
+    doc.write_text(
+        "```mermaid\ngraph TD\n    A --> B\n```\n\n"
+        "```mermaid\nsequenceDiagram\n    A->>B: hi\n```\n\n"
+        "```mermaid\ngraph TD\n    A --> B\n```\n"
+    )
+    report_file = tmp_path / "report.json"
+    options = ["--output-format", "enhanced-svg", "--concurrent"]
+
+    result = _run([str(doc)], tmp_path / "out", report_file, *options)
+    assert result.exit_code == 0, result.output
+    report = json.loads(report_file.read_text())
+
+    blocks = report["blocks"]
+    assert [(b["line_start"], b["line_end"]) for b in blocks] == [
+        (1, 4),
+        (6, 9),
+        (11, 14),
+    ]
+    assert all(b["source"] == str(doc) and b["error"] is None for b in blocks)
+    assert blocks[0]["fingerprint"] == blocks[2]["fingerprint"]
+    assert [b["duplicate"] for b in blocks] == [False, False, True]
+    for block in blocks:
+        assert not block["cache_hit"]
+        assert block["render_ms"] >= 0 and block["convert_ms"] > 0
+        assert (
+            block["output_bytes"] == (tmp_path / "out" / block["output"]).stat().st_size
+        )
+    assert blocks[1]["diagram_type"] == "Sequence Diagram"
+
+    summary = report["summary"]
+    assert summary["backend"] == "fake"
+    assert summary["blocks"] == 3 and summary["rendered"] == 3
+    assert summary["unique"] == 2 and summary["duplicates"] == 1
+    assert summary["cache_hits"] == 0
+    assert (
+        summary["render_ms_p50"] <= summary["render_ms_p95"] <= summary["render_ms_max"]
+    )
+    assert summary["convert_ms_total"] == pytest.approx(
+        blocks[0]["convert_ms"] + blocks[1]["convert_ms"]
+    )
+
+    # 第二次运行全部命中缓存
+    CLIConfig._instance = None
+    result = _run([str(doc)], tmp_path / "out", report_file, *options)
+    assert result.exit_code == 0, result.output
+    report = json.loads(report_file.read_text())
+    assert all(b["cache_hit"] and b["render_ms"] is None for b in report["blocks"])
+    assert report["summary"]["cache_hit_rate"] == 1.0
+
+
+def test_report_with_parse_workers(tmp_path):
+    """测试多进程解析时，协调进程渲染的图表带有渲染耗时"""
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(2):
+        (docs / f"d{i}.md").write_text(
+            f"# Doc {i}\n\n```mermaid\ngraph TD\n    A{i} --> B\n```\n"
+        )
+    report_file = tmp_path / "report.json"
+
+    result = _run([str(docs)], tmp_path / "out", report_file, "--parse-workers", "2")
+
+    assert result.exit_code == 0, result.output
+    report = json.loads(report_file.read_text())
+    assert report["summary"]["documents"] == 2
+    assert [b["source"] for b in report["blocks"]] == [
+        str(docs / "d0.md"),
+        str(docs / "d1.md"),
+    ]
+    assert all(
+        not b["cache_hit"] and b["render_ms"] is not None and b["output_bytes"] > 0
+        for b in report["blocks"]
+    )
+
+
+@pytest.mark.parametrize("options", [[], ["--parse-workers", "2"]])
+def test_report_covers_documents_skipped_by_incremental(tmp_path, options):
+    """测试 --incremental 跳过的未修改文档仍以缓存命中出现在报告中"""
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(2):
+        (docs / f"d{i}.md").write_text(
+            f"# Doc {i}\n\n```mermaid\nsequenceDiagram\n    A{i}->>B: hi\n```\n"
+        )
+    report_file = tmp_path / "report.json"
+    options = ["--incremental", *options]
+
+    result = _run([str(docs)], tmp_path / "out", report_file, *options)
+    assert result.exit_code == 0, result.output
+    first = json.loads(report_file.read_text())["blocks"]
+
+    CLIConfig._instance = None
+    (docs / "d1.md").write_text("# Doc 1\n\n```mermaid\ngraph TD\n    C --> D\n```\n")
+    result = _run([str(docs)], tmp_path / "out", report_file, *options)
+    assert result.exit_code == 0, result.output
+    report = json.loads(report_file.read_text())
+
+    skipped, changed = report["blocks"]
+    assert skipped["source"] == str(docs / "d0.md")
+    assert skipped["cache_hit"] and skipped["render_ms"] is None
+    for key in ("line_start", "line_end", "diagram_type", "fingerprint", "output"):
+        assert skipped[key] == first[0][key]
+    assert skipped["diagram_type"] == "Sequence Diagram"
+    assert (
+        skipped["output_bytes"] == (tmp_path / "out" / skipped["output"]).stat().st_size
+    )
+    assert not changed["cache_hit"] and changed["render_ms"] is not None
+    assert report["summary"]["blocks"] == 2 and report["summary"]["cache_hits"] == 1
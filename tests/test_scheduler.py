@@ -0,0 +1,122 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+from md_mermaid_static.core import scheduler
+from md_mermaid_static.core.scheduler import AdaptiveLimiter, process_tree_rss
+
+
+@pytest.fixture
+def quiet_system(monkeypatch):
+    """模拟内存充足、负载较低的系统"""
+    monkeypatch.setattr(
+        scheduler, "read_meminfo", lambda: {"MemAvailable": 64 * 1024**3}
+    )
+    monkeypatch.setattr(scheduler, "read_loadavg", lambda: 0.0)
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="需要 /proc")
+def test_process_tree_rss():
+    """测试读取进程树内存占用"""
+    totals = process_tree_rss([os.getpid()])
+    assert totals[os.getpid()] > 0
+
+
+def test_limiter_grows_after_full_rounds(quiet_system):
+    """测试系统空闲时逐步提高并发上限"""
+    limiter = AdaptiveLimiter(max_limit=8, memory_budget=64 * 1024**3)
+    limiter.limit = 1
+
+    for _ in range(10):
+        with limiter.slot():
+            pass
+
+    assert 1 < limiter.limit <= 8
+
+
+def test_limiter_respects_memory_budget(quiet_system):
+    """测试按单次渲染内存占用和预算限制并发"""
+    limiter = AdaptiveLimiter(max_limit=16, memory_budget=1000 * 1024**2)
+    limiter.limit = 16
+    limiter.render_rss = 400 * 1024**2
+
+    limiter.acquire()
+    limiter.release()
+
+    assert limiter.limit == 2
+
+
+def test_limiter_shrinks_under_load(quiet_system, monkeypatch):
+    """测试负载过高时减半并发"""
+    limiter = AdaptiveLimiter(max_limit=16, memory_budget=64 * 1024**3)
+    limiter.limit = 8
+    monkeypatch.setattr(scheduler, "read_loadavg", lambda: limiter.cpu_count * 4.0)
+
+    limiter.acquire()
+    limiter.release(1.0)
+
+    assert limiter.limit == 4
+
+
+def test_limiter_backs_off_on_latency_against_best(quiet_system):
+    """测试延迟变慢时逐轮降低并发，且最佳延迟保持为真实最小值"""
+    limiter = AdaptiveLimiter(max_limit=16, memory_budget=64 * 1024**3)
+    limiter.limit = 4
+    limiter.latency = limiter.best_latency = 1.0
+
+    # 每完成一整轮才降一次
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release(10.0)
+    assert limiter.limit == 3
+    assert limiter.best_latency == 1.0
+
+    # 延迟仍远高于最佳值：继续下降，而不是以变慢后的延迟为新基线
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(3.0)
+    assert limiter.limit == 2
+    assert limiter.best_latency == 1.0
+
+
+def test_limiter_blocks_at_limit(quiet_system):
+    """测试达到上限时阻塞等待"""
+    limiter = AdaptiveLimiter(max_limit=4, memory_budget=64 * 1024**3)
+    limiter.limit = 1
+    limiter.acquire()
+    assert not limiter.try_acquire()
+
+    acquired = threading.Event()
+
+    def waiter():
+        limiter.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    assert not acquired.wait(0.1)
+    limiter.release()
+    assert acquired.wait(5)
+    thread.join()
+
+
+def test_limiter_wakes_async_waiters_on_release(quiet_system):
+    """测试协程等待空闲名额时由 release 唤醒，而不是轮询"""
+    limiter = AdaptiveLimiter(max_limit=4, memory_budget=64 * 1024**3)
+    limiter.limit = 1
+    limiter.acquire()
+
+    async def main():
+        waiter = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        assert len(limiter._async_waiters) == 1
+        # 在其他线程释放名额
+        threading.Thread(target=limiter.release).start()
+        await asyncio.wait_for(waiter, timeout=5)
+
+    asyncio.run(main())
+    assert limiter.in_flight == 1
+    assert limiter._async_waiters == []
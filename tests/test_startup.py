@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+
+# 命令行模块自身（不含 click）的导入耗时上限，单位微秒
+CLI_IMPORT_BUDGET_US = 50_000
+
+# 启动时不应加载的重量级依赖
+HEAVY_MODULES = ("rich", "pymupdf", "yaml", "dotenv", "asyncio")
+
+
+def _run_python(*args):
+    """在独立的解释器中运行，避免受测试进程已导入模块的影响"""
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, env=env, check=True
+    )
+
+
+def _cumulative_import_times(stderr):
+    """解析 -X importtime 输出，返回 {模块名: 累计耗时(微秒)}"""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times.setdefault(name.strip(), int(cumulative))
+    return times
+
+
+def test_cli_import_time_budget():
+    """测试导入命令行模块的耗时在预算之内"""
+    # 预热字节码缓存
+    _run_python("-c", "import md_mermaid_static.cli")
+    result = _run_python("-X", "importtime", "-c", "import md_mermaid_static.cli")
+    times = _cumulative_import_times(result.stderr)
+
+    own = times["md_mermaid_static.cli"] - times.get("click", 0)
+    assert own < CLI_IMPORT_BUDGET_US, f"md_mermaid_static.cli 导入耗时 {own}us"
+
+
+def test_help_does_not_import_heavy_dependencies():
+    """测试 --help 不加载 pydantic、rich 等依赖"""
+    script = (
+        "import sys\n"
+        "from md_mermaid_static.cli import main\n"
+        "try:\n"
+        "    main(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        f"modules = {HEAVY_MODULES + ('pydantic',)!r}\n"
+        "print(sorted(m for m in modules if m in sys.modules))\n"
+    )
+    result = _run_python("-c", script)
+    assert result.stdout.splitlines()[-1] == "[]"
+
+
+def test_document_without_charts_skips_heavy_dependencies(tmp_path):
+    """测试处理不含图表的文档时不加载 PyMuPDF、rich 等依赖"""
+    doc = tmp_path / "plain.md"
+    doc.write_text("# 标题\n\n没有图表\n")
+    script = (
+        "import sys\n"
+        "from md_mermaid_static.cli import main\n"
+        "try:\n"
+        f"    main([{str(doc)!r}, '-o', {str(tmp_path / 'output')!r}])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        f"print(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    # 输出不是终端，日志以纯文本写出
+    result = _run_python("-c", script)
+    assert result.stdout.splitlines()[-1] == "[]"
+    assert (tmp_path / "output" / "plain.md").read_text() == doc.read_text()
@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+from click.testing import CliRunner
+from md_mermaid_static.cli import main
+from md_mermaid_static.models import CLIConfig
+from md_mermaid_static.utils import tracing
+
+
+@pytest.fixture(autouse=True)
+def no_global_config(monkeypatch):
+    """CLI 会设置全局配置单例，测试后恢复"""
+    monkeypatch.setattr(CLIConfig, "_instance", None)
+
+
+def test_span_is_noop_when_disabled():
+    """测试未开启追踪时 span 不记录任何事件"""
+    assert not tracing.is_enabled()
+    with tracing.span("idle", index=1) as traced:
+        assert traced is None
+
+
+def test_trace_covers_stages_and_conversion_workers(tmp_path):
+    """测试 --trace 输出 Chrome trace 格式，包含各阶段、图表序号和转换进程"""
+    doc = tmp_path / "doc.md"
+    doc.write_text(
+        "".join(
+            f"# Part {i}\n\n```mermaid\ngraph TD\n    A{i} --> B{i}\n```\n\n"
+            for i in range(3)
+        )
+    )
+    trace_file = tmp_path / "trace.json"
+
+    result = CliRunner().invoke(
+        main,
+        [
+            str(doc),
+            "--output-dir",
+            str(tmp_path / "out"),
+            "--output-format",
+            "enhanced-svg",
+            "--backend",
+            "fake",
+            "--concurrent",
+            "--max-workers",
+            "2",
+            "--convert-workers",
+            "1",
+            "--trace",
+            str(trace_file),
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert not tracing.is_enabled()
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    spans = [event for event in events if event["ph"] == "X"]
+    names = {event["name"] for event in spans}
+    assert {
+        "process",
+        "read_input",
+        "scan_blocks",
+        "start_backend",
+        "render_blocks",
+        "render_block",
+        "cache_lookup",
+        "render",
+        "convert_pdf",
+        "write_artifact",
+        "write_output",
+    } <= names
+
+    indices = {event["args"]["index"] for event in spans if event["name"] == "render"}
+    assert indices == {0, 1, 2}
+    assert all(event["dur"] >= 0 and event["ts"] >= 0 for event in spans)
+
+    # PDF 转换在进程池中执行，作为独立进程出现在时间线上
+    converts = [event for event in spans if event["name"] == "convert_pdf"]
+    assert len(converts) == 3
+    assert {event["pid"] for event in converts} != {os.getpid()}
+    assert any(
+        event["ph"] == "M" and event["name"] == "process_name" for event in events
+    )
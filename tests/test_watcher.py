@@ -0,0 +1,107 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+from md_mermaid_static.core.watcher import FileWatcher
+
+
+def _later(delay, fn):
+    """延迟执行，模拟编辑器保存"""
+    timer = threading.Timer(delay, fn)
+    timer.start()
+    return timer
+
+
+@pytest.mark.parametrize("use_inotify", [False, True])
+def test_watcher_detects_modification(tmp_path, use_inotify):
+    """测试文件修改被检测到"""
+    if use_inotify and not sys.platform.startswith("linux"):
+        pytest.skip("inotify 仅在 Linux 上可用")
+    doc = tmp_path / "doc.md"
+    doc.write_text("# v1\n")
+
+    with FileWatcher(
+        [doc], debounce=0.1, poll_interval=0.05, use_inotify=use_inotify
+    ) as watcher:
+        # 保证 mtime 不同
+        _later(0.1, lambda: doc.write_text("# v2 changed\n"))
+        changed = watcher.wait(timeout=5)
+
+    assert doc.absolute() in changed
+
+
+@pytest.mark.parametrize("use_inotify", [False, True])
+def test_watcher_detects_hidden_watched_file(tmp_path, use_inotify):
+    """测试显式监视的隐藏文件（如 .notes.md）变化也能被检测到"""
+    if use_inotify and not sys.platform.startswith("linux"):
+        pytest.skip("inotify 仅在 Linux 上可用")
+    doc = tmp_path / ".notes.md"
+    doc.write_text("# v1\n")
+
+    with FileWatcher(
+        [doc], debounce=0.1, poll_interval=0.05, use_inotify=use_inotify
+    ) as watcher:
+        _later(0.1, lambda: doc.write_text("# v2 changed\n"))
+        changed = watcher.wait(timeout=5)
+
+    assert changed == {doc.absolute()}
+
+
+@pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify 仅在 Linux 上可用"
+)
+def test_inotify_detects_atomic_replace(tmp_path):
+    """测试编辑器通过临时文件原子替换保存时仍能检测到变化"""
+    doc = tmp_path / "doc.md"
+    doc.write_text("# v1\n")
+
+    def save():
+        temp = tmp_path / ".doc.md.swp"
+        temp.write_text("# v2\n")
+        os.replace(temp, doc)
+
+    with FileWatcher([doc], debounce=0.1) as watcher:
+        assert watcher.backend == "inotify"
+        _later(0.1, save)
+        changed = watcher.wait(timeout=5)
+        # 替换后仍然在监视
+        _later(0.1, save)
+        changed_again = watcher.wait(timeout=5)
+
+    assert changed == {doc.absolute()}
+    assert changed_again == {doc.absolute()}
+
+
+def test_watcher_debounces_bursts_and_theme_dirs(tmp_path):
+    """测试连续写入被合并为一次变化，并监视主题目录"""
+    doc = tmp_path / "doc.md"
+    doc.write_text("# v1\n")
+    themes = tmp_path / "themes"
+    themes.mkdir()
+    other = tmp_path / "unrelated.md"
+
+    def burst():
+        for i in range(5):
+            doc.write_text(f"# v{i + 2}\n" * (i + 2))
+            time.sleep(0.02)
+        other.write_text("ignored")
+        (themes / "custom.json").write_text("{}")
+
+    with FileWatcher([doc], [themes], debounce=0.3) as watcher:
+        _later(0.1, burst)
+        changed = watcher.wait(timeout=5)
+        assert watcher.wait(timeout=0.2) == set()
+
+    assert changed == {doc.absolute(), (themes / "custom.json").absolute()}
+
+
+def test_watcher_times_out_without_changes(tmp_path):
+    """测试无变化时超时返回空集合"""
+    doc = tmp_path / "doc.md"
+    doc.write_text("# v1\n")
+    with FileWatcher([doc], debounce=0.05) as watcher:
+        started = time.monotonic()
+        assert watcher.wait(timeout=0.2) == set()
+    assert time.monotonic() - started < 2
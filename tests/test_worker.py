@@ -0,0 +1,88 @@
+import asyncio
+import sys
+import textwrap
+
+import pytest
+from md_mermaid_static.core.backends import WorkerBackend
+from md_mermaid_static.core.worker import RenderWorker, RenderWorkerError
+from md_mermaid_static.models import MermaidRenderOptions, OutputFormat
+
+
+FAKE_WORKER = textwrap.dedent(
+    """
+    import base64, json, sys, time
+
+    print(json.dumps({"ready": True}), flush=True)
+    for line in sys.stdin:
+        request = json.loads(line)
+        if request["definition"] == "hang":
+            # 模拟卡住的页面：不再处理任何请求
+            time.sleep(3600)
+        if request["definition"] == "fail":
+            response = {"id": request["id"], "ok": False, "error": "boom"}
+        else:
+            data = f"{request['format']}:{request['definition']}".encode()
+            response = {
+                "id": request["id"],
+                "ok": True,
+                "data": base64.b64encode(data).decode(),
+            }
+        print(json.dumps(response), flush=True)
+    """
+)
+
+
+@pytest.fixture
+def fake_launcher(tmp_path):
+    """用 Python 脚本模拟渲染 worker 协议"""
+    script = tmp_path / "fake_worker.py"
+    script.write_text(FAKE_WORKER)
+    # RenderWorker 会追加脚本路径和页数参数，此处忽略
+    return [sys.executable, str(script)]
+
+
+def test_worker_renders_over_json_lines(fake_launcher):
+    """测试常驻 worker 渲染并返回字节"""
+    with RenderWorker(fake_launcher, pages=2) as worker:
+        futures = [worker.submit(f"graph {i}", "svg", {}) for i in range(5)]
+        results = [future.result(timeout=10) for future in futures]
+
+    assert results == [f"svg:graph {i}".encode() for i in range(5)]
+
+
+def test_worker_reports_render_errors(fake_launcher):
+    """测试渲染失败时抛出 RenderWorkerError"""
+    with RenderWorker(fake_launcher) as worker:
+        with pytest.raises(RenderWorkerError, match="boom"):
+            worker.render("fail", "svg", {})
+        # 失败后 worker 仍可继续使用
+        assert worker.render("graph TD", "png", {}) == b"png:graph TD"
+
+
+def test_worker_startup_failure():
+    """测试 worker 启动失败"""
+    worker = RenderWorker([sys.executable, "-c", "import sys; sys.exit(1)"])
+    with pytest.raises(RenderWorkerError):
+        worker.start()
+    assert not worker.running
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_worker_recovers_from_a_hung_render(fake_launcher, use_async):
+    """测试渲染超时后放弃请求并重启 worker，之后的渲染仍能成功"""
+    backend = WorkerBackend(fake_launcher, pages=1, render_timeout=0.5)
+    options = MermaidRenderOptions()
+
+    def render(source):
+        if use_async:
+            return asyncio.run(backend.render_async(source, options, OutputFormat.SVG))
+        return backend.render(source, options, OutputFormat.SVG)
+
+    backend.start()
+    try:
+        with pytest.raises(RenderWorkerError, match="timed out"):
+            render("hang")
+        assert render("graph TD").data == b"svg:graph TD"
+        assert not backend.worker._pending and not backend.worker._abandoned
+    finally:
+        backend.close()